@@ -11,10 +11,14 @@ This agent creates high-quality educational content by:
 
 Usage:
     python main.py --topic "Introduction to LangGraph" --audience "Python developers"
+    python main.py search "docker bridge network" --repo-dir ~/my-courses
+    python main.py regenerate outputs/docker-basics 3 --section "Common Pitfalls"
 """
 
 import argparse
+import json
 import sys
+import time
 from pathlib import Path
 
 # Add src to path
@@ -22,6 +26,17 @@ sys.path.insert(0, str(Path(__file__).parent))
 
 from src.config import Config
 from src.graph import run_agent
+from src.pipeline import run_pipelined
+from src.tools.metrics import start_http_server as start_metrics_server, write_textfile as write_metrics_textfile
+from src.tools.deadlines import DeadlineExceeded
+from src.tools.latency_stats import flush_latency_stats
+from src.tools.publish_queue import close_publish_queue
+from src.plan import plan_batch, log_plan
+from src.regenerate import regenerate_lesson
+from src.tools.search_index import InvertedIndex, course_index_path, reindex_corpus
+from src.tools.log import configure_logging, get_logger
+
+logger = get_logger("main")
 
 
 def main():
@@ -34,9 +49,78 @@ Examples:
   python main.py --topic "Python Async Programming" --audience "intermediate Python developers"
   python main.py --topic "Docker Basics" --audience "DevOps beginners"
   python main.py --topic "Git Basics" --repo-dir ~/my-courses
+  python main.py --topic "Docker Basics" --variant beginners --variant "DevOps engineers:Vietnamese"
+  python main.py --topic "Docker Basics" --refresh
+  python main.py --topic "Kubernetes" --modules
+  python main.py --topic "Our Deploy Pipeline" --corpus-dir ~/docs/internal
+  python main.py --plan-only --topics-file topics.txt --concurrency 4
+  python main.py --topics-file topics.txt --stage-workers writing=2
+  python main.py search "bridge network" --repo-dir ~/my-courses
+  python main.py regenerate outputs/docker-basics 3
+  python main.py regenerate outputs/docker-basics 3 --section "Common Pitfalls"
         """
     )
 
+    subparsers = parser.add_subparsers(dest="command", metavar="{search,regenerate}")
+    search_parser = subparsers.add_parser(
+        "search",
+        help="Search the lessons of all generated courses"
+    )
+    search_parser.add_argument(
+        "query",
+        nargs="*",
+        help='Search terms; "quoted phrases" must match exactly'
+    )
+    search_parser.add_argument(
+        "--repo-dir",
+        type=str,
+        help="Directory containing the courses (default: outputs/)"
+    )
+    search_parser.add_argument(
+        "--limit",
+        type=int,
+        default=10,
+        help="Maximum number of hits (default: 10)"
+    )
+    search_parser.add_argument(
+        "--course",
+        type=str,
+        help="Only search lessons of this course directory (e.g. docker-basics)"
+    )
+    search_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print hits as JSON"
+    )
+    search_parser.add_argument(
+        "--reindex",
+        action="store_true",
+        help="Index lesson files on disk that are missing from the index (e.g. existing courses) first"
+    )
+
+    regenerate_parser = subparsers.add_parser(
+        "regenerate",
+        help="Rewrite one lesson (or one section of it) of an existing course"
+    )
+    regenerate_parser.add_argument(
+        "course_dir",
+        help="Course directory (e.g. outputs/docker-basics)"
+    )
+    regenerate_parser.add_argument(
+        "lesson",
+        type=int,
+        help="Lesson number in the course outline"
+    )
+    regenerate_parser.add_argument(
+        "--section",
+        help='Only rewrite this section (e.g. "Common Pitfalls") and splice it into the lesson'
+    )
+    regenerate_parser.add_argument(
+        "--no-commit",
+        action="store_true",
+        help="Write the lesson file without committing it"
+    )
+
     parser.add_argument(
         "--topic",
         required=False,
@@ -49,6 +133,14 @@ Examples:
         help="Description of the target audience (default: intermediate developers)"
     )
 
+    parser.add_argument(
+        "--variant",
+        action="append",
+        metavar="AUDIENCE[:LANGUAGE]",
+        help="Write the course for this audience (and language); repeat for several variants "
+             "that share one research and synthesis pass"
+    )
+
     parser.add_argument(
         "--repo-dir",
         type=str,
@@ -61,74 +153,484 @@ Examples:
         help="Only validate environment configuration without running the agent"
     )
 
+    parser.add_argument(
+        "--topics-file",
+        type=str,
+        help="File with one topic per line; courses run as a stage pipeline (or are planned with --plan-only)"
+    )
+
+    parser.add_argument(
+        "--stage-workers",
+        action="append",
+        metavar="STAGE=N",
+        help="With --topics-file: workers for a pipeline stage (research, synthesis, writing, publish); repeatable"
+    )
+
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        help=f"With --topics-file: courses that may wait in front of each stage (default: {Config.PIPELINE_QUEUE_SIZE})"
+    )
+
+    parser.add_argument(
+        "--plan-only",
+        action="store_true",
+        help="Estimate tokens, requests and wall time without calling any LLM or search API"
+    )
+
+    parser.add_argument(
+        "--outline",
+        type=str,
+        help="With --plan-only: file with one lesson title per line (default: saved or estimated outline)"
+    )
+
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="With --plan-only: number of courses generated in parallel (default: 1)"
+    )
+
+    parser.add_argument(
+        "--plan-output",
+        type=str,
+        help="With --plan-only: also write the plan as JSON to this file"
+    )
+
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Generate lessons through the provider batch API (cheaper, not real-time)"
+    )
+
+    parser.add_argument(
+        "--batch-synthesis",
+        action="store_true",
+        help="With --batch, also run knowledge synthesis as a batch job"
+    )
+
+    parser.add_argument(
+        "--section-parallel",
+        action="store_true",
+        help="Write each lesson as a skeleton plus sections generated in parallel (faster per lesson)"
+    )
+
+    parser.add_argument(
+        "--modules",
+        action="store_true",
+        help="Plan the course as modules, synthesize and write them in parallel into numbered module folders"
+    )
+
+    parser.add_argument(
+        "--pack-lessons",
+        action="store_true",
+        help="Write several consecutive lessons per request, sending the knowledge base once per pack"
+    )
+
+    parser.add_argument(
+        "--sync-publish",
+        action="store_true",
+        help="Commit and push at the end of each course instead of in the background"
+    )
+
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Re-check an existing course's sources and rebuild only what their changes affect"
+    )
+
+    parser.add_argument(
+        "--refresh-threshold",
+        type=float,
+        help=f"With --refresh: share of changed source material (0-1) that triggers a rebuild (default: {Config.REFRESH_CHANGE_THRESHOLD:g})"
+    )
+
+    parser.add_argument(
+        "--no-adaptive-search",
+        action="store_true",
+        help=f"Run one fixed search per topic ({Config.TAVILY_SEARCH_DEPTH}, {Config.TAVILY_MAX_RESULTS} results) instead of escalating while it finds new material"
+    )
+
+    parser.add_argument(
+        "--corpus-dir",
+        help="Research from the Markdown, text and HTML documents in this directory instead of the web"
+    )
+
+    parser.add_argument(
+        "--no-stream-validation",
+        action="store_true",
+        help="Accept lessons as generated instead of aborting and retrying malformed ones while they stream"
+    )
+
+    parser.add_argument(
+        "--no-prompt-minify",
+        action="store_true",
+        help="Embed research notes and knowledge base in prompts as-is (no whitespace/URL minification)"
+    )
+
+    parser.add_argument(
+        "--call-timeout",
+        type=float,
+        help=f"Timeout in seconds for each LLM/search request (default: {Config.CALL_TIMEOUT:g})"
+    )
+
+    parser.add_argument(
+        "--step-timeout",
+        type=float,
+        help="Timeout in seconds for each pipeline step, 0 for none (default: STEP_TIMEOUT or none)"
+    )
+
+    parser.add_argument(
+        "--course-timeout",
+        type=float,
+        help="Timeout in seconds for the whole course, 0 for none; finished lessons are kept for the next run"
+    )
+
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve Prometheus metrics at http://127.0.0.1:PORT/metrics during the run (default: METRICS_PORT)"
+    )
+
+    parser.add_argument(
+        "--metrics-textfile",
+        type=str,
+        help="Write Prometheus metrics to this .prom file at the end (node_exporter textfile collector)"
+    )
+
+    parser.add_argument(
+        "--profile",
+        choices=["cpu", "mem", "both"],
+        help="Profile each pipeline node (cProfile .pstats and/or tracemalloc snapshots)"
+    )
+
+    parser.add_argument(
+        "--profile-dir",
+        type=str,
+        help="Directory for profile output (default: outputs/profiles/<timestamp>)"
+    )
+
+    parser.add_argument(
+        "--log-level",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        help=f"Log level (default: {Config.LOG_LEVEL}; DEBUG includes full search and model payloads)"
+    )
+
+    parser.add_argument(
+        "--log-json",
+        action="store_true",
+        help="Emit logs as JSON lines"
+    )
+
+    parser.add_argument(
+        "-q", "--quiet",
+        action="store_true",
+        help="Only show warnings and errors"
+    )
+
     args = parser.parse_args()
 
+    configure_logging(
+        level=args.log_level,
+        json_format=True if args.log_json else None,
+        quiet=args.quiet
+    )
+
+    if args.command == "search":
+        return run_search(args)
+    if args.command == "regenerate":
+        return run_regenerate(args)
+
+    if args.batch:
+        Config.BATCH_MODE = True
+    if args.batch_synthesis:
+        Config.BATCH_SYNTHESIS = True
+    if args.section_parallel:
+        Config.SECTION_PARALLEL = True
+    if args.modules:
+        Config.MODULES_MODE = True
+    if args.pack_lessons:
+        Config.LESSON_PACKING = True
+    if args.sync_publish:
+        Config.PUBLISH_BACKGROUND = False
+    if args.refresh:
+        Config.REFRESH_MODE = True
+    if args.refresh_threshold is not None:
+        Config.REFRESH_CHANGE_THRESHOLD = args.refresh_threshold
+    if args.no_adaptive_search:
+        Config.ADAPTIVE_SEARCH = False
+    if args.corpus_dir:
+        Config.SEARCH_BACKEND = "local"
+        Config.LOCAL_CORPUS_DIR = args.corpus_dir
+    if args.no_stream_validation:
+        Config.STREAM_VALIDATION = False
+    if args.no_prompt_minify:
+        Config.PROMPT_MINIFY = False
+    if args.call_timeout is not None:
+        if args.call_timeout <= 0:
+            parser.error("--call-timeout must be greater than 0")
+        Config.CALL_TIMEOUT = args.call_timeout
+    # 0 turns off a STEP_TIMEOUT/COURSE_TIMEOUT set in the environment
+    if args.step_timeout is not None:
+        if args.step_timeout < 0:
+            parser.error("--step-timeout must not be negative")
+        Config.STEP_TIMEOUT = args.step_timeout or None
+    if args.course_timeout is not None:
+        if args.course_timeout < 0:
+            parser.error("--course-timeout must not be negative")
+        Config.COURSE_TIMEOUT = args.course_timeout or None
+
     # Validate that topic is provided unless validate-only
-    if not args.validate_only and not args.topic:
-        parser.error("--topic is required unless using --validate-only")
+    if not args.validate_only and not args.topic and not args.topics_file:
+        parser.error("--topic or --topics-file is required unless using --validate-only")
+
+    if args.plan_only:
+        return run_plan(args)
+
+    # A topics file runs through the pipeline, which supports none of these
+    if args.topics_file:
+        conflicting = [
+            flag for flag, value in (
+                ("--topic", args.topic), ("--variant", args.variant),
+                ("--profile", args.profile), ("--profile-dir", args.profile_dir)
+            ) if value
+        ]
+        if conflicting:
+            parser.error(f"--topics-file cannot be combined with {', '.join(conflicting)} (except with --plan-only)")
 
     # Validate configuration
     try:
         Config.validate()
-        print("✓ Environment configuration validated")
+        logger.info("✓ Environment configuration validated")
 
         if args.validate_only:
-            print("\nConfiguration:")
+            logger.info("\nConfiguration:")
             if Config.USE_GITHUB_COPILOT:
-                print(f"  Mode: GitHub Copilot API Routing")
-                print(f"  Base URL: {Config.COPILOT_BASE_URL}")
+                logger.info(f"  Mode: GitHub Copilot API Routing")
+                logger.info(f"  Base URL: {Config.COPILOT_BASE_URL}")
             else:
-                print(f"  Mode: Direct API Access")
-            print(f"  OpenAI Model: {Config.OPENAI_MODEL}")
-            print(f"  Claude Model: {Config.CLAUDE_MODEL}")
-            print(f"  Output Directory: {Config.OUTPUT_DIR}")
+                logger.info(f"  Mode: Direct API Access")
+            logger.info(f"  OpenAI Model: {Config.OPENAI_MODEL}")
+            logger.info(f"  Claude Model: {Config.CLAUDE_MODEL}")
+            logger.info(f"  Search Backend: {Config.SEARCH_BACKEND}")
+            logger.info(f"  Output Directory: {Config.OUTPUT_DIR}")
             return 0
 
     except ValueError as e:
-        print(f"\n❌ Configuration Error: {e}")
-        print("\nPlease create a .env file with your API keys.")
-        print("See .env.example for the required variables.")
+        logger.error(f"\n❌ Configuration Error: {e}")
+        logger.error("\nPlease create a .env file with your API keys.")
+        logger.error("See .env.example for the required variables.")
         return 1
 
+    if args.topics_file:
+        try:
+            stage_workers = dict(parse_stage_workers(value) for value in args.stage_workers or [])
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.metrics_port is not None:
+        Config.METRICS_PORT = args.metrics_port
+    if args.metrics_textfile:
+        Config.METRICS_TEXTFILE = args.metrics_textfile
+    if Config.METRICS_PORT is not None:
+        start_metrics_server(Config.METRICS_PORT, Config.METRICS_ADDR)
+
+    try:
+        if args.topics_file:
+            return run_batch(args, stage_workers)
+        return run_course(args)
+    finally:
+        # Wait for background commits/pushes and report what reached the remotes
+        close_publish_queue()
+        flush_latency_stats()
+        if Config.METRICS_TEXTFILE:
+            try:
+                write_metrics_textfile(Config.METRICS_TEXTFILE)
+            except Exception as e:
+                logger.warning(f"⚠ Could not write metrics file: {e}")
+
+
+def run_course(args) -> int:
+    """Generate one course (or its variants) through the agent graph."""
     # Run the agent
-    print("\n" + "="*70)
-    print(f"  Research & Teaching Agent")
-    print("="*70)
-    print(f"\nTopic: {args.topic}")
-    print(f"Audience: {args.audience}")
+    logger.info("\n" + "="*70)
+    logger.info(f"  Research & Teaching Agent")
+    logger.info("="*70)
+    logger.info(f"\nTopic: {args.topic}")
+    variants = [parse_variant(v) for v in args.variant] if args.variant else None
+    if variants:
+        for variant in variants:
+            language = f" ({variant['language']})" if variant.get('language') else ""
+            logger.info(f"Variant: {variant['target_audience']}{language}")
+    else:
+        logger.info(f"Audience: {args.audience}")
     if args.repo_dir:
-        print(f"Repository Directory: {args.repo_dir}")
-    print()
+        logger.info(f"Repository Directory: {args.repo_dir}")
 
     try:
         final_state = run_agent(
             topic=args.topic,
             target_audience=args.audience,
-            repo_dir=args.repo_dir
+            repo_dir=args.repo_dir,
+            profile=args.profile,
+            profile_dir=args.profile_dir,
+            variants=variants
         )
+        final_states = final_state if variants else [final_state]
 
         # Print summary
-        print("\n" + "="*70)
-        print("  COURSE GENERATION COMPLETE")
-        print("="*70)
-        print(f"\n✓ Topic: {final_state['topic']}")
-        print(f"✓ Lessons: {len(final_state['lessons'])}")
-        print(f"✓ Location: {final_state['repo_info']['path']}")
-        print(f"✓ Repository: {final_state['github_repo_url']}")
-
-        print("\nLesson Outline:")
-        for i, lesson_title in enumerate(final_state['lesson_outline'], 1):
-            print(f"  {i}. {lesson_title}")
-
-        print("\n✅ Success! Your course is ready.\n")
+        logger.info("\n" + "="*70)
+        logger.info("  COURSE GENERATION COMPLETE")
+        logger.info("="*70)
+        logger.info(f"\n✓ Topic: {final_states[0]['topic']}")
+        for state in final_states:
+            if variants:
+                logger.info(f"\n✓ Variant: {state['repo_info']['topic_slug']}")
+            logger.info(f"✓ Lessons: {len(state['lessons'])}")
+            logger.info(f"✓ Location: {state['repo_info']['path']}")
+            logger.info(f"✓ Repository: {state['github_repo_url']}")
+
+        logger.info("\nLesson Outline:")
+        for i, lesson_title in enumerate(final_states[0]['lesson_outline'], 1):
+            logger.info(f"  {i}. {lesson_title}")
+
+        logger.info("\n✅ Success! Your course is ready.\n")
         return 0
 
+    except DeadlineExceeded as e:
+        logger.error(f"\n⏱ Timed out: {e}")
+        logger.error("Finished work was saved - run the same command again to resume.")
+        return 124
+
     except Exception as e:
-        print(f"\n❌ Error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"\n❌ Error: {e}")
         return 1
 
 
+def run_plan(args) -> int:
+    """Dry-run: estimate tokens, requests and wall time without any API calls."""
+    topics = [args.topic] if args.topic else []
+    if args.topics_file:
+        topics += read_lines(args.topics_file)
+
+    outline = read_lines(args.outline) if args.outline else None
+
+    plan = plan_batch(
+        topics,
+        target_audience=args.audience,
+        repo_dir=args.repo_dir,
+        outline=outline,
+        concurrency=args.concurrency
+    )
+    log_plan(plan)
+
+    if args.plan_output:
+        Path(args.plan_output).write_text(json.dumps(plan, indent=2), encoding='utf-8')
+        logger.info(f"\n✓ Plan written to {args.plan_output}")
+
+    return 0
+
+
+def run_batch(args, stage_workers: dict) -> int:
+    """Generate the courses of a topics file with the pipeline stages overlapping."""
+    topics = read_lines(args.topics_file)
+
+    logger.info("\n" + "="*70)
+    logger.info(f"  Research & Teaching Agent - {len(topics)} courses")
+    logger.info("="*70)
+
+    results, _ = run_pipelined(
+        topics,
+        target_audience=args.audience,
+        repo_dir=args.repo_dir,
+        workers=stage_workers,
+        queue_size=args.queue_size
+    )
+
+    logger.info("")
+    for result in results:
+        if result.error is None:
+            logger.info(f"✓ {result.topic}: {len(result.state['lessons'])} lessons → {result.state['repo_info']['path']}")
+        else:
+            logger.error(f"❌ {result.topic}: {result.error}")
+
+    errors = [result.error for result in results if result.error is not None]
+    if not errors:
+        logger.info(f"\n✅ Success! All {len(results)} courses are ready.\n")
+        return 0
+    logger.error(f"\n{len(errors)} of {len(results)} courses did not finish - run the same command again to resume.")
+    return 124 if all(isinstance(e, DeadlineExceeded) for e in errors) else 1
+
+
+def parse_stage_workers(value: str) -> tuple:
+    """Parse a STAGE=N --stage-workers argument."""
+    stage, _, count = value.partition('=')
+    stage = stage.strip()
+    if stage not in ("research", "synthesis", "writing", "publish") or not count.strip().isdigit():
+        raise ValueError(f"invalid --stage-workers value: {value!r} (expected e.g. writing=2)")
+    return stage, int(count)
+
+
+def parse_variant(value: str) -> dict:
+    """Parse an AUDIENCE[:LANGUAGE] variant argument."""
+    audience, _, language = value.partition(':')
+    return {"target_audience": audience.strip(), "language": language.strip() or None}
+
+
+def run_search(args) -> int:
+    """Query the full-text search index of a base directory of courses."""
+    base_path = Path(args.repo_dir).expanduser().resolve() if args.repo_dir else Config.OUTPUT_DIR
+
+    if args.reindex:
+        indexed, removed = reindex_corpus(base_path)
+        logger.info(f"✓ Reindexed {base_path}: {indexed} lessons indexed, {removed} removed")
+
+    query = " ".join(args.query)
+    if not query:
+        return 0
+
+    index_path = course_index_path(base_path)
+    if not index_path.exists():
+        logger.error(f"❌ No search index in {base_path} (run with --reindex to build it)")
+        return 1
+
+    start = time.perf_counter()
+    with InvertedIndex(index_path) as index:
+        prefix = f"{args.course.rstrip('/')}/" if args.course else ""
+        hits = index.search(query, limit=args.limit, path_prefix=prefix)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    if args.json:
+        print(json.dumps([hit._asdict() for hit in hits], indent=2))
+        return 0
+
+    # Results go to stdout so they can be piped; logs stay on stderr
+    for i, hit in enumerate(hits, 1):
+        section = f" › {hit.heading}" if hit.heading and hit.heading != hit.title else ""
+        print(f"{i:>3}. {hit.score:7.3f}  {base_path / hit.path}")
+        print(f"       {hit.title}{section}")
+    logger.info(f"{len(hits)} hits in {elapsed_ms:.1f} ms")
+    return 0
+
+
+def run_regenerate(args) -> int:
+    """Rewrite one lesson or section of an existing course from its stored knowledge base."""
+    try:
+        regenerate_lesson(args.course_dir, args.lesson, section=args.section, commit=not args.no_commit)
+    except ValueError as e:
+        logger.error(f"❌ {e}")
+        return 1
+    except Exception as e:
+        logger.error(f"❌ Error regenerating lesson: {e}")
+        return 1
+    return 0
+
+
+def read_lines(path: str) -> list[str]:
+    """Read non-empty, non-comment lines from a text file."""
+    lines = Path(path).expanduser().read_text(encoding='utf-8').splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
+
+
 if __name__ == "__main__":
     sys.exit(main())
@@ -42,13 +42,202 @@ class Config:
     # ========================================================================
     BASE_DIR = Path(__file__).parent.parent
     OUTPUT_DIR = BASE_DIR / "outputs"
+    # Large artifacts are stored here instead of inline in state; defaults to
+    # <course>/.agent_blobs. A shared directory deduplicates across courses.
+    BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR")
+    BLOB_CACHE_MB = int(os.getenv("BLOB_CACHE_MB", "64"))  # In-memory cache for loaded artifacts
+    LATENCY_STATS_FILE = os.getenv("LATENCY_STATS_FILE", str(OUTPUT_DIR / ".latency_stats.json"))
+
+    # ========================================================================
+    # Logging
+    # ========================================================================
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # "text" or "json"
+
+    # ========================================================================
+    # Prometheus metrics (optional)
+    # ========================================================================
+    # METRICS_PORT serves /metrics while the agent runs; METRICS_TEXTFILE is
+    # written at the end of a run for node_exporter's textfile collector
+    METRICS_PORT = int(os.getenv("METRICS_PORT")) if os.getenv("METRICS_PORT") else None
+    METRICS_ADDR = os.getenv("METRICS_ADDR", "127.0.0.1")
+    METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE")
 
     # ========================================================================
     # Tavily search settings
     # ========================================================================
-    TAVILY_MAX_RESULTS = 5
+    TAVILY_MAX_RESULTS = 5  # Results per search, for every backend
     TAVILY_SEARCH_DEPTH = "advanced"
 
+    # Search backend: "tavily" (web) or "local" (documents in LOCAL_CORPUS_DIR:
+    # Markdown, text and HTML files, indexed incrementally into
+    # LOCAL_CORPUS_INDEX, default <corpus dir>/.corpus_index.db)
+    SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "tavily")
+    LOCAL_CORPUS_DIR = os.getenv("LOCAL_CORPUS_DIR")
+    LOCAL_CORPUS_INDEX = os.getenv("LOCAL_CORPUS_INDEX")
+
+    # Adaptive research depth: walk ADAPTIVE_SEARCH_STEPS ("depth:results",
+    # cheapest first) and escalate only while a step adds at least
+    # ADAPTIVE_MIN_NOVEL_TOKENS of deduplicated content per new result. The step
+    # each topic settles on is recorded in SEARCH_DEPTH_FILE. When disabled,
+    # every topic gets one TAVILY_SEARCH_DEPTH search of TAVILY_MAX_RESULTS
+    ADAPTIVE_SEARCH = os.getenv("ADAPTIVE_SEARCH", "true").lower() == "true"
+    ADAPTIVE_SEARCH_STEPS = os.getenv("ADAPTIVE_SEARCH_STEPS", "basic:3,basic:6,advanced:6,advanced:10")
+    ADAPTIVE_MIN_NOVEL_TOKENS = int(os.getenv("ADAPTIVE_MIN_NOVEL_TOKENS", "400"))
+    SEARCH_DEPTH_FILE = os.getenv("SEARCH_DEPTH_FILE", str(OUTPUT_DIR / ".search_depth.json"))
+
+    # Weight of Tavily's source score vs. lexical relevance to the topic when
+    # packing search results into MAX_TOKENS_FOR_RAW_NOTES (0.0 to 1.0)
+    PACK_SCORE_WEIGHT = float(os.getenv("PACK_SCORE_WEIGHT", "0.5"))
+
+    # Cross-course reuse: research notes of past courses on highly similar
+    # topics (in the same base directory) are reused as seed context, and
+    # the fresh search then fetches only REUSE_SEARCH_RESULTS results (opt-in)
+    REUSE_ENABLED = os.getenv("REUSE_ENABLED", "false").lower() == "true"
+    REUSE_SIMILARITY_THRESHOLD = float(os.getenv("REUSE_SIMILARITY_THRESHOLD", "0.6"))  # 0.0 to 1.0
+    REUSE_MAX_COURSES = int(os.getenv("REUSE_MAX_COURSES", "2"))
+    REUSE_SEARCH_RESULTS = int(os.getenv("REUSE_SEARCH_RESULTS", "3"))
+    REUSE_SALIENT_TERMS = 40  # Top TF-IDF terms per course that a topic is matched against
+
+    # Minify research notes, knowledge base and search results before they
+    # are embedded in prompts (whitespace, rules, tables, repeated URLs)
+    PROMPT_MINIFY = os.getenv("PROMPT_MINIFY", "true").lower() == "true"
+    PROMPT_MINIFY_URL_REFS = os.getenv("PROMPT_MINIFY_URL_REFS", "true").lower() == "true"
+    PROMPT_MINIFY_URL_MIN_REPEATS = int(os.getenv("PROMPT_MINIFY_URL_MIN_REPEATS", "2"))
+
+    # Refresh mode (--refresh): re-run an existing course's search and rebuild
+    # only if the score-weighted share of changed source material exceeds
+    # REFRESH_CHANGE_THRESHOLD (0.0 to 1.0); only lessons whose knowledge
+    # base sections changed are rewritten
+    REFRESH_MODE = os.getenv("REFRESH_MODE", "false").lower() == "true"
+    REFRESH_CHANGE_THRESHOLD = float(os.getenv("REFRESH_CHANGE_THRESHOLD", "0.25"))
+
+    # Full-text search index over generated lessons (<base dir>/.search_index.db)
+    SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX_ENABLED", "true").lower() == "true"
+
+    # Audience the shared research notes are written for when a course is
+    # generated in several audience/language variants
+    VARIANT_RESEARCH_AUDIENCE = os.getenv(
+        "VARIANT_RESEARCH_AUDIENCE", "all levels, from beginners to experienced practitioners"
+    )
+
+    # ========================================================================
+    # Timeouts (seconds)
+    # ========================================================================
+    # Every LLM/Tavily request is capped at CALL_TIMEOUT and at the time left
+    # before the step/course deadline; an unset or 0 step/course timeout means
+    # no limit. On a timeout, finished work is kept and a re-run resumes.
+    CALL_TIMEOUT = float(os.getenv("CALL_TIMEOUT", "600"))
+    STEP_TIMEOUT = float(os.getenv("STEP_TIMEOUT", "0")) or None
+    COURSE_TIMEOUT = float(os.getenv("COURSE_TIMEOUT", "0")) or None
+
+    # ========================================================================
+    # Request hedging (opt-in) for Claude calls
+    # ========================================================================
+    # When enabled, a Claude call that has not produced its first token by
+    # HEDGE_PERCENTILE of recent time-to-first-token gets a duplicate request
+    # sent to HEDGE_BASE_URL / HEDGE_CLAUDE_MODEL; the first to finish wins.
+    HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "false").lower() == "true"
+    HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+    HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "5"))
+    HEDGE_MAX_REQUESTS = int(os.getenv("HEDGE_MAX_REQUESTS", "10"))  # Per process
+    HEDGE_MAX_FRACTION = float(os.getenv("HEDGE_MAX_FRACTION", "0.2"))  # Of all Claude calls
+    HEDGE_CLAUDE_MODEL = os.getenv("HEDGE_CLAUDE_MODEL") or CLAUDE_MODEL
+    HEDGE_BASE_URL = os.getenv("HEDGE_BASE_URL")  # Defaults to the primary endpoint
+
+    # ========================================================================
+    # Batch API mode (offline generation at batch prices)
+    # ========================================================================
+    BATCH_MODE = os.getenv("BATCH_MODE", "false").lower() == "true"
+    BATCH_SYNTHESIS = os.getenv("BATCH_SYNTHESIS", "false").lower() == "true"
+    BATCH_PROVIDER = os.getenv("BATCH_PROVIDER")  # "anthropic" or "openai" (default: by routing mode)
+    BATCH_BASE_URL = os.getenv("BATCH_BASE_URL")  # e.g. a local stand-in for testing
+    BATCH_POLL_INTERVAL = int(os.getenv("BATCH_POLL_INTERVAL", "60"))  # Seconds
+
+    # ========================================================================
+    # Stage-pipelined batch runs (--topics-file)
+    # ========================================================================
+    # Courses flow through research → synthesis → writing → publish stages,
+    # each with its own worker pool; at most PIPELINE_QUEUE_SIZE courses wait
+    # in front of a stage before the stage feeding it is held back
+    PIPELINE_RESEARCH_WORKERS = int(os.getenv("PIPELINE_RESEARCH_WORKERS", "1"))
+    PIPELINE_SYNTHESIS_WORKERS = int(os.getenv("PIPELINE_SYNTHESIS_WORKERS", "1"))
+    PIPELINE_WRITING_WORKERS = int(os.getenv("PIPELINE_WRITING_WORKERS", "1"))
+    PIPELINE_PUBLISH_WORKERS = int(os.getenv("PIPELINE_PUBLISH_WORKERS", "1"))
+    PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "1"))
+
+    # ========================================================================
+    # Background publishing
+    # ========================================================================
+    # Courses are committed by a background worker and pushes are coalesced
+    # per repository and remote: a push waits PUBLISH_PUSH_DELAY seconds for
+    # more commits. Failed pushes are retried with exponential backoff.
+    PUBLISH_BACKGROUND = os.getenv("PUBLISH_BACKGROUND", "true").lower() == "true"
+    PUBLISH_PUSH_DELAY = float(os.getenv("PUBLISH_PUSH_DELAY", "5"))
+    PUBLISH_PUSH_ATTEMPTS = int(os.getenv("PUBLISH_PUSH_ATTEMPTS", "5"))
+    PUBLISH_RETRY_BACKOFF = float(os.getenv("PUBLISH_RETRY_BACKOFF", "2"))  # Seconds, doubled per retry
+    PUBLISH_SHUTDOWN_TIMEOUT = float(os.getenv("PUBLISH_SHUTDOWN_TIMEOUT", "600"))
+
+    # ========================================================================
+    # Section-parallel lesson writing (opt-in, real-time mode only)
+    # ========================================================================
+    # Each lesson is written as a short skeleton followed by its sections,
+    # generated concurrently with the skeleton as shared context
+    SECTION_PARALLEL = os.getenv("SECTION_PARALLEL", "false").lower() == "true"
+    SECTION_CONCURRENCY = int(os.getenv("SECTION_CONCURRENCY", "6"))
+    SKELETON_MAX_TOKENS = int(os.getenv("SKELETON_MAX_TOKENS", "2000"))
+    SECTION_MAX_TOKENS = int(os.getenv("SECTION_MAX_TOKENS", "6000"))
+
+    # ========================================================================
+    # Lesson packing (opt-in, real-time whole-lesson mode only)
+    # ========================================================================
+    # Consecutive pending lessons are written in one request, so the knowledge
+    # base is sent once per pack; a pack holds as many lessons as fit the
+    # model's output limit at the expected output tokens per lesson
+    LESSON_PACKING = os.getenv("LESSON_PACKING", "false").lower() == "true"
+    LESSON_PACK_MAX_TOKENS = int(os.getenv("LESSON_PACK_MAX_TOKENS", "64000"))  # Output limit per request
+    LESSON_PACK_TOKENS_PER_LESSON = int(os.getenv("LESSON_PACK_TOKENS_PER_LESSON", "8000"))
+
+    # ========================================================================
+    # Stream validation (real-time whole-lesson writing)
+    # ========================================================================
+    # Lessons are streamed and aborted as soon as they are clearly malformed:
+    # no section heading within STREAM_FIRST_SECTION_TOKENS, a section running
+    # past STREAM_SECTION_TOKEN_LIMIT, or more than STREAM_MAX_MISSING_SECTIONS
+    # required sections skipped. Aborted lessons are requested again up to
+    # STREAM_VALIDATION_RETRIES times; the last attempt is kept
+    STREAM_VALIDATION = os.getenv("STREAM_VALIDATION", "true").lower() == "true"
+    STREAM_VALIDATION_RETRIES = int(os.getenv("STREAM_VALIDATION_RETRIES", "1"))
+    STREAM_FIRST_SECTION_TOKENS = int(os.getenv("STREAM_FIRST_SECTION_TOKENS", "800"))
+    STREAM_SECTION_TOKEN_LIMIT = int(os.getenv("STREAM_SECTION_TOKEN_LIMIT", "5000"))
+    STREAM_MAX_MISSING_SECTIONS = int(os.getenv("STREAM_MAX_MISSING_SECTIONS", "1"))
+
+    # ========================================================================
+    # Hierarchical modules (opt-in)
+    # ========================================================================
+    # Synthesis first plans up to MODULE_MAX_COUNT modules, then builds one
+    # knowledge base per module, concurrently, from the research notes
+    # relevant to it (at most MODULE_NOTES_MAX_TOKENS each). Lessons are
+    # written per module, modules in parallel, into numbered module folders
+    MODULES_MODE = os.getenv("MODULES_MODE", "false").lower() == "true"
+    MODULE_MAX_COUNT = int(os.getenv("MODULE_MAX_COUNT", "8"))
+    MODULE_CONCURRENCY = int(os.getenv("MODULE_CONCURRENCY", "4"))
+    MODULE_NOTES_MAX_TOKENS = int(os.getenv("MODULE_NOTES_MAX_TOKENS", "20000"))
+
+    # ========================================================================
+    # Dry-run planning (--plan-only) defaults, used where no saved state or
+    # latency history is available
+    # ========================================================================
+    PLAN_DEFAULT_LESSONS = int(os.getenv("PLAN_DEFAULT_LESSONS", "6"))
+    PLAN_DEFAULT_MODULES = int(os.getenv("PLAN_DEFAULT_MODULES", "4"))  # With MODULES_MODE
+    PLAN_SEARCH_RESULT_TOKENS = int(os.getenv("PLAN_SEARCH_RESULT_TOKENS", "4000"))  # Per Tavily result
+    PLAN_RESEARCH_OUTPUT_TOKENS = int(os.getenv("PLAN_RESEARCH_OUTPUT_TOKENS", "3000"))
+    PLAN_SYNTHESIS_OUTPUT_TOKENS = int(os.getenv("PLAN_SYNTHESIS_OUTPUT_TOKENS", "8000"))
+    PLAN_LESSON_OUTPUT_TOKENS = int(os.getenv("PLAN_LESSON_OUTPUT_TOKENS", "6000"))
+    PLAN_DEFAULT_TOKENS_PER_SECOND = float(os.getenv("PLAN_DEFAULT_TOKENS_PER_SECOND", "60"))
+    PLAN_DEFAULT_SEARCH_SECONDS = float(os.getenv("PLAN_DEFAULT_SEARCH_SECONDS", "5"))
+    PLAN_REQUEST_OVERHEAD_SECONDS = float(os.getenv("PLAN_REQUEST_OVERHEAD_SECONDS", "2"))
+
     # ========================================================================
     # Token limits for Claude
     # ========================================================================
@@ -61,8 +250,14 @@ class Config:
     @classmethod
     def validate(cls):
         """Validate that required API keys are set"""
-        # Always need Tavily for research
-        if not cls.TAVILY_API_KEY:
+        # Research needs Tavily, unless it searches a local corpus
+        if cls.SEARCH_BACKEND == "local":
+            if not cls.LOCAL_CORPUS_DIR or not Path(cls.LOCAL_CORPUS_DIR).expanduser().is_dir():
+                raise ValueError(
+                    f"SEARCH_BACKEND=local needs LOCAL_CORPUS_DIR to be a directory "
+                    f"(got: {cls.LOCAL_CORPUS_DIR or 'not set'})."
+                )
+        elif not cls.TAVILY_API_KEY:
             raise ValueError(
                 "Missing TAVILY_API_KEY. "
                 "Please set it in your .env file."
@@ -107,3 +302,8 @@ class Config:
     def get_base_url_for_claude(cls) -> str:
         """Get the base URL for Claude client (via OpenAI-compatible endpoint)"""
         return cls.COPILOT_BASE_URL if cls.USE_GITHUB_COPILOT else None
+
+    @classmethod
+    def get_hedge_base_url_for_claude(cls) -> str:
+        """Get the base URL used for hedged Claude requests"""
+        return cls.HEDGE_BASE_URL or cls.get_base_url_for_claude()
@@ -3,76 +3,204 @@ LangGraph workflow definition for the Research & Teaching Agent.
 
 This creates a deterministic, linear pipeline:
   setup → research → synthesis → writing → publish
+
+For audience/language variants the pipeline is split so that research and
+synthesis run once and writing fans out per variant:
+  setup → research → synthesis
+      → [setup_variant → writing → publish] for each variant
+
+Each node runs under the course deadline (COURSE_TIMEOUT) and its own step
+deadline (STEP_TIMEOUT), see src/tools/deadlines.py, and its duration is
+recorded in the metrics (src/tools/metrics.py).
 """
 
+import functools
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Union
 from langgraph.graph import StateGraph, END
-from src.models import AgentState
+from src.models import AgentState, CourseVariant
+from src.config import Config
+from src.tools.deadlines import Deadline, check, deadline_scope
+from src.tools.metrics import NODE_RUNS, NODE_SECONDS, track
+from src.tools.profiling import NodeProfiler
 from src.nodes import (
     setup_node,
+    setup_variant_node,
     research_node,
     synthesis_node,
     writing_node,
     publish_node
 )
+from src.nodes.setup_node import create_variant_slug
 
 
-def create_agent_graph():
-    """
-    Create and compile the LangGraph workflow.
+def wrap_node(name: str, node: Callable, course_deadline: Optional[Deadline]) -> Callable:
+    """Wrap a node so it runs under the course deadline and a fresh step deadline, and is timed."""
 
-    Returns:
-        Compiled StateGraph ready for execution
-    """
-    # Create workflow with AgentState schema
+    @functools.wraps(node)
+    def run(state):
+        with track(NODE_SECONDS, NODE_RUNS, node=name):
+            with deadline_scope(course_deadline, Deadline.after(Config.STEP_TIMEOUT, f"{name} step")):
+                check()
+                return node(state)
+
+    return run
+
+
+def _linear_graph(nodes: Dict[str, Callable], profiler: NodeProfiler = None, label: str = None,
+                  course_deadline: Deadline = None):
+    """Build and compile a graph that runs the given nodes in order."""
     workflow = StateGraph(AgentState)
 
-    # Add all nodes
-    workflow.add_node("setup", setup_node)
-    workflow.add_node("research", research_node)
-    workflow.add_node("synthesis", synthesis_node)
-    workflow.add_node("writing", writing_node)
-    workflow.add_node("publish", publish_node)
+    names = list(nodes)
+    for name, node in nodes.items():
+        profile_name = f"{name}.{label}" if label else name
+        node = wrap_node(name, node, course_deadline)
+        workflow.add_node(name, profiler.wrap(profile_name, node) if profiler else node)
+
+    workflow.set_entry_point(names[0])
+    for current, following in zip(names, names[1:]):
+        workflow.add_edge(current, following)
+    workflow.add_edge(names[-1], END)
 
-    # Define linear flow
-    workflow.set_entry_point("setup")
-    workflow.add_edge("setup", "research")
-    workflow.add_edge("research", "synthesis")
-    workflow.add_edge("synthesis", "writing")
-    workflow.add_edge("writing", "publish")
-    workflow.add_edge("publish", END)
-
-    # Compile the graph
     return workflow.compile()
 
 
-def run_agent(topic: str, target_audience: str = "intermediate developers", repo_dir: str = None) -> AgentState:
+def create_agent_graph(profiler: NodeProfiler = None, course_deadline: Deadline = None):
     """
-    Run the complete agent pipeline.
+    Create and compile the LangGraph workflow.
 
     Args:
-        topic: The topic to create a course about
-        target_audience: Description of the target audience
-        repo_dir: Optional directory containing existing repositories to use
+        profiler: Optional profiler wrapped around every node
+        course_deadline: Optional deadline for the whole run
 
     Returns:
-        Final agent state with all generated content
+        Compiled StateGraph ready for execution
     """
-    # Initialize state
-    initial_state: AgentState = {
+    # Define linear flow
+    return _linear_graph({
+        "setup": setup_node,
+        "research": research_node,
+        "synthesis": synthesis_node,
+        "writing": writing_node,
+        "publish": publish_node,
+    }, profiler, course_deadline=course_deadline)
+
+
+def create_shared_graph(profiler: NodeProfiler = None, course_deadline: Deadline = None):
+    """
+    Create the audience-independent part of the workflow for course variants:
+      setup → research → synthesis
+    """
+    return _linear_graph({
+        "setup": setup_node,
+        "research": research_node,
+        "synthesis": synthesis_node,
+    }, profiler, course_deadline=course_deadline)
+
+
+def create_variant_graph(profiler: NodeProfiler = None, label: str = None, course_deadline: Deadline = None):
+    """
+    Create the per-variant part of the workflow:
+      setup_variant → writing → publish
+    """
+    return _linear_graph({
+        "setup_variant": setup_variant_node,
+        "writing": writing_node,
+        "publish": publish_node,
+    }, profiler, label, course_deadline)
+
+
+def create_initial_state(topic: str, target_audience: str, repo_dir: str = None) -> AgentState:
+    """Initial pipeline state for a course."""
+    return {
         "topic": topic,
         "target_audience": target_audience,
         "repo_dir": repo_dir,
+        "language": None,
+        "shared_dir": None,
         "repo_info": {},
         "research_sources": [],
-        "raw_notes": "",
-        "knowledge_base": "",
+        "raw_notes": None,
+        "search_results": None,
+        "knowledge_base": None,
         "lesson_outline": [],
+        "modules": [],
         "lessons": {},
-        "github_repo_url": ""
+        "github_repo_url": "",
+        "artifacts": {}
     }
 
+
+def run_agent(
+    topic: str,
+    target_audience: str = "intermediate developers",
+    repo_dir: str = None,
+    profile: str = None,
+    profile_dir: str = None,
+    variants: Optional[List[CourseVariant]] = None
+) -> Union[AgentState, List[AgentState]]:
+    """
+    Run the complete agent pipeline.
+
+    With variants, research and synthesis run once (for
+    Config.VARIANT_RESEARCH_AUDIENCE) and only lesson writing and publishing
+    run per variant, each into its own subfolder of the course directory.
+
+    Args:
+        topic: The topic to create a course about
+        target_audience: Description of the target audience (ignored with variants)
+        repo_dir: Optional directory containing existing repositories to use
+        profile: Optional per-node profiling: "cpu", "mem" or "both"
+        profile_dir: Where to write profiles (default: outputs/profiles/<timestamp>)
+        variants: Optional audience/language variants,
+            e.g. [{"target_audience": "beginners"}, {"target_audience": "DevOps", "language": "Vietnamese"}]
+
+    Returns:
+        Final agent state with all generated content
+        (one final state per variant when variants are given)
+
+    Raises:
+        DeadlineExceeded: If the course or a step runs past its timeout
+            (finished work is saved and a re-run resumes from it)
+    """
+    # Initialize state
+    initial_state = create_initial_state(
+        topic, Config.VARIANT_RESEARCH_AUDIENCE if variants else target_audience, repo_dir
+    )
+
+    profiler = None
+    if profile:
+        if profile_dir is None:
+            profile_dir = Config.OUTPUT_DIR / "profiles" / datetime.now().strftime("%Y%m%d-%H%M%S")
+        profiler = NodeProfiler(profile, Path(profile_dir))
+
+    # One deadline for all variants of the course
+    course_deadline = Deadline.after(Config.COURSE_TIMEOUT, "course")
+
     # Create and run graph
-    graph = create_agent_graph()
-    final_state = graph.invoke(initial_state)
+    try:
+        if not variants:
+            graph = create_agent_graph(profiler, course_deadline)
+            return graph.invoke(initial_state)
+
+        shared_state = create_shared_graph(profiler, course_deadline).invoke(initial_state)
 
-    return final_state
+        final_states = []
+        for variant in variants:
+            variant_state: AgentState = {
+                **shared_state,
+                "target_audience": variant["target_audience"],
+                "language": variant.get("language"),
+                "shared_dir": shared_state['repo_info']['path'],
+                "repo_info": {},
+                "lessons": {},
+                "github_repo_url": ""
+            }
+            label = create_variant_slug(variant["target_audience"], variant.get("language"))
+            final_states.append(create_variant_graph(profiler, label, course_deadline).invoke(variant_state))
+        return final_states
+    finally:
+        if profiler:
+            profiler.log_summary()
@@ -1,29 +1,54 @@
 from typing import TypedDict, Dict, List, Any, Optional
 
 
+# Reference to a large text stored on disk (see src/tools/blob_store.py):
+# {"path": ..., "sha256": ..., "size": ...}
+ArtifactHandle = Dict[str, Any]
+
+
+class CourseVariant(TypedDict, total=False):
+    """One audience/language variant of a course."""
+    target_audience: str
+    language: Optional[str]  # e.g. "Vietnamese"; None writes in the default language
+
+
 class AgentState(TypedDict):
     """
     State schema for the Research & Teaching Agent.
     This follows the exact structure defined in CLAUDE.md.
+
+    Large texts (research notes, knowledge base, lessons) are held as
+    artifact handles and loaded on demand, so the state stays small.
     """
     # Input
     topic: str
     target_audience: str
     repo_dir: Optional[str]  # Optional: directory containing repositories to use
+    language: Optional[str]  # Optional: language the lessons are written in
+
+    # Variants: course directory holding the shared research and synthesis
+    shared_dir: Optional[str]
 
     # Step 1: Repo setup
     repo_info: Dict[str, Any]
 
     # Step 2: Research
     research_sources: List[Dict[str, str]]
-    raw_notes: str
+    raw_notes: Optional[ArtifactHandle]
+    search_results: Optional[ArtifactHandle]  # Search response (JSON) the notes were built from
 
     # Step 3: Knowledge synthesis
-    knowledge_base: str
+    knowledge_base: Optional[ArtifactHandle]
     lesson_outline: List[str]
+    # Module mode: {"title", "summary", "knowledge_base": handle, "lessons": [titles]}
+    # per module; lesson_outline is then all modules' lessons in order
+    modules: List[Dict[str, Any]]
 
     # Step 4: Lecture writing
-    lessons: Dict[str, str]
+    lessons: Dict[str, ArtifactHandle]
 
     # Step 5: GitHub push
     github_repo_url: str
+
+    # Incremental rebuilds: artifact name → {"inputs": hash, "hash": hash}
+    artifacts: Dict[str, Dict[str, Any]]
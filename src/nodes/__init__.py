@@ -1,4 +1,4 @@
-from .setup_node import setup_node
+from .setup_node import setup_node, setup_variant_node
 from .research_node import research_node
 from .synthesis_node import synthesis_node
 from .writing_node import writing_node
@@ -6,6 +6,7 @@ from .publish_node import publish_node
 
 __all__ = [
     "setup_node",
+    "setup_variant_node",
     "research_node",
     "synthesis_node",
     "writing_node",
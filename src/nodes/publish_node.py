@@ -1,12 +1,25 @@
 """
 Step 5: GitHub Publishing
 
-Writes lessons to files and commits to git repository.
+Writes lessons to files and commits to git repository. By default the commit
+and push are handed to a background queue (see src/tools/publish_queue.py).
+The README is only rewritten when the set of lessons it lists has changed.
+Lessons are added to the full-text search index of the base directory, and
+artifact blobs no saved state references any more are deleted.
 """
 
 from pathlib import Path
 from src.models import AgentState
 from src.tools.git_operations import commit_changes, push_to_remote
+from src.tools.artifacts import content_hash, is_fresh, make_record, readme_inputs
+from src.tools.blob_store import collect_garbage
+from src.tools.state_persistence import save_state
+from src.tools.search_index import index_lessons
+from src.tools.publish_queue import get_publish_queue
+from src.config import Config
+from src.tools.log import get_logger
+
+logger = get_logger(__name__)
 
 
 def publish_node(state: AgentState) -> dict:
@@ -22,7 +35,7 @@ def publish_node(state: AgentState) -> dict:
     Returns:
         Dictionary with github_repo_url update
     """
-    print("\n[Step 5] Publishing to repository...")
+    logger.info("\n[Step 5] Publishing to repository...")
 
     repo_info = state['repo_info']
     lessons = state['lessons']
@@ -31,51 +44,98 @@ def publish_node(state: AgentState) -> dict:
     repo_path = Path(repo_info['path'])
     lessons_dir = Path(repo_info['lessons_dir'])
 
-    # Write README
+    # Write README unless it is already up to date
+    artifacts = dict(state.get('artifacts') or {})
     readme_path = repo_path / "README.md"
-    readme_content = generate_readme(topic, state['target_audience'], lessons)
-    readme_path.write_text(readme_content, encoding='utf-8')
-    print(f"  ✓ Created README.md")
+    inputs_hash = readme_inputs(
+        topic, state['target_audience'],
+        [(key, content_hash(artifacts, key)) for key in lessons]
+    )
+
+    if readme_path.exists() and is_fresh(artifacts, 'readme', inputs_hash):
+        logger.info(f"  ✓ README.md is up to date")
+    else:
+        readme_content = generate_readme(topic, state['target_audience'], lessons, state.get('modules'))
+        readme_path.write_text(readme_content, encoding='utf-8')
+        artifacts['readme'] = make_record(inputs_hash, readme_content)
+        save_state(repo_path, {**state, "artifacts": artifacts})
+        logger.info(f"  ✓ Created README.md")
+
+    # Drop blobs no saved state references any more (e.g. superseded knowledge
+    # bases); a variant's notes and knowledge base live in the shared course directory
+    removed = collect_garbage(Path(state.get('shared_dir') or repo_path))
+    if removed:
+        logger.info(f"  ✓ Removed {removed} unreferenced artifact blobs")
 
     # Lesson files are already written by writing_node
     # Just verify they exist
-    existing_lessons = list(lessons_dir.glob("*.md"))
-    print(f"  ✓ Found {len(existing_lessons)} lesson files")
-
-    # Commit changes
-    try:
-        commit_message = f"Add course: {topic}\n\nGenerated by Research & Teaching Agent"
-        commit_changes(repo_path, commit_message)
-        print(f"  ✓ Committed changes")
-    except Exception as e:
-        print(f"  ⚠ Commit warning: {e}")
-
-    # Try to push if remote is configured
+    existing_lessons = list(lessons_dir.glob("**/*.md"))
+    logger.info(f"  ✓ Found {len(existing_lessons)} lesson files")
+
+    # Update the search index (lessons whose manifest entry has a content
+    # hash are not re-read)
+    if Config.SEARCH_INDEX_ENABLED:
+        base_path = Path(state['repo_dir']).expanduser().resolve() if state.get('repo_dir') else Config.OUTPUT_DIR
+        try:
+            indexed = index_lessons(base_path, [
+                (repo_path / handle['path'], handle.get('sha256'))
+                for key, handle in lessons.items()
+            ])
+            logger.info(f"  ✓ Search index updated ({indexed} lessons indexed)")
+        except Exception as e:
+            logger.warning(f"  ⚠ Search index warning: {e}")
+
+    commit_message = f"Add course: {topic}\n\nGenerated by Research & Teaching Agent"
     remote_url = repo_info.get('remote_url')
     github_repo_url = remote_url or f"file://{repo_path}"
 
-    if remote_url:
+    if Config.PUBLISH_BACKGROUND:
+        # Commit and push without holding up the next course
+        get_publish_queue().submit(repo_path, commit_message, remote_url)
+        logger.info(f"  ✓ Queued commit{' and push' if remote_url else ''} (publishing in the background)")
+    else:
+        # Commit changes
         try:
-            push_to_remote(repo_path)
-            print(f"  ✓ Pushed to remote: {remote_url}")
+            commit_changes(repo_path, commit_message)
+            logger.info(f"  ✓ Committed changes")
         except Exception as e:
-            print(f"  ⚠ Push failed: {e}")
-            print(f"  → Repository available locally at: {repo_path}")
+            logger.warning(f"  ⚠ Commit warning: {e}")
+
+        # Try to push if remote is configured
+        if remote_url:
+            try:
+                push_to_remote(repo_path)
+                logger.info(f"  ✓ Pushed to remote: {remote_url}")
+            except Exception as e:
+                logger.warning(f"  ⚠ Push failed: {e}")
+                logger.info(f"  → Repository available locally at: {repo_path}")
 
-    print(f"\n  ✓ Publishing complete!\n")
+    logger.info(f"\n  ✓ Publishing complete!\n")
 
     return {
-        "github_repo_url": github_repo_url
+        "github_repo_url": github_repo_url,
+        "artifacts": artifacts
     }
 
 
-def generate_readme(topic: str, target_audience: str, lessons: dict) -> str:
-    """Generate README content for the course."""
+def generate_readme(topic: str, target_audience: str, lessons: dict, modules: list = None) -> str:
+    """Generate README content for the course (lessons grouped by module in module mode)."""
 
     lesson_list = []
+    current_folder = None
     for i, lesson_key in enumerate(sorted(lessons.keys()), 1):
+        folder, _, name = lesson_key.rpartition('/')
+        if folder and folder != current_folder:
+            # Module heading, e.g. "01-Core-Concepts" → "Module 1: Core Concepts"
+            number = int(folder[:2])
+            title = modules[number - 1]['title'] if modules and number <= len(modules) else folder[3:].replace('-', ' ')
+            if lesson_list:
+                lesson_list.append("")
+            lesson_list += [f"### Module {number}: {title}", ""]
+            current_folder = folder
+
         # Extract title from filename
-        title = lesson_key.replace('lesson_', '').replace('_', ' ').title()
+        title = name.replace('lesson_', '').replace('_', ' ').title()
         # Remove leading numbers
         title = ' '.join(title.split()[1:]) if title.split()[0].isdigit() else title
 
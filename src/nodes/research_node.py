@@ -1,92 +1,233 @@
 """
 Step 2: Web Research
 
-Uses Tavily to search for information and OpenAI to synthesize research notes.
-Can resume from saved state to skip research if already completed.
+Uses Tavily (or a local document corpus, SEARCH_BACKEND=local) to search for
+information and OpenAI to synthesize research notes.
+Research notes of past courses on highly similar topics are reused as seed
+context (see src/tools/knowledge_index.py), so the search only fills the gaps.
+Can resume from saved state to skip research if already completed and still
+fresh for the current topic, audience, model and prompts.
+
+In refresh mode (REFRESH_MODE / --refresh) the search of a completed course
+is re-run and its sources' content fingerprints are diffed against the
+stored ones; the notes are rebuilt only if the material changed by more
+than REFRESH_CHANGE_THRESHOLD (see src/tools/refresh.py).
+
+The search response the notes were built from is saved with the state.
+When only the notes are stale (e.g. the audience changed) but the search
+inputs are not, the notes are rebuilt from it without searching again.
+
+With ADAPTIVE_SEARCH the search starts cheap and escalates depth and result
+count only while it keeps finding new material (see
+src/tools/adaptive_search.py).
 """
 
+import json
+
 from src.models import AgentState
-from src.tools.tavily_client import search_topic, format_search_results, extract_sources
+from src.tools.tavily_client import search_topic, extract_sources
+from src.tools.adaptive_search import adaptive_enabled, adaptive_search, recorded_search
 from src.tools.llm_client import call_openai
 from src.prompts import format_research_synthesis_prompt
 from src.tools.state_persistence import save_state
-from src.tools.token_utils import smart_truncate_for_prompt
+from src.tools.context_packing import pack_search_results
+from src.tools.prompt_minify import expand_url_refs, minify_for_prompt
+from src.tools.knowledge_index import find_related_courses, load_seed_results
+from src.tools.artifacts import make_record, raw_notes_inputs, sources_inputs
+from src.tools.blob_store import get_text, put_text, text_size, to_handle
+from src.tools.metrics import record_cache
+from src.tools.refresh import diff_sources, fingerprint_sources, without_fingerprints
 from src.config import Config
 from pathlib import Path
+from src.tools.log import get_logger
+
+logger = get_logger(__name__)
 
 
 def research_node(state: AgentState) -> dict:
     """
     Perform web research using Tavily and synthesize notes using OpenAI.
 
-    If saved state exists with research notes, skip this step.
+    If saved state exists with fresh research notes, skip this step.
 
     Args:
         state: Current agent state
 
     Returns:
-        Dictionary with research_sources and raw_notes updates
+        Dictionary with research_sources and raw_notes (handle) updates
     """
-    print("\n[Step 2] Conducting web research...")
+    logger.info("\n[Step 2] Conducting web research...")
 
     topic = state['topic']
     target_audience = state['target_audience']
     repo_info = state['repo_info']
+    repo_path = Path(repo_info['path'])
 
     # Check if we can resume from saved state
     resume_info = repo_info.get('resume_info', {})
     saved_state = repo_info.get('saved_state', {})
 
-    if resume_info.get('can_skip_research'):
-        print(f"  → Resuming: Using existing research notes")
-        print(f"  ✓ Loaded {len(saved_state.get('research_sources', []))} sources")
-        print(f"  ✓ Loaded research notes ({len(saved_state.get('raw_notes', ''))} chars)")
-        print(f"  → Skipping Tavily search and OpenAI synthesis\n")
+    saved_sources = saved_state.get('research_sources', [])
+    can_skip = bool(resume_info.get('can_skip_research'))
+
+    # Refresh: re-run the search and rebuild only if the sources changed enough
+    refresh_response = None
+    if can_skip and Config.REFRESH_MODE:
+        refresh_response, diff = refresh_sources(topic, saved_sources)
+        if diff['baseline'] or diff['change'] <= Config.REFRESH_CHANGE_THRESHOLD:
+            refresh_response = None
+            if diff['sources'] != saved_sources:
+                saved_sources = diff['sources']
+                save_state(repo_path, {
+                    **saved_state,
+                    "research_sources": saved_sources,
+                    "artifacts": state.get('artifacts') or {}
+                })
+        else:
+            can_skip = False
+
+    record_cache("artifacts", hit=can_skip)
+    if can_skip:
+        raw_notes = to_handle(repo_path, saved_state.get('raw_notes'))
+        logger.info(f"  → Resuming: Using existing research notes")
+        logger.info(f"  ✓ Loaded {len(saved_sources)} sources")
+        logger.info(f"  ✓ Loaded research notes ({text_size(raw_notes)} chars)")
+        logger.info(f"  → Skipping Tavily search and OpenAI synthesis\n")
 
         return {
-            "research_sources": saved_state.get('research_sources', []),
-            "raw_notes": saved_state.get('raw_notes', '')
+            "research_sources": saved_sources,
+            "raw_notes": raw_notes,
+            "search_results": saved_state.get('search_results')
         }
 
-    # Perform new research
-    print(f"  → Searching for: {topic}")
-    search_response = search_topic(topic)
-
-    # Extract sources
-    sources = extract_sources(search_response)
-    print(f"  ✓ Found {len(sources)} sources")
-
-    # Format search results
-    formatted_results = format_search_results(search_response)
-
-    # Truncate if needed to fit token limits
-    formatted_results, was_truncated = smart_truncate_for_prompt(
-        formatted_results,
-        Config.MAX_TOKENS_FOR_RAW_NOTES,
-        "Search results"
-    )
+    # Only the notes are stale (e.g. a new audience): rebuild them from the saved search results
+    saved_response = None
+    if refresh_response is None and not Config.REFRESH_MODE and resume_info.get('can_reuse_sources'):
+        try:
+            saved_response = json.loads(get_text(saved_state['search_results'], repo_path))
+        except Exception as e:
+            logger.warning(f"  ⚠ Warning: Could not load saved search results: {e}")
+
+    if saved_response is not None:
+        sources = saved_sources
+        search_response = saved_response
+        logger.info(f"  → Reusing saved search results ({len(sources)} sources) - skipping search")
+    else:
+        # Reuse research from related courses
+        seed_results = []
+        if Config.REUSE_ENABLED:
+            seed_results = load_seed_results(repo_path, find_related_courses(repo_path, topic))
+            for seed in seed_results:
+                logger.info(f"  ✓ Reusing notes of related course: {seed['reused_from']} (similarity {seed['score']:.2f})")
+
+        # Perform new research (a refresh already has the new search results)
+        if refresh_response is not None:
+            search_response = refresh_response
+        else:
+            max_results = Config.REUSE_SEARCH_RESULTS if seed_results else None
+            if adaptive_enabled():
+                search_response = adaptive_search(topic, max_results)
+            else:
+                logger.info(f"  → Searching for: {topic}")
+                search_response = search_topic(topic, max_results)
+
+        # Extract sources, fingerprinting their content for later refreshes
+        sources = [
+            {key: seed[key] for key in ('title', 'url', 'score', 'reused_from', 'notes_hash')}
+            for seed in seed_results
+        ] + fingerprint_sources(extract_sources(search_response), search_response)
+        logger.info(f"  ✓ Found {len(sources)} sources")
+        search_response = {**search_response, 'results': seed_results + search_response.get('results', [])}
+
+    # Format search results, keeping the most relevant paragraphs if they
+    # exceed the token limit
+    formatted_results = ''.join(pack_search_results(
+        search_response,
+        topic,
+        Config.MAX_TOKENS_FOR_RAW_NOTES
+    ))
+
+    formatted_results, url_refs = minify_for_prompt(formatted_results, "search results")
 
     # Synthesize research notes using OpenAI
-    print(f"  → Synthesizing research notes with OpenAI...")
+    logger.info(f"  → Synthesizing research notes with OpenAI...")
     system_prompt, user_prompt = format_research_synthesis_prompt(
         topic=topic,
         target_audience=target_audience,
         search_results=formatted_results
     )
 
-    raw_notes = call_openai(system_prompt, user_prompt, temperature=0.7)
-    print(f"  ✓ Generated research notes ({len(raw_notes)} chars)\n")
+    raw_notes = expand_url_refs(call_openai(system_prompt, user_prompt, temperature=0.7), url_refs)
+    logger.info(f"  ✓ Generated research notes ({len(raw_notes)} chars)\n")
 
-    # Save state for resume
-    repo_path = Path(repo_info['path'])
+    # Record artifact hashes so downstream steps can detect the change
+    artifacts = dict(state.get('artifacts') or {})
+    artifacts['sources'] = make_record(sources_inputs(topic), without_fingerprints(sources))
+    artifacts['raw_notes'] = make_record(
+        raw_notes_inputs(artifacts['sources']['hash'], topic, target_audience),
+        raw_notes
+    )
+
+    # Keep only handles to the notes and the search results in state
+    raw_notes_handle = put_text(repo_path, raw_notes)
+    search_results_handle = put_text(repo_path, json.dumps(search_response, ensure_ascii=False))
+
+    # Save state for resume (downstream artifacts stay until they are found stale)
     save_state(repo_path, {
+        **saved_state,
         "topic": topic,
         "target_audience": target_audience,
         "research_sources": sources,
-        "raw_notes": raw_notes
+        "raw_notes": raw_notes_handle,
+        "search_results": search_results_handle,
+        "artifacts": artifacts,
+        "pending_batch": None
     })
 
     return {
         "research_sources": sources,
-        "raw_notes": raw_notes
+        "raw_notes": raw_notes_handle,
+        "search_results": search_results_handle,
+        "artifacts": artifacts
     }
+
+
+def refresh_sources(topic: str, sources: list) -> tuple:
+    """
+    Re-run a course's search and diff its results against the stored sources.
+
+    Args:
+        topic: Course topic
+        sources: Stored research sources
+
+    Returns:
+        Tuple of (search_response, diff) - see diff_sources
+    """
+    logger.info(f"  → Refresh: re-running search for: {topic}")
+    reused = any(source.get('reused_from') for source in sources)
+    max_results = Config.REUSE_SEARCH_RESULTS if reused else None
+    if adaptive_enabled() and recorded_search(topic):
+        # Repeats the recorded searches the course was built from
+        search_response = adaptive_search(topic, max_results)
+    else:
+        search_response = search_topic(topic, max_results)
+    diff = diff_sources(sources, search_response)
+
+    if diff['baseline']:
+        logger.info(f"  → No source fingerprints stored yet - recording them as the baseline")
+        return search_response, diff
+
+    for url in diff['unchanged']:
+        logger.info(f"     = {url}")
+    for url, change in diff['changed']:
+        logger.info(f"     ~ {url} ({change:.0%} changed)")
+    for url in diff['removed']:
+        logger.info(f"     - {url}")
+    for url in diff['added']:
+        logger.info(f"     + {url}")
+
+    if diff['change'] <= Config.REFRESH_CHANGE_THRESHOLD:
+        logger.info(f"  ✓ Sources changed {diff['change']:.0%} (threshold {Config.REFRESH_CHANGE_THRESHOLD:.0%}) - course is up to date")
+    else:
+        logger.info(f"  → Sources changed {diff['change']:.0%} (threshold {Config.REFRESH_CHANGE_THRESHOLD:.0%}) - rebuilding research")
+    return search_response, diff
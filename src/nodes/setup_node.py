@@ -9,6 +9,10 @@ Creates a single folder based on topic:
 - "Memory of AI" → memory-of-ai/
 - "Docker basics" → docker-basics/
 
+Course variants (one per audience/language) share the topic folder's
+research and synthesis and write their lessons into subfolders:
+- "Docker basics" for "DevOps engineers" in Vietnamese → docker-basics/devops-engineers-vietnamese/
+
 Note: Does NOT run 'git init'. If you need git, run 'git init' in the target directory first.
 """
 
@@ -16,8 +20,12 @@ from pathlib import Path
 from src.models import AgentState
 from src.config import Config
 from src.tools.git_operations import get_repo_info
-from src.tools.state_persistence import check_resume_capability, load_state, load_existing_lessons
+from src.tools.state_persistence import check_resume_capability, find_existing_lessons, load_state
+from src.tools.blob_store import ignore_blob_dir, rebase_handle
 import re
+from src.tools.log import get_logger
+
+logger = get_logger(__name__)
 
 
 def create_topic_slug(topic: str) -> str:
@@ -63,7 +71,7 @@ def setup_node(state: AgentState) -> dict:
     Returns:
         Dictionary with repo_info update
     """
-    print("\n[Step 1] Setting up repository and folders...")
+    logger.info("\n[Step 1] Setting up repository and folders...")
 
     topic = state['topic']
     repo_dir = state.get('repo_dir')
@@ -71,8 +79,8 @@ def setup_node(state: AgentState) -> dict:
     # Create topic slug for directory name
     topic_slug = create_topic_slug(topic)
 
-    print(f"  → Topic: '{topic}'")
-    print(f"    Directory: {topic_slug}")
+    logger.info(f"  → Topic: '{topic}'")
+    logger.info(f"    Directory: {topic_slug}")
 
     if repo_dir:
         # Use existing repository directory
@@ -81,33 +89,36 @@ def setup_node(state: AgentState) -> dict:
         if not base_path.exists():
             raise ValueError(f"Repository directory does not exist: {base_path}")
 
-        print(f"  → Using repository directory: {base_path}")
+        logger.info(f"  → Using repository directory: {base_path}")
 
         # Create topic directory
         repo_path = base_path / topic_slug
 
         if repo_path.exists():
-            print(f"  ✓ Found existing directory: {repo_path}")
+            logger.info(f"  ✓ Found existing directory: {repo_path}")
         else:
             repo_path.mkdir(parents=True, exist_ok=True)
-            print(f"  ✓ Created directory: {repo_path}")
+            logger.info(f"  ✓ Created directory: {repo_path}")
     else:
         # Use default output directory
         repo_path = Config.OUTPUT_DIR / topic_slug
 
         repo_path.mkdir(parents=True, exist_ok=True)
-        print(f"  ✓ Created directory: {repo_path}")
+        logger.info(f"  ✓ Created directory: {repo_path}")
 
     # Create subdirectories
     (repo_path / "lessons").mkdir(exist_ok=True)
-    print(f"  ✓ Created lessons directory")
+    logger.info(f"  ✓ Created lessons directory")
+
+    # Artifact blobs are local working data, not course content
+    ignore_blob_dir(repo_path)
 
     # Check if we're in a git repository
     if not (repo_path / ".git").exists():
-        print(f"  ⚠ Warning: Not in a git repository. Commits will be skipped.")
-        print(f"    To use git, run 'git init' in: {repo_path}")
+        logger.warning(f"  ⚠ Warning: Not in a git repository. Commits will be skipped.")
+        logger.warning(f"    To use git, run 'git init' in: {repo_path}")
     else:
-        print(f"  ✓ Using existing git repository")
+        logger.info(f"  ✓ Using existing git repository")
 
     # Get repository information
     repo_info = get_repo_info(repo_path)
@@ -115,21 +126,27 @@ def setup_node(state: AgentState) -> dict:
     repo_info['topic_slug'] = topic_slug
 
     # Check if we can resume from existing state
-    resume_info = check_resume_capability(repo_path)
+    saved_state = load_state(repo_path)
+    resume_info = check_resume_capability(repo_path, topic, state['target_audience'], saved_state)
 
     if resume_info["has_state"]:
-        print(f"  → Found existing state - checking what can be resumed...")
-
-        saved_state = load_state(repo_path)
+        logger.info(f"  → Found existing state - checking what can be resumed...")
 
         if resume_info["can_skip_research"]:
-            print(f"  ✓ Can resume: Skip research (found saved notes)")
+            logger.info(f"  ✓ Can resume: Skip research (found saved notes)")
+        elif saved_state.get("raw_notes") and resume_info["can_reuse_sources"]:
+            logger.info(f"  → Research notes are stale (audience, model or prompts changed) - will rebuild them from the saved search results")
+        elif saved_state.get("raw_notes"):
+            logger.info(f"  → Research is stale (topic, audience, model or prompts changed) - will rebuild")
+            logger.info(f"    Downstream artifacts are rebuilt only if the new notes differ")
 
         if resume_info["can_skip_synthesis"]:
-            print(f"  ✓ Can resume: Skip synthesis (found knowledge base)")
+            logger.info(f"  ✓ Can resume: Skip synthesis (found knowledge base)")
+        elif saved_state.get("knowledge_base") and resume_info["can_skip_research"]:
+            logger.info(f"  → Knowledge base is stale - will rebuild")
 
         if resume_info["completed_lessons"]:
-            print(f"  ✓ Can resume: Skip {len(resume_info['completed_lessons'])} completed lessons")
+            logger.info(f"  ✓ Can resume: Skip {len(resume_info['completed_lessons'])} completed lessons")
 
         repo_info['resume_info'] = resume_info
         repo_info['saved_state'] = saved_state
@@ -137,9 +154,95 @@ def setup_node(state: AgentState) -> dict:
         repo_info['resume_info'] = resume_info
         repo_info['saved_state'] = {}
 
-    print(f"  ✓ Setup complete")
-    print(f"  → Repository: {repo_path}\n")
+    logger.info(f"  ✓ Setup complete")
+    logger.info(f"  → Repository: {repo_path}\n")
+
+    return {
+        "repo_info": repo_info,
+        "artifacts": resume_info["artifacts"]
+    }
+
+
+# Artifacts produced by the shared research and synthesis steps
+SHARED_ARTIFACTS = ("sources", "raw_notes", "knowledge_base")
+
+
+def create_variant_slug(target_audience: str, language: str = None) -> str:
+    """
+    Convert an audience/language variant into a directory slug.
+
+    Examples:
+        ("beginners", None) → "beginners"
+        ("DevOps engineers", "Vietnamese") → "devops-engineers-vietnamese"
+
+    Returns:
+        Sanitized slug for the variant
+    """
+    slug = re.sub(r'[^a-z0-9 _/-]', '', target_audience.lower())
+    if language:
+        slug += f"-{re.sub(r'[^a-z0-9 _/-]', '', language.lower())}"
+    return sanitize_slug(slug)
+
+
+def setup_variant_node(state: AgentState) -> dict:
+    """
+    Prepare the output directory of one course variant.
+
+    Runs after the shared research and synthesis steps. The variant gets
+    its own lessons, README and state file in a subfolder of the shared
+    course directory, and references the shared notes and knowledge base.
+
+    Args:
+        state: Variant state seeded from the shared run (see run_agent)
+
+    Returns:
+        Dictionary with repo_info, artifacts and re-based artifact handles
+    """
+    shared_path = Path(state['shared_dir'])
+    variant_slug = create_variant_slug(state['target_audience'], state.get('language'))
+    repo_path = shared_path / variant_slug
+
+    logger.info(f"\n[Step 1] Setting up variant: {state['target_audience']}"
+                + (f" ({state['language']})" if state.get('language') else ""))
+
+    (repo_path / "lessons").mkdir(parents=True, exist_ok=True)
+    logger.info(f"  ✓ Directory: {repo_path}")
+
+    repo_info = get_repo_info(repo_path)
+    repo_info['lessons_dir'] = str(repo_path / "lessons")
+    repo_info['topic_slug'] = f"{create_topic_slug(state['topic'])}/{variant_slug}"
+
+    # Lesson and README records come from the variant, the rest from the shared run
+    saved_state = load_state(repo_path)
+    artifacts = dict(saved_state.get("artifacts") or {})
+    for name in SHARED_ARTIFACTS:
+        artifacts.pop(name, None)
+        if name in state['artifacts']:
+            artifacts[name] = state['artifacts'][name]
+
+    lessons = find_existing_lessons(repo_path, saved_state.get("lessons"))
+    completed_lessons = list(lessons)
+    if completed_lessons:
+        logger.info(f"  ✓ Can resume: Skip {len(completed_lessons)} completed lessons")
+
+    repo_info['resume_info'] = {
+        "has_state": bool(saved_state),
+        "can_skip_research": True,
+        "can_skip_synthesis": True,
+        "completed_lessons": completed_lessons,
+        "lessons": lessons,
+        "artifacts": artifacts
+    }
+    repo_info['saved_state'] = saved_state
 
     return {
-        "repo_info": repo_info
+        "repo_info": repo_info,
+        "artifacts": artifacts,
+        "raw_notes": rebase_handle(state['raw_notes'], shared_path, repo_path),
+        "search_results": rebase_handle(state.get('search_results'), shared_path, repo_path),
+        "knowledge_base": rebase_handle(state['knowledge_base'], shared_path, repo_path),
+        "modules": [
+            {**module, "knowledge_base": rebase_handle(module['knowledge_base'], shared_path, repo_path)}
+            for module in state.get('modules') or []
+        ]
     }
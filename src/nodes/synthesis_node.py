@@ -3,16 +3,55 @@ Step 3: Knowledge Synthesis
 
 Uses Claude to transform raw research into structured, teachable knowledge.
 This is one of the two main Claude nodes.
-Can resume from saved state to skip synthesis if already completed.
+Can resume from saved state to skip synthesis if the saved knowledge base was
+built from the current research notes, model and prompts.
+
+In refresh mode a rebuilt knowledge base is an update of the existing one
+that copies unaffected sections verbatim.
+
+With BATCH_MODE and BATCH_SYNTHESIS the synthesis call goes through the
+provider batch API like the lessons do.
+
+In module mode (MODULES_MODE / --modules) a module outline is planned
+first, then each module's knowledge base is synthesized concurrently from
+the research notes relevant to it (see src/tools/modules.py); modules whose
+notes did not change are reused. The course knowledge base is their
+concatenation.
 """
 
+from concurrent.futures import ThreadPoolExecutor
+
 from src.models import AgentState
-from src.tools.llm_client import call_claude, extract_lesson_outline
-from src.prompts import format_synthesis_prompt
+from src.tools.llm_client import call_claude, extract_lesson_outline, extract_module_outline
+from src.tools.batch_client import run_claude_batch
+from src.prompts import (
+    format_module_outline_prompt,
+    format_module_synthesis_prompt,
+    format_synthesis_prompt,
+    format_synthesis_update_prompt,
+)
 from src.tools.state_persistence import save_state
 from src.tools.token_utils import smart_truncate_for_prompt
+from src.tools.prompt_minify import expand_url_refs, minify_for_prompt
+from src.tools.artifacts import (
+    content_hash,
+    hash_text,
+    is_fresh,
+    knowledge_base_inputs,
+    make_record,
+    module_inputs,
+    module_outline_inputs,
+)
+from src.tools.blob_store import get_text, put_text, text_size, to_handle
+from src.tools.knowledge_index import index_course, is_indexed
+from src.tools.metrics import record_cache
+from src.tools.deadlines import propagate
+from src.tools.modules import combine_knowledge_bases, module_notes
 from src.config import Config
 from pathlib import Path
+from src.tools.log import get_logger
+
+logger = get_logger(__name__)
 
 
 def synthesis_node(state: AgentState) -> dict:
@@ -21,84 +60,268 @@ def synthesis_node(state: AgentState) -> dict:
 
     This is a CORE CLAUDE TASK - deep thinking and structuring.
 
-    If saved state exists with knowledge base, skip this step.
+    If saved state exists with a fresh knowledge base, skip this step.
 
     Args:
         state: Current agent state
 
     Returns:
-        Dictionary with knowledge_base and lesson_outline updates
+        Dictionary with knowledge_base (handle), lesson_outline and modules updates
     """
-    print("\n[Step 3] Synthesizing knowledge with Claude...")
+    logger.info("\n[Step 3] Synthesizing knowledge with Claude...")
 
     topic = state['topic']
-    raw_notes = state['raw_notes']
     repo_info = state['repo_info']
+    repo_path = Path(repo_info['path'])
 
     # Check if we can resume from saved state
-    resume_info = repo_info.get('resume_info', {})
     saved_state = repo_info.get('saved_state', {})
+    # Lesson manifest (key → handle) carried over into every state saved here
+    existing_lessons = repo_info.get('resume_info', {}).get('lessons') or {}
+    artifacts = dict(state.get('artifacts') or {})
+
+    raw_notes_hash = content_hash(artifacts, 'raw_notes') or hash_text(get_text(state['raw_notes'], repo_path))
+    kb_inputs = knowledge_base_inputs(raw_notes_hash, topic, Config.MODULES_MODE)
 
-    if resume_info.get('can_skip_synthesis'):
-        print(f"  → Resuming: Using existing knowledge base")
-        print(f"  ✓ Loaded knowledge base ({len(saved_state.get('knowledge_base', ''))} chars)")
+    can_skip = (
+        bool(saved_state.get('knowledge_base')) and is_fresh(artifacts, 'knowledge_base', kb_inputs)
+        and (bool(saved_state.get('modules')) or not Config.MODULES_MODE)
+    )
+    record_cache("artifacts", hit=can_skip)
+    if can_skip:
+        knowledge_base = to_handle(repo_path, saved_state['knowledge_base'])
+        logger.info(f"  → Resuming: Using existing knowledge base")
+        logger.info(f"  ✓ Loaded knowledge base ({text_size(knowledge_base)} chars)")
 
         outline = saved_state.get('lesson_outline', [])
-        print(f"  ✓ Loaded lesson outline ({len(outline)} lessons):")
+        modules = saved_state.get('modules', []) if Config.MODULES_MODE else []
+        logger.info(f"  ✓ Loaded lesson outline ({len(outline)} lessons"
+                    + (f" in {len(modules)} modules" if modules else "") + "):")
         for i, lesson in enumerate(outline, 1):
-            print(f"     {i}. {lesson}")
-        print(f"  → Skipping Claude synthesis\n")
+            logger.info(f"     {i}. {lesson}")
+        logger.info(f"  → Skipping Claude synthesis\n")
+
+        # Courses from before the knowledge index are added on their next run
+        if Config.REUSE_ENABLED and not is_indexed(repo_path, content_hash(artifacts, 'knowledge_base')):
+            index_course(
+                repo_path, topic,
+                get_text(state['raw_notes'], repo_path),
+                get_text(knowledge_base, repo_path),
+                state.get('research_sources', []),
+                content_hash(artifacts, 'knowledge_base')
+            )
 
         return {
-            "knowledge_base": saved_state.get('knowledge_base', ''),
-            "lesson_outline": outline
+            "knowledge_base": knowledge_base,
+            "lesson_outline": outline,
+            "modules": modules
         }
 
     # Perform new synthesis
-    print(f"  → Calling Claude Sonnet-4 for synthesis...")
+    logger.info(f"  → Calling Claude Sonnet-4 for synthesis...")
 
-    # Truncate raw notes if needed
+    # Minify, then truncate raw notes if needed
+    raw_notes, url_refs = minify_for_prompt(get_text(state['raw_notes'], repo_path), "raw research notes")
     truncated_notes, was_truncated = smart_truncate_for_prompt(
         raw_notes,
         Config.MAX_TOKENS_FOR_RAW_NOTES,
         "Raw research notes"
     )
 
-    system_prompt, user_prompt = format_synthesis_prompt(
-        topic=topic,
-        raw_notes=truncated_notes
-    )
+    if Config.MODULES_MODE:
+        # Module outline, then one synthesis request per module
+        knowledge_base, lesson_outline, modules = synthesize_modules(
+            topic, raw_notes, truncated_notes, url_refs, raw_notes_hash, repo_path, saved_state, artifacts
+        )
+    else:
+        modules = []
+        if Config.REFRESH_MODE and saved_state.get('knowledge_base'):
+            # Update the existing knowledge base so unaffected sections (and the
+            # lessons written from them) stay as they are
+            logger.info(f"  → Refresh: updating the existing knowledge base")
+            current_kb, _ = smart_truncate_for_prompt(
+                get_text(saved_state['knowledge_base'], repo_path),
+                Config.MAX_TOKENS_FOR_KNOWLEDGE_BASE,
+                "Current knowledge base"
+            )
+            system_prompt, user_prompt = format_synthesis_update_prompt(
+                topic=topic,
+                knowledge_base=current_kb,
+                raw_notes=truncated_notes
+            )
+        else:
+            system_prompt, user_prompt = format_synthesis_prompt(
+                topic=topic,
+                raw_notes=truncated_notes
+            )
 
-    knowledge_base = call_claude(
-        system_prompt,
-        user_prompt,
-        temperature=1.0,
-        max_tokens=16000
-    )
+        if Config.BATCH_MODE and Config.BATCH_SYNTHESIS:
+            def save_pending(pending_batch: dict):
+                save_state(repo_path, {
+                    "topic": state['topic'],
+                    "target_audience": state['target_audience'],
+                    "research_sources": state.get('research_sources', []),
+                    "raw_notes": state['raw_notes'],
+                    "search_results": state.get('search_results'),
+                    "lessons": existing_lessons,
+                    "artifacts": artifacts,
+                    "pending_batch": pending_batch
+                })
 
-    print(f"  ✓ Generated knowledge base ({len(knowledge_base)} chars)")
+            results = run_claude_batch(
+                {"knowledge_base": (system_prompt, user_prompt)},
+                temperature=1.0,
+                max_tokens=16000,
+                pending=saved_state.get('pending_batch'),
+                on_submitted=save_pending
+            )
+            knowledge_base = results["knowledge_base"]
+            if knowledge_base is None:
+                raise RuntimeError("Claude API call failed: synthesis batch request did not succeed")
+        else:
+            knowledge_base = call_claude(
+                system_prompt,
+                user_prompt,
+                temperature=1.0,
+                max_tokens=16000
+            )
 
-    # Extract lesson outline from the synthesis
-    lesson_outline = extract_lesson_outline(knowledge_base)
-    print(f"  ✓ Extracted lesson outline ({len(lesson_outline)} lessons):")
-    for i, lesson in enumerate(lesson_outline, 1):
-        print(f"     {i}. {lesson}")
+        knowledge_base = expand_url_refs(knowledge_base, url_refs)
+        logger.info(f"  ✓ Generated knowledge base ({len(knowledge_base)} chars)")
 
-    print()
+        # Extract lesson outline from the synthesis
+        lesson_outline = extract_lesson_outline(knowledge_base)
+        logger.info(f"  ✓ Extracted lesson outline ({len(lesson_outline)} lessons):")
+        for i, lesson in enumerate(lesson_outline, 1):
+            logger.info(f"     {i}. {lesson}")
+
+    artifacts['knowledge_base'] = make_record(kb_inputs, knowledge_base)
+    knowledge_base_handle = put_text(repo_path, knowledge_base)
 
     # Save state for resume
-    repo_path = Path(repo_info['path'])
     current_state = {
         "topic": state['topic'],
         "target_audience": state['target_audience'],
         "research_sources": state.get('research_sources', []),
-        "raw_notes": raw_notes,
-        "knowledge_base": knowledge_base,
-        "lesson_outline": lesson_outline
+        "raw_notes": state['raw_notes'],
+        "search_results": state.get('search_results'),
+        "knowledge_base": knowledge_base_handle,
+        "lesson_outline": lesson_outline,
+        "modules": modules,
+        "lessons": existing_lessons,
+        "artifacts": artifacts
     }
     save_state(repo_path, current_state)
 
+    # Make this course's research reusable by related courses
+    if Config.REUSE_ENABLED:
+        index_course(
+            repo_path, topic,
+            get_text(state['raw_notes'], repo_path),
+            knowledge_base,
+            state.get('research_sources', []),
+            artifacts['knowledge_base']['hash']
+        )
+
     return {
-        "knowledge_base": knowledge_base,
-        "lesson_outline": lesson_outline
+        "knowledge_base": knowledge_base_handle,
+        "lesson_outline": lesson_outline,
+        "modules": modules,
+        "artifacts": artifacts
     }
+
+
+def synthesize_modules(
+    topic: str,
+    raw_notes: str,
+    truncated_notes: str,
+    url_refs: dict,
+    raw_notes_hash: str,
+    repo_path: Path,
+    saved_state: dict,
+    artifacts: dict
+) -> tuple:
+    """
+    Synthesize the knowledge base module by module (module mode).
+
+    The module outline is planned from the (truncated) notes; then every
+    module's knowledge base is synthesized concurrently from the notes
+    relevant to it. A module whose notes and outline are unchanged keeps
+    its saved knowledge base, and a refresh keeps the saved module outline.
+
+    Args:
+        topic: Course topic
+        raw_notes: Minified research notes
+        truncated_notes: The notes truncated for a single prompt
+        url_refs: URL references to expand in the output (see prompt_minify)
+        raw_notes_hash: Content hash of the research notes
+        repo_path: Course directory
+        saved_state: Previously saved state
+        artifacts: Artifact records (module records are updated in place)
+
+    Returns:
+        Tuple of (combined knowledge base, lesson outline, modules)
+    """
+    saved_modules = saved_state.get('modules') or []
+    outline_inputs = module_outline_inputs(raw_notes_hash, topic)
+
+    if saved_modules and (Config.REFRESH_MODE or is_fresh(artifacts, 'module_outline', outline_inputs)):
+        outline = [{"title": m["title"], "summary": m["summary"]} for m in saved_modules]
+        logger.info(f"  → Using the saved module outline")
+    else:
+        system_prompt, user_prompt = format_module_outline_prompt(topic, truncated_notes, Config.MODULE_MAX_COUNT)
+        outline = extract_module_outline(
+            call_claude(system_prompt, user_prompt, temperature=1.0, max_tokens=2000)
+        )[:Config.MODULE_MAX_COUNT]
+    artifacts['module_outline'] = make_record(outline_inputs, outline)
+
+    logger.info(f"  ✓ Module outline ({len(outline)} modules):")
+    for number, module in enumerate(outline, 1):
+        logger.info(f"     {number}. {module['title']} - {module['summary']}")
+
+    def synthesize(number: int) -> tuple:
+        module = outline[number - 1]
+        notes = module_notes(raw_notes, topic, module, Config.MODULE_NOTES_MAX_TOKENS)
+        inputs_hash = module_inputs(hash_text(notes), topic, outline, number)
+        saved = saved_modules[number - 1] if number <= len(saved_modules) else {}
+
+        if saved.get('knowledge_base') and is_fresh(artifacts, f"module_{number:02d}", inputs_hash):
+            logger.info(f"  → Module {number}/{len(outline)} is up to date: {module['title']}")
+            return get_text(saved['knowledge_base'], repo_path), saved.get('lessons', []), artifacts[f"module_{number:02d}"]
+
+        logger.info(f"  → Synthesizing module {number}/{len(outline)}: {module['title']}")
+        notes, _ = smart_truncate_for_prompt(notes, Config.MODULE_NOTES_MAX_TOKENS, f"Notes of module {number}")
+        system_prompt, user_prompt = format_module_synthesis_prompt(topic, outline, number, notes)
+        knowledge_base = expand_url_refs(
+            call_claude(system_prompt, user_prompt, temperature=1.0, max_tokens=16000), url_refs
+        )
+        logger.info(f"  ✓ Module {number}: generated knowledge base ({len(knowledge_base)} chars)")
+        return knowledge_base, extract_lesson_outline(knowledge_base), make_record(inputs_hash, knowledge_base)
+
+    workers = max(1, min(Config.MODULE_CONCURRENCY, len(outline)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Modules run under the same course/step deadlines as the caller
+        results = list(executor.map(propagate(synthesize), range(1, len(outline) + 1)))
+
+    modules = []
+    lesson_outline = []
+    for number, (module, (knowledge_base, lessons, record)) in enumerate(zip(outline, results), 1):
+        artifacts[f"module_{number:02d}"] = record
+        modules.append({**module, "knowledge_base": put_text(repo_path, knowledge_base), "lessons": lessons})
+        lesson_outline.extend(lessons)
+
+    # Modules dropped from the outline leave no records behind
+    for name in [n for n in artifacts if n.startswith("module_") and n[7:].isdigit() and int(n[7:]) > len(outline)]:
+        del artifacts[name]
+
+    knowledge_base = combine_knowledge_bases(outline, [result[0] for result in results])
+    logger.info(f"  ✓ Combined knowledge base ({len(knowledge_base)} chars)")
+    logger.info(f"  ✓ Lesson outline ({len(lesson_outline)} lessons):")
+    number = 0
+    for module in modules:
+        logger.info(f"     {module['title']}:")
+        for lesson in module['lessons']:
+            number += 1
+            logger.info(f"       {number}. {lesson}")
+
+    return knowledge_base, lesson_outline, modules
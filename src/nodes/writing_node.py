@@ -5,16 +5,61 @@ Uses Claude to write complete, high-quality lessons.
 This is one of the two main Claude nodes.
 
 Writes lessons to files immediately as they are generated.
-Can resume from existing lessons - only writes missing ones.
+Can resume from existing lessons - only writes missing or stale ones.
+Lessons written one per request are streamed through a structural
+validator and retried if they come back malformed (STREAM_VALIDATION, see
+src/tools/stream_validation.py).
+
+In refresh mode (REFRESH_MODE / --refresh) a lesson written from the
+previous knowledge base is kept if the knowledge base sections it is built
+from are unchanged in the updated one.
+
+In packing mode (LESSON_PACKING / --pack-lessons) consecutive pending
+lessons are written several per request, so the knowledge base is sent
+once per pack; the response is split on delimiter lines and lessons that
+come back malformed are retried one by one.
+
+In batch mode (BATCH_MODE / --batch) all pending lessons are submitted as
+one provider batch job; the job ID is saved in the state file so an
+interrupted run resumes polling it instead of resubmitting.
+
+In section-parallel mode (SECTION_PARALLEL / --section-parallel) each lesson
+is planned as a short skeleton, its sections are written concurrently with
+the skeleton as shared context and then stitched together.
+
+In module mode (MODULES_MODE / --modules) every module's lessons are
+written from the module's own knowledge base into its numbered folder
+(lessons/01-Fundamentals/...), with the modules running in parallel.
 """
 
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from src.models import AgentState
 from src.tools.llm_client import call_claude
-from src.prompts import format_lecture_prompt
-from src.tools.state_persistence import load_existing_lessons, save_state
+from src.tools.batch_client import run_claude_batch
+from src.tools.stream_validation import LessonStreamValidator
+from src.prompts import (
+    LESSON_SECTIONS,
+    format_lecture_prompt,
+    format_lesson_pack_prompt,
+    format_section_prompt,
+    format_skeleton_prompt,
+)
+from src.tools.state_persistence import find_existing_lessons, save_state
 from src.tools.token_utils import smart_truncate_for_prompt
+from src.tools.prompt_minify import expand_url_refs, minify_for_prompt
+from src.tools.artifacts import content_hash, hash_text, is_fresh, lesson_inputs, make_record
+from src.tools.blob_store import file_handle, get_text
+from src.tools.deadlines import deadline_scope, propagate
+from src.tools.metrics import LESSONS, record_cache
+from src.tools.refresh import lesson_sections_hash
+from src.tools.modules import module_dir_name
 from src.config import Config
+from src.tools.log import get_logger
+
+logger = get_logger(__name__)
 
 
 def writing_node(state: AgentState) -> dict:
@@ -24,108 +69,444 @@ def writing_node(state: AgentState) -> dict:
     This is a CORE CLAUDE TASK - pedagogical writing at the highest quality.
 
     Writes each lesson to a file immediately after generation so progress is saved.
-    Skips lessons that already exist on disk.
+    Skips lessons that already exist on disk and were written from the
+    current knowledge base, title, audience, model and prompts.
+
+    In module mode each lesson is written from its module's knowledge base
+    into the module's folder, and the modules are written in parallel.
 
     Args:
         state: Current agent state
 
     Returns:
-        Dictionary with lessons update
+        Dictionary with lessons update (lesson key → file handle)
     """
-    print("\n[Step 4] Writing lessons with Claude...")
+    logger.info("\n[Step 4] Writing lessons with Claude...")
 
     topic = state['topic']
     target_audience = state['target_audience']
+    language = state.get('language')
     knowledge_base = state['knowledge_base']
     lesson_outline = state['lesson_outline']
+    modules = state.get('modules') or []
     repo_info = state['repo_info']
 
     # Get lessons directory from repo_info
     lessons_dir = Path(repo_info['lessons_dir'])
     repo_path = Path(repo_info['path'])
 
-    # Load existing lessons
-    existing_lessons = load_existing_lessons(repo_path)
+    # Find existing lessons (their content is not loaded)
+    resume_info = repo_info.get('resume_info', {})
+    existing_lessons = resume_info.get('lessons')
+    if existing_lessons is None:
+        existing_lessons = find_existing_lessons(repo_path, repo_info.get('saved_state', {}).get('lessons'))
 
     if existing_lessons:
-        print(f"  → Found {len(existing_lessons)} existing lessons")
+        logger.info(f"  → Found {len(existing_lessons)} existing lessons")
         for lesson_key in sorted(existing_lessons.keys()):
-            print(f"     ✓ {lesson_key}")
+            logger.info(f"     ✓ {lesson_key}")
+
+    artifacts = dict(state.get('artifacts') or {})
+    by_sections = Config.SECTION_PARALLEL and not Config.BATCH_MODE
+    kb_hash = content_hash(artifacts, 'knowledge_base') or hash_text(get_text(knowledge_base, repo_path))
+
+    # Knowledge bases the lessons are written from: the course's, or one per module
+    if modules:
+        units = [
+            (
+                module['knowledge_base'],
+                content_hash(artifacts, f"module_{number:02d}") or hash_text(get_text(module['knowledge_base'], repo_path))
+            )
+            for number, module in enumerate(modules, 1)
+        ]
+    else:
+        units = [(knowledge_base, kb_hash)]
+
+    # Refresh: lessons written from the previous knowledge base are kept if
+    # the sections they are built from did not change (modules that did not
+    # change keep their lessons anyway)
+    previous_kb = None
+    saved_state = repo_info.get('saved_state', {})
+    previous_kb_hash = content_hash(saved_state.get('artifacts') or {}, 'knowledge_base')
+    if (Config.REFRESH_MODE and not modules and previous_kb_hash and previous_kb_hash != kb_hash
+            and saved_state.get('knowledge_base')):
+        try:
+            current_kb = get_text(knowledge_base, repo_path)
+            previous_kb = get_text(saved_state['knowledge_base'], repo_path)
+        except Exception as e:
+            logger.warning(f"  ⚠ Could not load the previous knowledge base ({e}) - stale lessons are rewritten")
 
     lessons = {}
+    pending = {unit: [] for unit in range(len(units))}
     skipped_count = 0
-    written_count = 0
+    kept_count = 0
 
-    for i, lesson_title in enumerate(lesson_outline, 1):
-        lesson_key = f"lesson_{i:02d}_{sanitize_filename(lesson_title)}"
+    for i, lesson_title, lesson_key, unit in lesson_entries(lesson_outline, modules):
+        unit_kb_hash = units[unit][1]
+        inputs_hash = lesson_inputs(unit_kb_hash, topic, target_audience, lesson_title, language)
 
-        # Check if lesson already exists
+        # Check if lesson already exists and is up to date
         if lesson_key in existing_lessons:
-            print(f"  → Skipping lesson {i}/{len(lesson_outline)}: {lesson_title} (already exists)")
-            lessons[lesson_key] = existing_lessons[lesson_key]
-            skipped_count += 1
-            continue
+            if is_fresh(artifacts, lesson_key, inputs_hash, upstream_hash=unit_kb_hash):
+                logger.info(f"  → Skipping lesson {i}/{len(lesson_outline)}: {lesson_title} (already exists)")
+                lessons[lesson_key] = existing_lessons[lesson_key]
+                skipped_count += 1
+                LESSONS.inc(outcome="skipped")
+                record_cache("artifacts", hit=True)
+                continue
+            if previous_kb is not None and is_fresh(
+                artifacts, lesson_key,
+                lesson_inputs(previous_kb_hash, topic, target_audience, lesson_title, language),
+                upstream_hash=previous_kb_hash
+            ) and lesson_sections_hash(previous_kb, lesson_title) == lesson_sections_hash(current_kb, lesson_title):
+                logger.info(f"  → Keeping lesson {i}/{len(lesson_outline)}: {lesson_title} (its knowledge base sections are unchanged)")
+                artifacts[lesson_key] = {
+                    "inputs": inputs_hash,
+                    "hash": artifacts[lesson_key].get("hash") or existing_lessons[lesson_key].get("sha256")
+                }
+                lessons[lesson_key] = existing_lessons[lesson_key]
+                kept_count += 1
+                LESSONS.inc(outcome="skipped")
+                record_cache("artifacts", hit=True)
+                continue
+            logger.info(f"  → Lesson {i}/{len(lesson_outline)} is stale: {lesson_title}")
+
+        record_cache("artifacts", hit=False)
+        pending[unit].append((i, lesson_title, lesson_key, inputs_hash))
+
+    # Modules write concurrently; lessons and state are updated under a lock
+    lock = threading.RLock()
 
-        # Write new lesson
-        print(f"  → Writing lesson {i}/{len(lesson_outline)}: {lesson_title}")
+    def save_progress(pending_batch: dict = None):
+        """Save state so an interrupted run can resume."""
+        with lock:
+            save_state(repo_path, {
+                "topic": topic,
+                "target_audience": target_audience,
+                "language": language,
+                "research_sources": state.get('research_sources', []),
+                "raw_notes": state.get('raw_notes'),
+                "search_results": state.get('search_results'),
+                "knowledge_base": knowledge_base,
+                "lesson_outline": lesson_outline,
+                "modules": modules,
+                "lessons": dict(lessons),
+                "artifacts": artifacts,
+                "pending_batch": pending_batch
+            })
+
+    def store_lesson(lesson_title: str, lesson_key: str, inputs_hash: str, lesson_content: str):
+        """Write a finished lesson to disk immediately and record it."""
+        lesson_content = expand_url_refs(lesson_content, url_refs[lesson_key])
+        lesson_path = lessons_dir / f"{lesson_key}.md"
+        lesson_path.parent.mkdir(parents=True, exist_ok=True)
+        lesson_path.write_text(lesson_content, encoding='utf-8')
 
-        # Truncate knowledge base if needed for this lesson
-        truncated_kb, was_truncated = smart_truncate_for_prompt(
-            knowledge_base,
+        with lock:
+            artifacts[lesson_key] = make_record(inputs_hash, lesson_content)
+            lessons[lesson_key] = file_handle(repo_path, lesson_path, text=lesson_content)
+
+        LESSONS.inc(outcome="written")
+        logger.info(f"  ✓ Completed: {lesson_title} ({len(lesson_content)} chars)")
+        logger.info(f"  ✓ Saved to: {lesson_path}")
+
+    if kept_count:
+        # Record the kept lessons as built from the new knowledge base
+        save_progress()
+
+    # Packs of several lessons per request; lessons left alone are written singly
+    packs = {unit: [] for unit in pending}
+    if Config.LESSON_PACKING and not Config.BATCH_MODE and not by_sections:
+        packs = {unit: [pack for pack in pack_lessons(unit_pending) if len(pack) > 1]
+                 for unit, unit_pending in pending.items()}
+
+    lesson_prompts = {}
+    truncated_kbs = {}
+    url_refs = {}
+    for unit, unit_pending in pending.items():
+        if not unit_pending:
+            continue
+        # Minify, then truncate knowledge base if needed (same for every lesson)
+        prompts_per_lesson = 1 + len(LESSON_SECTIONS) if by_sections else 1
+        prompt_count = len(unit_pending) * prompts_per_lesson - sum(len(pack) - 1 for pack in packs[unit])
+        minified_kb, unit_url_refs = minify_for_prompt(
+            get_text(units[unit][0], repo_path),
+            f"knowledge base of module {unit + 1}" if modules else "knowledge base",
+            prompt_count=prompt_count
+        )
+        truncated_kbs[unit], was_truncated = smart_truncate_for_prompt(
+            minified_kb,
             Config.MAX_TOKENS_FOR_KNOWLEDGE_BASE,
-            f"Knowledge base for lesson {i}"
+            "Knowledge base for lessons"
         )
 
-        # Call Claude for each lesson
-        system_prompt, user_prompt = format_lecture_prompt(
-            topic=topic,
-            lesson_title=lesson_title,
-            target_audience=target_audience,
-            knowledge_base=truncated_kb
-        )
+        for i, lesson_title, lesson_key, inputs_hash in unit_pending:
+            url_refs[lesson_key] = unit_url_refs
+            lesson_prompts[lesson_key] = format_lecture_prompt(
+                topic=topic,
+                lesson_title=lesson_title,
+                target_audience=target_audience,
+                knowledge_base=truncated_kbs[unit],
+                language=language
+            )
+
+    all_pending = sorted(lesson for unit_pending in pending.values() for lesson in unit_pending)
+    written_count = 0
 
-        lesson_content = call_claude(
-            system_prompt,
-            user_prompt,
+    if Config.BATCH_MODE and all_pending:
+        # Submit all lessons as one batch job (or resume the one already submitted);
+        # run_claude_batch maps the lesson keys to provider-safe request IDs
+        logger.info(f"  → Generating {len(all_pending)} lessons as a batch job...")
+        results = run_claude_batch(
+            lesson_prompts,
             temperature=1.0,
-            max_tokens=16000
+            max_tokens=16000,
+            pending=repo_info.get('saved_state', {}).get('pending_batch'),
+            on_submitted=save_progress
         )
 
-        # Store lesson
-        lessons[lesson_key] = lesson_content
+        for i, lesson_title, lesson_key, inputs_hash in all_pending:
+            lesson_content = results.get(lesson_key)
+            if lesson_content is None:
+                logger.warning(f"  ⚠ No batch result for lesson {i}: {lesson_title} - will retry on next run")
+                continue
+            store_lesson(lesson_title, lesson_key, inputs_hash, lesson_content)
+            written_count += 1
 
-        # Write to file immediately
-        lesson_path = lessons_dir / f"{lesson_key}.md"
-        lesson_path.write_text(lesson_content, encoding='utf-8')
+        save_progress()
+    else:
+        def write_unit(unit: int) -> int:
+            """Write one knowledge base's pending lessons; return how many were written."""
+            written = 0
+            single = [lesson for lesson in pending[unit] if not any(lesson in pack for pack in packs[unit])]
+            for pack in packs[unit]:
+                logger.info(
+                    f"  → Writing lessons {pack[0][0]}-{pack[-1][0]}/{len(lesson_outline)} as one request: "
+                    + ", ".join(lesson_title for _, lesson_title, _, _ in pack)
+                )
+                results = write_lesson_pack(
+                    topic, [lesson_title for _, lesson_title, _, _ in pack], target_audience,
+                    truncated_kbs[unit], language
+                )
+                for n, (i, lesson_title, lesson_key, inputs_hash) in enumerate(pack, 1):
+                    if n not in results:
+                        logger.warning(f"  ⚠ Lesson {i} came back malformed from its pack - retrying it alone: {lesson_title}")
+                        single.append((i, lesson_title, lesson_key, inputs_hash))
+                        continue
+                    store_lesson(lesson_title, lesson_key, inputs_hash, results[n])
+                    written += 1
+
+                # Save state after each pack
+                save_progress()
+
+            for i, lesson_title, lesson_key, inputs_hash in sorted(single):
+                logger.info(f"  → Writing lesson {i}/{len(lesson_outline)}: {lesson_title}")
+
+                if by_sections:
+                    lesson_content = write_lesson_by_sections(
+                        topic, lesson_title, target_audience, truncated_kbs[unit], language
+                    )
+                else:
+                    # Call Claude for each lesson
+                    system_prompt, user_prompt = lesson_prompts[lesson_key]
+                    lesson_content = call_claude(
+                        system_prompt,
+                        user_prompt,
+                        temperature=1.0,
+                        max_tokens=16000,
+                        make_validator=lambda: LessonStreamValidator(LESSON_SECTIONS, language)
+                    )
+
+                store_lesson(lesson_title, lesson_key, inputs_hash, lesson_content)
+                written += 1
+
+                # Save state after each lesson
+                save_progress()
+            return written
 
-        print(f"  ✓ Completed: {lesson_title} ({len(lesson_content)} chars)")
-        print(f"  ✓ Saved to: {lesson_path}")
-        written_count += 1
-
-        # Save state after each lesson
-        current_state = {
-            "topic": topic,
-            "target_audience": target_audience,
-            "research_sources": state.get('research_sources', []),
-            "raw_notes": state.get('raw_notes', ''),
-            "knowledge_base": knowledge_base,
-            "lesson_outline": lesson_outline,
-            "lessons": list(lessons.keys())
-        }
-        save_state(repo_path, current_state)
-
-    print(f"\n  ✓ Summary:")
+        active = [unit for unit, unit_pending in pending.items() if unit_pending]
+        if len(active) > 1:
+            logger.info(f"  → Writing {len(active)} modules in parallel")
+            workers = max(1, min(Config.MODULE_CONCURRENCY, len(active)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # Modules run under the same course/step deadlines as the caller
+                written_count = sum(executor.map(propagate(write_unit), active))
+        else:
+            written_count = sum(write_unit(unit) for unit in active)
+
+    logger.info(f"\n  ✓ Summary:")
     if skipped_count > 0:
-        print(f"     Skipped: {skipped_count} existing lessons")
+        logger.info(f"     Skipped: {skipped_count} existing lessons")
+    if kept_count > 0:
+        logger.info(f"     Kept: {kept_count} lessons with unchanged knowledge base sections")
     if written_count > 0:
-        print(f"     Written: {written_count} new lessons")
-    print(f"     Total: {len(lessons)} lessons\n")
+        logger.info(f"     Written: {written_count} new lessons")
+    logger.info(f"     Total: {len(lessons)} lessons\n")
 
     return {
-        "lessons": lessons
+        "lessons": dict(sorted(lessons.items())),
+        "artifacts": artifacts
     }
 
 
+def lesson_entries(lesson_outline: list, modules: list = None) -> list:
+    """
+    Number, title, key and knowledge base unit of every lesson of a course.
+
+    Lessons are numbered across the whole course. In module mode a lesson's
+    key includes its module folder (e.g. "02-Core-Concepts/lesson_04_...")
+    and its unit is the module's position (from 0); otherwise every lesson
+    belongs to unit 0.
+
+    Args:
+        lesson_outline: Lesson titles in course order
+        modules: Modules with their "lessons" (module mode only)
+
+    Returns:
+        List of (number, title, key, unit) tuples
+    """
+    if not modules:
+        return [
+            (i, lesson_title, f"lesson_{i:02d}_{sanitize_filename(lesson_title)}", 0)
+            for i, lesson_title in enumerate(lesson_outline, 1)
+        ]
+
+    entries = []
+    for unit, module in enumerate(modules):
+        folder = module_dir_name(unit + 1, module['title'])
+        for lesson_title in module['lessons']:
+            i = len(entries) + 1
+            entries.append((i, lesson_title, f"{folder}/lesson_{i:02d}_{sanitize_filename(lesson_title)}", unit))
+    return entries
+
+
+def pack_lessons(pending: list) -> list:
+    """
+    Group pending lessons into packs of consecutive outline entries.
+
+    A pack holds as many lessons as fit LESSON_PACK_MAX_TOKENS of output at
+    LESSON_PACK_TOKENS_PER_LESSON each; a gap in the outline (a lesson that
+    is already written) starts a new pack.
+
+    Args:
+        pending: (number, title, key, inputs_hash) tuples in outline order
+
+    Returns:
+        List of packs (lists of the same tuples)
+    """
+    size = max(1, Config.LESSON_PACK_MAX_TOKENS // max(1, Config.LESSON_PACK_TOKENS_PER_LESSON))
+    packs = []
+    for lesson in pending:
+        if packs and len(packs[-1]) < size and packs[-1][-1][0] == lesson[0] - 1:
+            packs[-1].append(lesson)
+        else:
+            packs.append([lesson])
+    return packs
+
+
+def write_lesson_pack(
+    topic: str,
+    lesson_titles: list,
+    target_audience: str,
+    knowledge_base: str,
+    language: str = None
+) -> dict:
+    """
+    Write several lessons in one request and split the response.
+
+    Args:
+        topic: Course topic
+        lesson_titles: Titles of consecutive lessons
+        target_audience: Description of the target audience
+        knowledge_base: Knowledge base text (already truncated for prompts)
+        language: Optional language to write the lessons in
+
+    Returns:
+        Dictionary mapping position in the pack (from 1) to lesson Markdown,
+        for the lessons that came back well-formed
+    """
+    system_prompt, user_prompt = format_lesson_pack_prompt(
+        topic, lesson_titles, target_audience, knowledge_base, language
+    )
+    # The request produces several lessons, so it gets the call time of several
+    with deadline_scope(call_timeout=Config.CALL_TIMEOUT * len(lesson_titles)):
+        response = call_claude(system_prompt, user_prompt, temperature=1.0, max_tokens=Config.LESSON_PACK_MAX_TOKENS)
+    return split_lesson_pack(response, len(lesson_titles))
+
+
+_PACK_LESSON_RE = re.compile(
+    r'^<<<LESSON (\d+)>>>[ \t]*\n(.*?)^<<<END LESSON \1>>>[ \t]*$',
+    re.MULTILINE | re.DOTALL
+)
+
+
+def split_lesson_pack(response: str, count: int) -> dict:
+    """
+    Split a packed response into lessons.
+
+    A lesson is malformed (and left out) if its markers are missing, e.g.
+    because the response was cut off, or if it has no Markdown heading.
+
+    Args:
+        response: Model output with <<<LESSON n>>> ... <<<END LESSON n>>> blocks
+        count: Number of lessons requested
+
+    Returns:
+        Dictionary mapping lesson position (from 1) to lesson Markdown
+    """
+    lessons = {}
+    for match in _PACK_LESSON_RE.finditer(response):
+        n = int(match.group(1))
+        content = match.group(2).strip()
+        if 1 <= n <= count and n not in lessons and re.search(r'^#', content, re.MULTILINE):
+            lessons[n] = content + "\n"
+    return lessons
+
+
+def write_lesson_by_sections(
+    topic: str,
+    lesson_title: str,
+    target_audience: str,
+    knowledge_base: str,
+    language: str = None
+) -> str:
+    """
+    Write a lesson as a skeleton plus concurrently generated sections.
+
+    Args:
+        topic: Course topic
+        lesson_title: Title of the lesson
+        target_audience: Description of the target audience
+        knowledge_base: Knowledge base text (already truncated for prompts)
+        language: Optional language to write the lesson in
+
+    Returns:
+        The stitched lesson in Markdown
+    """
+    system_prompt, user_prompt = format_skeleton_prompt(
+        topic, lesson_title, target_audience, knowledge_base, language
+    )
+    skeleton = call_claude(system_prompt, user_prompt, temperature=1.0, max_tokens=Config.SKELETON_MAX_TOKENS)
+    logger.info(f"     ✓ Skeleton ({len(skeleton)} chars) - writing {len(LESSON_SECTIONS)} sections in parallel")
+
+    def write_section(section: str) -> str:
+        system_prompt, user_prompt = format_section_prompt(
+            topic, lesson_title, target_audience, knowledge_base, skeleton, section, language
+        )
+        content = call_claude(system_prompt, user_prompt, temperature=1.0, max_tokens=Config.SECTION_MAX_TOKENS)
+        content = content.strip()
+        if not content.startswith("#"):
+            content = f"## {section}\n\n{content}"
+        return content
+
+    workers = max(1, min(Config.SECTION_CONCURRENCY, len(LESSON_SECTIONS)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Sections run under the same course/step deadlines as the caller
+        sections = list(executor.map(propagate(write_section), LESSON_SECTIONS))
+
+    return f"# {lesson_title}\n\n" + "\n\n".join(sections) + "\n"
+
+
 def sanitize_filename(title: str) -> str:
     """Convert lesson title to a valid filename."""
     # Replace spaces and special characters
@@ -0,0 +1,246 @@
+"""
+Stage-pipelined execution of a batch of courses.
+
+Running courses one after another through the graph leaves each API idle
+most of the time: Tavily and GPT only work during research, Claude during
+synthesis and writing. Here the pipeline nodes are grouped into stages by
+the service they use, each with its own worker pool:
+
+  research (setup → research)  →  synthesis  →  writing  →  publish
+
+While course N is being written, course N+1 is synthesized and course N+2
+researched. Every stage takes work from a bounded queue, so a slow stage
+holds back the stages before it (backpressure) instead of piling up
+finished research. Per-stage utilization, queue waits and time blocked on
+a full queue are measured and logged at the end of the batch.
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from src.config import Config
+from src.graph import create_initial_state, wrap_node
+from src.models import AgentState
+from src.nodes import setup_node, research_node, synthesis_node, writing_node, publish_node
+from src.tools.deadlines import Deadline, DeadlineExceeded
+from src.tools.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class _Course:
+    """A course moving through the stages."""
+
+    def __init__(self, index: int, state: AgentState):
+        self.index = index
+        self.state = state
+        self.deadline: Optional[Deadline] = None
+        self.queued_at = 0.0
+        self.error: Optional[BaseException] = None
+
+
+class CourseResult(NamedTuple):
+    topic: str
+    state: Optional[AgentState]
+    error: Optional[BaseException]
+
+
+_STOP = object()
+
+
+class Stage:
+    """A group of pipeline nodes with a worker pool and a bounded input queue."""
+
+    def __init__(self, name: str, nodes: List[Tuple[str, Callable]], workers: int, queue_size: int):
+        self.name = name
+        self.nodes = nodes
+        self.workers = max(1, workers)
+        self.queue: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+        self.next: Optional["Stage"] = None
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.courses = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.queue_wait_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.max_queue_depth = 0
+
+    def put(self, course: _Course) -> float:
+        """Queue a course for this stage, blocking while the queue is full; return seconds blocked."""
+        start = time.monotonic()
+        course.queued_at = start
+        self.queue.put(course)
+        with self._lock:
+            self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+        return time.monotonic() - start
+
+    def start(self, on_done: Callable[[_Course], None]) -> None:
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, args=(on_done,), name=f"{self.name}-{i + 1}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        """Let the workers finish the queued courses, then wait for them."""
+        for _ in self._threads:
+            self.queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+
+    def _work(self, on_done: Callable[[_Course], None]) -> None:
+        while True:
+            course = self.queue.get()
+            if course is _STOP:
+                return
+
+            started = time.monotonic()
+            waited = started - course.queued_at
+            if course.deadline is None:
+                # The course clock starts when its first stage does
+                course.deadline = Deadline.after(Config.COURSE_TIMEOUT, "course")
+
+            logger.info(f"\n▶ [{self.name}] {course.state['topic']}")
+            try:
+                for name, node in self.nodes:
+                    update = wrap_node(name, node, course.deadline)(course.state)
+                    course.state = {**course.state, **(update or {})}
+            except Exception as e:
+                course.error = e
+            busy = time.monotonic() - started
+
+            blocked = 0.0
+            if course.error is None and self.next:
+                blocked = self.next.put(course)
+            else:
+                on_done(course)
+
+            with self._lock:
+                self.courses += 1
+                self.failed += course.error is not None
+                self.busy_seconds += busy
+                self.queue_wait_seconds += waited
+                self.blocked_seconds += blocked
+
+    def metrics(self, wall_seconds: float) -> Dict[str, Any]:
+        capacity = self.workers * wall_seconds
+        return {
+            "workers": self.workers,
+            "courses": self.courses,
+            "failed": self.failed,
+            "busy_seconds": round(self.busy_seconds, 2),
+            "utilization": round(self.busy_seconds / capacity, 3) if capacity else 0.0,
+            "avg_queue_wait_seconds": round(self.queue_wait_seconds / self.courses, 2) if self.courses else 0.0,
+            "blocked_seconds": round(self.blocked_seconds, 2),
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+
+def create_stages(workers: Optional[Dict[str, int]] = None, queue_size: int = None) -> List[Stage]:
+    """
+    Create the stages of the course pipeline.
+
+    Args:
+        workers: Worker count per stage name (default PIPELINE_<STAGE>_WORKERS)
+        queue_size: Courses that may wait in front of each stage (default PIPELINE_QUEUE_SIZE)
+
+    Returns:
+        Linked stages: research → synthesis → writing → publish
+    """
+    workers = {
+        "research": Config.PIPELINE_RESEARCH_WORKERS,
+        "synthesis": Config.PIPELINE_SYNTHESIS_WORKERS,
+        "writing": Config.PIPELINE_WRITING_WORKERS,
+        "publish": Config.PIPELINE_PUBLISH_WORKERS,
+        **(workers or {}),
+    }
+    if queue_size is None:
+        queue_size = Config.PIPELINE_QUEUE_SIZE
+
+    stages = [
+        Stage("research", [("setup", setup_node), ("research", research_node)], workers["research"], queue_size),
+        Stage("synthesis", [("synthesis", synthesis_node)], workers["synthesis"], queue_size),
+        Stage("writing", [("writing", writing_node)], workers["writing"], queue_size),
+        Stage("publish", [("publish", publish_node)], workers["publish"], queue_size),
+    ]
+    for stage, following in zip(stages, stages[1:]):
+        stage.next = following
+    return stages
+
+
+def run_pipelined(
+    topics: List[str],
+    target_audience: str = "intermediate developers",
+    repo_dir: str = None,
+    workers: Optional[Dict[str, int]] = None,
+    queue_size: int = None
+) -> Tuple[List[CourseResult], Dict[str, Any]]:
+    """
+    Generate a batch of courses with the stages overlapping across courses.
+
+    Args:
+        topics: Course topics (duplicates are run once)
+        target_audience: Description of the target audience
+        repo_dir: Optional directory containing existing repositories to use
+        workers: Worker count per stage name, e.g. {"writing": 2}
+        queue_size: Courses that may wait in front of each stage
+
+    Returns:
+        Tuple of (one result per topic in input order, per-stage metrics)
+    """
+    topics = list(dict.fromkeys(topics))
+    stages = create_stages(workers, queue_size)
+    results: List[Optional[CourseResult]] = [None] * len(topics)
+
+    def on_done(course: _Course):
+        topic = course.state['topic']
+        results[course.index] = CourseResult(topic, None if course.error else course.state, course.error)
+        if course.error is None:
+            logger.info(f"\n✓ Course finished: {topic}")
+        elif isinstance(course.error, DeadlineExceeded):
+            logger.error(f"\n⏱ Course timed out: {topic} ({course.error})")
+        else:
+            logger.error(f"\n❌ Course failed: {topic} ({course.error})")
+
+    start = time.monotonic()
+    for stage in stages:
+        stage.start(on_done)
+
+    intake_blocked = 0.0
+    for index, topic in enumerate(topics):
+        # Blocks while the research queue is full
+        intake_blocked += stages[0].put(_Course(index, create_initial_state(topic, target_audience, repo_dir)))
+
+    for stage in stages:
+        stage.stop()
+    wall_seconds = time.monotonic() - start
+
+    metrics = {
+        "wall_seconds": round(wall_seconds, 2),
+        "intake_blocked_seconds": round(intake_blocked, 2),
+        "stages": {stage.name: stage.metrics(wall_seconds) for stage in stages},
+    }
+    log_pipeline_metrics(metrics)
+    return results, metrics
+
+
+def log_pipeline_metrics(metrics: Dict[str, Any]) -> None:
+    """Log per-stage utilization of a pipelined batch."""
+    logger.info("\n" + "=" * 70)
+    logger.info(f"  PIPELINE STAGES ({metrics['wall_seconds']:.1f}s wall time)")
+    logger.info("=" * 70)
+    logger.info(f"  {'Stage':<10} {'Workers':>7} {'Courses':>7} {'Busy':>9} {'Util':>6} {'Avg wait':>9} {'Blocked':>9}")
+    for name, stage in metrics["stages"].items():
+        logger.info(
+            f"  {name:<10} {stage['workers']:>7} {stage['courses']:>7} "
+            f"{stage['busy_seconds']:>8.1f}s {stage['utilization']:>6.0%} "
+            f"{stage['avg_queue_wait_seconds']:>8.1f}s {stage['blocked_seconds']:>8.1f}s"
+        )
+    logger.info("  Util: share of the stage's worker time spent working; Avg wait: time queued in")
+    logger.info("  front of the stage; Blocked: time finished courses waited for the next stage's queue")
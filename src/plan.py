@@ -0,0 +1,357 @@
+"""
+Dry-run cost and latency estimation for course generation.
+
+Walks the same steps as the pipeline without calling any LLM or search API:
+- Reuses saved research, knowledge base and lessons where a real run would
+  resume from them (see check_resume_capability)
+- Otherwise stubs search results and model outputs with configured sizes
+- Renders every prompt through the src/prompts.py formatters and counts
+  tokens with token_utils
+- Projects wall time from historical latency stats (src/tools/latency_stats.py)
+  and the configured concurrency
+"""
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config import Config
+from src.prompts import (
+    LESSON_SECTIONS,
+    format_research_synthesis_prompt,
+    format_synthesis_prompt,
+    format_lecture_prompt,
+    format_module_outline_prompt,
+    format_module_synthesis_prompt,
+    format_lesson_pack_prompt,
+    format_section_prompt,
+    format_skeleton_prompt,
+)
+from src.nodes.setup_node import create_topic_slug
+from src.nodes.writing_node import lesson_entries, pack_lessons
+from src.tools.adaptive_search import adaptive_enabled, recorded_search, search_steps
+from src.tools.artifacts import content_hash, hash_text, is_fresh, lesson_inputs
+from src.tools.blob_store import get_text
+from src.tools.latency_stats import get_latency_profile, load_latency_stats
+from src.tools.state_persistence import check_resume_capability, load_state
+from src.tools.prompt_minify import minify_text
+from src.tools.token_utils import count_tokens
+from src.tools.log import get_logger
+
+logger = get_logger(__name__)
+
+
+def _prompt_tokens(prompt: tuple, content_tokens: int) -> int:
+    """Tokens of a rendered (system, user) prompt plus its dynamic content."""
+    system_prompt, user_prompt = prompt
+    return count_tokens(system_prompt) + count_tokens(user_prompt) + content_tokens
+
+
+def _prompt_content_tokens(text: str) -> int:
+    """Tokens of saved content as it will be embedded in prompts (minified if enabled)."""
+    if Config.PROMPT_MINIFY and text:
+        text, _ = minify_text(text)
+    return count_tokens(text)
+
+
+def _llm_seconds(kind: str, model: str, output_tokens: int, stats: dict) -> float:
+    """Projected wall time of one LLM call."""
+    profile = get_latency_profile(kind, model, stats)
+    tokens_per_second = profile[1] if profile and profile[1] else Config.PLAN_DEFAULT_TOKENS_PER_SECOND
+    return Config.PLAN_REQUEST_OVERHEAD_SECONDS + output_tokens / tokens_per_second
+
+
+def _planned_searches(topic: str) -> List[Tuple[str, int]]:
+    """
+    (depth, max_results) of each search research will run.
+
+    With adaptive search these are the searches recorded for the topic, or
+    for a new topic the cheapest step (a lower bound: it may escalate).
+    """
+    if Config.SEARCH_BACKEND == "local":
+        return [("local", Config.TAVILY_MAX_RESULTS)]
+    if not adaptive_enabled():
+        return [(Config.TAVILY_SEARCH_DEPTH, Config.TAVILY_MAX_RESULTS)]
+    recorded = recorded_search(topic)
+    if recorded:
+        return [tuple(step) for step in recorded["steps"]]
+    return search_steps()[:1]
+
+
+def _search_seconds(depth: str, stats: dict) -> float:
+    """Projected wall time of one search."""
+    profile = get_latency_profile("search", depth, stats)
+    return profile[0] if profile else Config.PLAN_DEFAULT_SEARCH_SECONDS
+
+
+def _step(name: str, skipped: bool = False, **requests: int) -> Dict[str, Any]:
+    return {
+        "step": name,
+        "skipped": skipped,
+        "requests": {k: v for k, v in requests.items() if v},
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "seconds": 0.0,
+    }
+
+
+def plan_course(
+    topic: str,
+    target_audience: str = "intermediate developers",
+    repo_dir: str = None,
+    outline: Optional[List[str]] = None,
+    stats: Optional[dict] = None
+) -> Dict[str, Any]:
+    """
+    Estimate tokens, requests and wall time for one course.
+
+    Args:
+        topic: The course topic
+        target_audience: Description of the target audience
+        repo_dir: Optional directory containing existing course directories
+        outline: Lesson titles to plan for (default: saved or estimated outline)
+        stats: Preloaded latency stats (loaded from disk if omitted)
+
+    Returns:
+        Plan dictionary with per-step estimates and totals
+    """
+    if stats is None:
+        stats = load_latency_stats()
+
+    base_path = Path(repo_dir).expanduser().resolve() if repo_dir else Config.OUTPUT_DIR
+    course_dir = base_path / create_topic_slug(topic)
+
+    saved_state = load_state(course_dir)
+    resume_info = check_resume_capability(course_dir, topic, target_audience, saved_state)
+    artifacts = resume_info["artifacts"]
+    steps = []
+
+    # Step 2: Research
+    if resume_info["can_skip_research"]:
+        step = _step("research", skipped=True)
+        raw_notes_tokens = _prompt_content_tokens(get_text(saved_state["raw_notes"], course_dir))
+    else:
+        # Notes rebuilt from the saved search results need no search
+        searches = [] if resume_info["can_reuse_sources"] and not Config.REFRESH_MODE else _planned_searches(topic)
+        step = _step("research", search=len(searches), openai=1)
+        search_tokens = min(
+            max((results for _, results in searches), default=Config.TAVILY_MAX_RESULTS) * Config.PLAN_SEARCH_RESULT_TOKENS,
+            Config.MAX_TOKENS_FOR_RAW_NOTES
+        )
+        prompt = format_research_synthesis_prompt(topic, target_audience, search_results="")
+        step["input_tokens"] = _prompt_tokens(prompt, search_tokens)
+        step["output_tokens"] = raw_notes_tokens = Config.PLAN_RESEARCH_OUTPUT_TOKENS
+        step["seconds"] = sum(_search_seconds(depth, stats) for depth, _ in searches) + _llm_seconds(
+            "openai", Config.OPENAI_MODEL, step["output_tokens"], stats
+        )
+    steps.append(step)
+
+    # Step 3: Synthesis
+    knowledge_base = None
+    if resume_info["can_skip_synthesis"]:
+        step = _step("synthesis", skipped=True)
+        knowledge_base = get_text(saved_state["knowledge_base"], course_dir)
+        kb_tokens = _prompt_content_tokens(knowledge_base)
+        outline = outline or saved_state.get("lesson_outline")
+    elif Config.MODULES_MODE:
+        # Module outline, then the modules concurrently (in waves of MODULE_CONCURRENCY)
+        module_count = len(saved_state.get("modules") or []) or Config.PLAN_DEFAULT_MODULES
+        step = _step("synthesis", claude=1 + module_count)
+        outline_tokens = 500
+        prompt = format_module_outline_prompt(topic, raw_notes="", max_modules=Config.MODULE_MAX_COUNT)
+        step["input_tokens"] = _prompt_tokens(prompt, min(raw_notes_tokens, Config.MAX_TOKENS_FOR_RAW_NOTES))
+        modules_stub = [{"title": "", "summary": ""}] * module_count
+        prompt = format_module_synthesis_prompt(topic, modules_stub, 1, raw_notes="")
+        step["input_tokens"] += module_count * _prompt_tokens(
+            prompt, min(raw_notes_tokens, Config.MODULE_NOTES_MAX_TOKENS)
+        )
+        kb_tokens = Config.PLAN_SYNTHESIS_OUTPUT_TOKENS  # Per module
+        step["output_tokens"] = outline_tokens + module_count * kb_tokens
+        waves = -(-module_count // max(1, Config.MODULE_CONCURRENCY))
+        step["seconds"] = (
+            _llm_seconds("claude", Config.CLAUDE_MODEL, outline_tokens, stats)
+            + waves * _llm_seconds("claude", Config.CLAUDE_MODEL, kb_tokens, stats)
+        )
+    else:
+        step = _step("synthesis", claude=1)
+        prompt = format_synthesis_prompt(topic, raw_notes="")
+        step["input_tokens"] = _prompt_tokens(prompt, min(raw_notes_tokens, Config.MAX_TOKENS_FOR_RAW_NOTES))
+        step["output_tokens"] = kb_tokens = Config.PLAN_SYNTHESIS_OUTPUT_TOKENS
+        step["seconds"] = _llm_seconds("claude", Config.CLAUDE_MODEL, step["output_tokens"], stats)
+    steps.append(step)
+
+    if not outline:
+        outline = [f"Lesson {i}" for i in range(1, Config.PLAN_DEFAULT_LESSONS + 1)]
+
+    # Step 4: Writing
+    step = _step("writing")
+    modules = (saved_state.get("modules") or []) if Config.MODULES_MODE and resume_info["can_skip_synthesis"] else []
+    if modules:
+        # Each lesson is written from its module's knowledge base
+        kb_tokens = max(_prompt_content_tokens(get_text(m["knowledge_base"], course_dir)) for m in modules)
+        kb_hashes = [content_hash(artifacts, f"module_{n:02d}") for n in range(1, len(modules) + 1)]
+    else:
+        kb_hashes = [(content_hash(artifacts, "knowledge_base") or hash_text(knowledge_base)) if knowledge_base else None]
+    kb_prompt_tokens = min(kb_tokens, Config.MAX_TOKENS_FOR_KNOWLEDGE_BASE)
+    lessons_skipped = 0
+    claude_calls = 0
+    by_sections = Config.SECTION_PARALLEL and not Config.BATCH_MODE
+    packing = Config.LESSON_PACKING and not Config.BATCH_MODE and not by_sections
+    pending = []
+    active_units = set()
+
+    for i, lesson_title, lesson_key, unit in lesson_entries(outline, modules):
+        kb_hash = kb_hashes[unit]
+        if kb_hash and lesson_key in resume_info["completed_lessons"] and is_fresh(
+            artifacts, lesson_key,
+            lesson_inputs(kb_hash, topic, target_audience, lesson_title),
+            upstream_hash=kb_hash
+        ):
+            lessons_skipped += 1
+            continue
+
+        active_units.add(unit)
+        if by_sections:
+            # Skeleton, then all sections at once (the slowest one sets the pace)
+            skeleton_tokens = Config.SKELETON_MAX_TOKENS // 2
+            section_tokens = Config.PLAN_LESSON_OUTPUT_TOKENS // len(LESSON_SECTIONS)
+            prompt = format_skeleton_prompt(topic, lesson_title, target_audience, knowledge_base="")
+            step["input_tokens"] += _prompt_tokens(prompt, kb_prompt_tokens)
+            for section in LESSON_SECTIONS:
+                prompt = format_section_prompt(topic, lesson_title, target_audience, "", "", section)
+                step["input_tokens"] += _prompt_tokens(prompt, kb_prompt_tokens + skeleton_tokens)
+            step["output_tokens"] += skeleton_tokens + Config.PLAN_LESSON_OUTPUT_TOKENS
+            step["seconds"] += _llm_seconds("claude", Config.CLAUDE_MODEL, skeleton_tokens, stats)
+            step["seconds"] += _llm_seconds("claude", Config.CLAUDE_MODEL, section_tokens, stats)
+            claude_calls += 1 + len(LESSON_SECTIONS)
+            continue
+
+        pending.append((i, lesson_title, lesson_key, unit))
+
+    if packing:
+        # Packs never span modules
+        packs = [
+            pack for unit in sorted(active_units)
+            for pack in pack_lessons([lesson for lesson in pending if lesson[3] == unit])
+        ]
+    else:
+        packs = [[lesson] for lesson in pending]
+    for pack in packs:
+        # One request per pack, with the knowledge base sent once
+        titles = [lesson_title for _, lesson_title, _, _ in pack]
+        if len(pack) > 1:
+            prompt = format_lesson_pack_prompt(topic, titles, target_audience, knowledge_base="")
+        else:
+            prompt = format_lecture_prompt(topic, titles[0], target_audience, knowledge_base="")
+        output_tokens = Config.PLAN_LESSON_OUTPUT_TOKENS * len(pack)
+        step["input_tokens"] += _prompt_tokens(prompt, kb_prompt_tokens)
+        step["output_tokens"] += output_tokens
+        step["seconds"] += _llm_seconds("claude", Config.CLAUDE_MODEL, output_tokens, stats)
+        claude_calls += 1
+
+    # Modules are written in parallel
+    parallel_modules = len(active_units) if modules else (Config.PLAN_DEFAULT_MODULES if Config.MODULES_MODE else 1)
+    step["seconds"] /= max(1, min(parallel_modules, Config.MODULE_CONCURRENCY))
+    if claude_calls:
+        step["requests"] = {"claude": claude_calls}
+    step["skipped"] = claude_calls == 0
+    step["lessons_skipped"] = lessons_skipped
+    steps.append(step)
+
+    return {
+        "topic": topic,
+        "target_audience": target_audience,
+        "course_dir": str(course_dir),
+        "lessons": len(outline),
+        "steps": steps,
+        "totals": _totals(steps),
+    }
+
+
+def _totals(steps: List[Dict[str, Any]]) -> Dict[str, Any]:
+    requests: Dict[str, int] = {}
+    for step in steps:
+        for kind, count in step["requests"].items():
+            requests[kind] = requests.get(kind, 0) + count
+    return {
+        "requests": requests,
+        "input_tokens": sum(s["input_tokens"] for s in steps),
+        "output_tokens": sum(s["output_tokens"] for s in steps),
+        "seconds": sum(s["seconds"] for s in steps),
+    }
+
+
+def plan_batch(
+    topics: List[str],
+    target_audience: str = "intermediate developers",
+    repo_dir: str = None,
+    outline: Optional[List[str]] = None,
+    concurrency: int = 1
+) -> Dict[str, Any]:
+    """
+    Estimate a batch of courses.
+
+    Wall time assumes `concurrency` courses run at once: the summed course
+    time divided by the concurrency, but never less than the slowest course.
+
+    Args:
+        topics: Course topics
+        target_audience: Description of the target audience
+        repo_dir: Optional directory containing existing course directories
+        outline: Lesson titles to plan for every course
+        concurrency: Number of courses generated in parallel
+
+    Returns:
+        Plan dictionary with per-course plans and batch totals
+    """
+    stats = load_latency_stats()
+    courses = [plan_course(topic, target_audience, repo_dir, outline, stats) for topic in topics]
+    totals = _totals([c["totals"] for c in courses])
+
+    course_seconds = [c["totals"]["seconds"] for c in courses]
+    concurrency = max(1, concurrency)
+    totals["wall_seconds"] = max(sum(course_seconds) / concurrency, max(course_seconds, default=0.0))
+
+    return {
+        "courses": courses,
+        "concurrency": concurrency,
+        "latency_samples": {key: len(samples) for key, samples in stats.items()},
+        "totals": totals,
+    }
+
+
+def log_plan(plan: Dict[str, Any]) -> None:
+    """Log a human-readable summary of a batch plan."""
+    for course in plan["courses"]:
+        logger.info(f"\n{course['topic']}  ({course['lessons']} lessons, {course['course_dir']})")
+        for step in course["steps"]:
+            if step["skipped"]:
+                logger.info(f"  {step['step']:<10} skipped (resumed from saved state)")
+                continue
+            requests = ", ".join(f"{n} {kind}" for kind, n in step["requests"].items())
+            note = f", {step['lessons_skipped']} lessons resumed" if step.get("lessons_skipped") else ""
+            logger.info(
+                f"  {step['step']:<10} {requests:<22} in {step['input_tokens']:>9,}  "
+                f"out {step['output_tokens']:>8,}  ~{_format_seconds(step['seconds'])}{note}"
+            )
+
+    totals = plan["totals"]
+    requests = ", ".join(f"{n} {kind}" for kind, n in totals["requests"].items()) or "none"
+    logger.info("\n" + "=" * 70)
+    logger.info(f"  PLAN: {len(plan['courses'])} course(s), concurrency {plan['concurrency']}")
+    logger.info("=" * 70)
+    logger.info(f"  Requests:      {requests}")
+    logger.info(f"  Input tokens:  {totals['input_tokens']:,}")
+    logger.info(f"  Output tokens: {totals['output_tokens']:,}")
+    logger.info(f"  Wall time:     ~{_format_seconds(totals['wall_seconds'])}")
+    if Config.BATCH_MODE:
+        logger.info(f"  Note: batch mode is on - lesson calls complete within the provider's batch window")
+    if not plan["latency_samples"]:
+        logger.info(f"  Note: no latency history yet - using configured defaults")
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds < 90:
+        return f"{seconds:.0f}s"
+    if seconds < 90 * 60:
+        return f"{seconds / 60:.0f}m"
+    return f"{seconds / 3600:.1f}h"
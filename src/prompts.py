@@ -40,6 +40,74 @@ IMPORTANT: At the end of your response, provide a lesson outline in this exact f
 
 Each lesson title should be clear and progressive."""
 
+# Refresh (--refresh): update an existing knowledge base from new notes
+SYNTHESIS_UPDATE_USER_PROMPT_TEMPLATE = """Topic: {topic}
+
+Current knowledge base:
+{knowledge_base}
+
+Updated raw research notes:
+{raw_notes}
+
+The research behind this knowledge base has changed. Update the knowledge base:
+1. Revise only the sections whose content is outdated, wrong or missing something important according to the updated notes.
+2. Copy every other section verbatim, with the same heading.
+3. Keep the structure and the ## LESSON OUTLINE unchanged unless the updated notes require a new or different lesson.
+
+Output the complete updated knowledge base (Markdown), ending with the ## LESSON OUTLINE."""
+
+# Hierarchical modules (MODULES_MODE): a module outline first, then one
+# knowledge base per module from the notes relevant to it
+MODULE_OUTLINE_USER_PROMPT_TEMPLATE = """Topic: {topic}
+
+Raw research notes:
+{raw_notes}
+
+Divide a complete course on this topic into 2 to {max_modules} modules,
+ordered from fundamentals to advanced. Each module groups closely related
+concepts and is later expanded into several lessons of its own, from the
+research relevant to it, so modules must not overlap.
+
+Output ONLY the module outline, in this exact format:
+## MODULE OUTLINE
+1. [Module title] | [One sentence naming the concepts it covers]
+2. [Module title] | [One sentence naming the concepts it covers]
+...
+
+Keep module titles short (2-4 words)."""
+
+MODULE_SYNTHESIS_USER_PROMPT_TEMPLATE = """Topic: {topic}
+Module {number} of {count}: {module_title}
+Module scope: {module_summary}
+
+All modules of the course (cover only module {number}; the others are
+synthesized separately):
+{modules}
+
+Research notes relevant to this module:
+{raw_notes}
+
+Tasks:
+1. Organize this module's concepts from fundamentals to advanced.
+2. Explain relationships between concepts.
+3. Identify common misconceptions.
+4. Map concepts to lessons.
+
+Output format (Markdown):
+- Concept Map
+- Learning Progression
+- Key Insights
+- Lesson Mapping
+
+IMPORTANT: At the end of your response, provide this module's lesson outline in this exact format:
+## LESSON OUTLINE
+1. [Lesson title 1]
+2. [Lesson title 2]
+...
+
+Each lesson title should be clear and progressive. Do not include lessons
+that belong to other modules."""
+
 
 # ============================================================================
 # STEP 4: LECTURE WRITING (Claude)
@@ -75,6 +143,107 @@ QUALITY REQUIREMENTS:
 - Use accurate, meaningful examples
 - Make it suitable for self-study"""
 
+# Sections requested by LECTURE_USER_PROMPT_TEMPLATE, in order
+LESSON_SECTIONS = [
+    "Learning Objectives",
+    "Core Theory",
+    "Intuition & Examples",
+    "Common Pitfalls",
+    "Exercises",
+    "Further Reading",
+]
+
+# Section-parallel mode: a short skeleton first, then each section
+# concurrently with the skeleton as shared context
+
+LESSON_SKELETON_USER_PROMPT_TEMPLATE = """Course topic: {topic}
+Lesson title: {lesson_title}
+Target audience: {target_audience}
+
+Knowledge base:
+{knowledge_base}
+
+Plan this lesson before it is written. Its sections are:
+{sections}
+
+For each section, output its heading as "## <section>" followed by 3-6
+short bullet points naming exactly what it will cover: concepts, the
+examples to use, and terms to introduce. Assign every concept to one
+section only, so sections written separately do not repeat each other.
+
+Output only the skeleton, in Markdown. Be brief."""
+
+LESSON_SECTION_USER_PROMPT_TEMPLATE = """Course topic: {topic}
+Lesson title: {lesson_title}
+Target audience: {target_audience}
+
+Knowledge base:
+{knowledge_base}
+
+Lesson skeleton (shared by all sections, which are written separately):
+{skeleton}
+
+Write ONLY the "{section}" section of this lesson, following the skeleton.
+Start with the heading "## {section}". Do not write other sections and do
+not repeat what the skeleton assigns to them.
+
+Output in Markdown.
+
+QUALITY REQUIREMENTS:
+- Logic must be coherent and progressive
+- Explain from first principles
+- Provide intuition, not just definitions
+- Use accurate, meaningful examples
+- Make it suitable for self-study"""
+
+# Packing mode: several consecutive lessons in one request, split on markers
+LESSON_PACK_USER_PROMPT_TEMPLATE = """Course topic: {topic}
+Target audience: {target_audience}
+
+Knowledge base:
+{knowledge_base}
+
+Write the following {count} lessons of this course, each one complete and
+self-contained:
+{lessons}
+
+Give every lesson the following structure:
+
+1. Learning Objectives
+2. Core Theory
+3. Intuition & Examples
+4. Common Pitfalls
+5. Exercises
+6. Further Reading
+
+Output each lesson in Markdown between its markers, exactly like this:
+<<<LESSON 1>>>
+# <title of lesson 1>
+...
+<<<END LESSON 1>>>
+<<<LESSON 2>>>
+...
+
+Output nothing outside the markers.
+
+QUALITY REQUIREMENTS:
+- Logic must be coherent and progressive
+- Explain from first principles
+- Provide intuition, not just definitions
+- Use accurate, meaningful examples
+- Make each lesson suitable for self-study
+- Do not shorten later lessons: each gets the same depth as if written alone"""
+
+LESSON_PACK_LANGUAGE_INSTRUCTION = """
+
+Write all lessons entirely in {language}. Keep the markers, code, commands
+and established technical terms as they are."""
+
+LECTURE_LANGUAGE_INSTRUCTION = """
+
+Write the entire lesson in {language}. Keep code, commands and
+established technical terms as they are."""
+
 
 # ============================================================================
 # STEP 2: RESEARCH NOTE SYNTHESIS (OpenAI)
@@ -116,21 +285,146 @@ def format_synthesis_prompt(topic: str, raw_notes: str) -> tuple[str, str]:
     )
 
 
+def format_synthesis_update_prompt(topic: str, knowledge_base: str, raw_notes: str) -> tuple[str, str]:
+    """Format the knowledge base update prompt for Claude (refresh)."""
+    return (
+        SYNTHESIS_SYSTEM_PROMPT,
+        SYNTHESIS_UPDATE_USER_PROMPT_TEMPLATE.format(
+            topic=topic,
+            knowledge_base=knowledge_base,
+            raw_notes=raw_notes
+        )
+    )
+
+
+def format_module_outline_prompt(topic: str, raw_notes: str, max_modules: int) -> tuple[str, str]:
+    """Format the module outline prompt for Claude (hierarchical modules)."""
+    return (
+        SYNTHESIS_SYSTEM_PROMPT,
+        MODULE_OUTLINE_USER_PROMPT_TEMPLATE.format(
+            topic=topic,
+            raw_notes=raw_notes,
+            max_modules=max_modules
+        )
+    )
+
+
+def format_module_synthesis_prompt(topic: str, modules: list, number: int, raw_notes: str) -> tuple[str, str]:
+    """
+    Format the synthesis prompt for one module.
+
+    Args:
+        topic: Course topic
+        modules: Module outline, dicts with "title" and "summary"
+        number: Position of the module in the outline (from 1)
+        raw_notes: Research notes relevant to the module
+    """
+    module = modules[number - 1]
+    return (
+        SYNTHESIS_SYSTEM_PROMPT,
+        MODULE_SYNTHESIS_USER_PROMPT_TEMPLATE.format(
+            topic=topic,
+            number=number,
+            count=len(modules),
+            module_title=module["title"],
+            module_summary=module["summary"],
+            modules='\n'.join(f"{i}. {m['title']}: {m['summary']}" for i, m in enumerate(modules, 1)),
+            raw_notes=raw_notes
+        )
+    )
+
+
 def format_lecture_prompt(
     topic: str,
     lesson_title: str,
     target_audience: str,
-    knowledge_base: str
+    knowledge_base: str,
+    language: str = None
 ) -> tuple[str, str]:
     """Format the lecture writing prompt for Claude."""
+    user_prompt = LECTURE_USER_PROMPT_TEMPLATE.format(
+        topic=topic,
+        lesson_title=lesson_title,
+        target_audience=target_audience,
+        knowledge_base=knowledge_base
+    )
+    if language:
+        user_prompt += LECTURE_LANGUAGE_INSTRUCTION.format(language=language)
     return (
         LECTURE_SYSTEM_PROMPT,
-        LECTURE_USER_PROMPT_TEMPLATE.format(
-            topic=topic,
-            lesson_title=lesson_title,
-            target_audience=target_audience,
-            knowledge_base=knowledge_base
-        )
+        user_prompt
+    )
+
+
+def format_skeleton_prompt(
+    topic: str,
+    lesson_title: str,
+    target_audience: str,
+    knowledge_base: str,
+    language: str = None
+) -> tuple[str, str]:
+    """Format the lesson skeleton prompt for Claude (section-parallel mode)."""
+    user_prompt = LESSON_SKELETON_USER_PROMPT_TEMPLATE.format(
+        topic=topic,
+        lesson_title=lesson_title,
+        target_audience=target_audience,
+        knowledge_base=knowledge_base,
+        sections='\n'.join(f"{i}. {section}" for i, section in enumerate(LESSON_SECTIONS, 1))
+    )
+    if language:
+        user_prompt += LECTURE_LANGUAGE_INSTRUCTION.format(language=language)
+    return (
+        LECTURE_SYSTEM_PROMPT,
+        user_prompt
+    )
+
+
+def format_section_prompt(
+    topic: str,
+    lesson_title: str,
+    target_audience: str,
+    knowledge_base: str,
+    skeleton: str,
+    section: str,
+    language: str = None
+) -> tuple[str, str]:
+    """Format the prompt for one lesson section (section-parallel mode)."""
+    user_prompt = LESSON_SECTION_USER_PROMPT_TEMPLATE.format(
+        topic=topic,
+        lesson_title=lesson_title,
+        target_audience=target_audience,
+        knowledge_base=knowledge_base,
+        skeleton=skeleton,
+        section=section
+    )
+    if language:
+        user_prompt += LECTURE_LANGUAGE_INSTRUCTION.format(language=language)
+    return (
+        LECTURE_SYSTEM_PROMPT,
+        user_prompt
+    )
+
+
+def format_lesson_pack_prompt(
+    topic: str,
+    lesson_titles: list[str],
+    target_audience: str,
+    knowledge_base: str,
+    language: str = None
+) -> tuple[str, str]:
+    """Format the prompt for several lessons in one request (packing mode)."""
+    user_prompt = LESSON_PACK_USER_PROMPT_TEMPLATE.format(
+        topic=topic,
+        target_audience=target_audience,
+        knowledge_base=knowledge_base,
+        count=len(lesson_titles),
+        lessons='\n'.join(f"{i}. {title}" for i, title in enumerate(lesson_titles, 1))
+    )
+    if language:
+        user_prompt += LESSON_PACK_LANGUAGE_INSTRUCTION.format(language=language)
+    return (
+        LECTURE_SYSTEM_PROMPT,
+        user_prompt
     )
 
 
@@ -0,0 +1,203 @@
+"""
+Regenerate one lesson, or one section of it, of an existing course.
+
+`python main.py regenerate <course dir> <lesson number> [--section NAME]`
+fixes a single bad lesson without a pipeline run: the stored knowledge
+base (the lesson's module knowledge base in module mode) and lesson outline
+are loaded from the course's saved state, only that lesson or section is
+generated, a section is spliced into the existing Markdown in place of the
+old one, and only the lesson file is committed. The lesson's artifact
+record and manifest entry are updated so a later pipeline run does not
+rewrite it again, and the search index is updated if the base directory
+has one.
+"""
+
+import re
+from pathlib import Path
+from typing import Optional, Tuple
+
+from src.config import Config
+from src.prompts import LESSON_SECTIONS, format_lecture_prompt, format_section_prompt
+from src.nodes.writing_node import lesson_entries
+from src.tools.artifacts import content_hash, hash_text, lesson_inputs, make_record
+from src.tools.blob_store import file_handle, get_text
+from src.tools.git_operations import commit_files
+from src.tools.llm_client import call_claude
+from src.tools.prompt_minify import expand_url_refs, minify_for_prompt
+from src.tools.search_index import INDEX_FILE_NAME, index_lessons
+from src.tools.state_persistence import find_existing_lessons, load_state, save_state
+from src.tools.stream_validation import LessonStreamValidator, heading_matches
+from src.tools.token_utils import smart_truncate_for_prompt
+from src.tools.log import get_logger
+
+logger = get_logger(__name__)
+
+
+_HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+
+
+def find_section(markdown: str, section: str) -> Optional[Tuple[int, int, str]]:
+    """
+    Locate a section of a lesson by its heading.
+
+    The section runs from its heading to the next heading of the same or a
+    higher level; headings inside code blocks are ignored.
+
+    Args:
+        markdown: Lesson Markdown
+        section: Section name, e.g. "Common Pitfalls"
+
+    Returns:
+        (first line, end line (exclusive), heading line), or None if no heading names the section
+    """
+    lines = markdown.split('\n')
+    start, level = None, 0
+    in_code = False
+    first_heading = True
+
+    for number, line in enumerate(lines):
+        if line.lstrip().startswith("```"):
+            in_code = not in_code
+            continue
+        match = None if in_code else _HEADING_RE.match(line)
+        if not match:
+            continue
+        # The lesson title (a leading level-1 heading) is not a section
+        is_title = first_heading and len(match.group(1)) == 1
+        first_heading = False
+        if start is None:
+            if not is_title and heading_matches(match.group(2), section):
+                start, level = number, len(match.group(1))
+        elif len(match.group(1)) <= level:
+            return start, number, lines[start]
+
+    return (start, len(lines), lines[start]) if start is not None else None
+
+
+def splice_section(markdown: str, section: str, new_section: str) -> str:
+    """
+    Replace a section of a lesson with new content.
+
+    Args:
+        markdown: Lesson Markdown
+        section: Section name
+        new_section: The new section, starting with its heading
+
+    Returns:
+        The lesson with the section replaced
+    """
+    found = find_section(markdown, section)
+    if found is None:
+        raise ValueError(f"Section not found: {section}")
+    start, end, _ = found
+    lines = markdown.split('\n')
+    before = '\n'.join(lines[:start]).rstrip('\n')
+    after = '\n'.join(lines[end:]).strip('\n')
+    parts = [before, new_section.strip()] + ([after] if after.strip() else [])
+    return '\n\n'.join(part for part in parts if part) + '\n'
+
+
+def regenerate_lesson(course_dir: Path, number: int, section: str = None, commit: bool = True) -> Path:
+    """
+    Regenerate one lesson (or one of its sections) from the stored knowledge base.
+
+    Args:
+        course_dir: Course directory (containing .agent_state.json)
+        number: Lesson number in the course outline (from 1)
+        section: Only regenerate this section and splice it into the lesson
+        commit: Commit the lesson file
+
+    Returns:
+        Path of the lesson file
+    """
+    course_dir = Path(course_dir).expanduser().resolve()
+    saved_state = load_state(course_dir)
+    if not saved_state.get("lesson_outline") or not saved_state.get("knowledge_base"):
+        raise ValueError(f"No saved knowledge base and lesson outline in {course_dir}")
+
+    topic = saved_state["topic"]
+    target_audience = saved_state["target_audience"]
+    language = saved_state.get("language")
+    modules = saved_state.get("modules") or []
+    artifacts = dict(saved_state.get("artifacts") or {})
+
+    entries = {i: (title, key, unit) for i, title, key, unit in lesson_entries(saved_state["lesson_outline"], modules)}
+    if number not in entries:
+        raise ValueError(f"No lesson {number} in {course_dir} (the course has {len(entries)} lessons)")
+    lesson_title, lesson_key, unit = entries[number]
+    lesson_path = course_dir / "lessons" / f"{lesson_key}.md"
+
+    if section:
+        if not lesson_path.exists():
+            raise ValueError(f"Lesson {number} has not been written yet: {lesson_path}")
+        current = lesson_path.read_text(encoding='utf-8')
+        found = find_section(current, section)
+        if found is None:
+            raise ValueError(f"Lesson {number} has no \"{section}\" section")
+        heading_line = found[2]
+        section_name = next((s for s in LESSON_SECTIONS if heading_matches(s, section)), section)
+
+    # The knowledge base the lesson is written from: the course's or its module's
+    if modules:
+        kb_handle = modules[unit]["knowledge_base"]
+        kb_hash = content_hash(artifacts, f"module_{unit + 1:02d}")
+    else:
+        kb_handle = saved_state["knowledge_base"]
+        kb_hash = content_hash(artifacts, "knowledge_base")
+    knowledge_base = get_text(kb_handle, course_dir)
+    kb_hash = kb_hash or hash_text(knowledge_base)
+
+    minified_kb, url_refs = minify_for_prompt(knowledge_base, "knowledge base")
+    truncated_kb, _ = smart_truncate_for_prompt(minified_kb, Config.MAX_TOKENS_FOR_KNOWLEDGE_BASE, "Knowledge base for lessons")
+
+    if section:
+        logger.info(f"→ Regenerating section \"{section_name}\" of lesson {number}: {lesson_title}")
+        # The rest of the lesson is the context the new section must fit into
+        context = splice_section(current, section, f"{heading_line}\n\n(this section is being rewritten)")
+        system_prompt, user_prompt = format_section_prompt(
+            topic, lesson_title, target_audience, truncated_kb, context, section_name, language
+        )
+        new_section = call_claude(system_prompt, user_prompt, temperature=1.0, max_tokens=Config.SECTION_MAX_TOKENS).strip()
+        if not new_section.startswith("#"):
+            new_section = f"{heading_line}\n\n{new_section}"
+        content = splice_section(current, section, expand_url_refs(new_section, url_refs))
+        # The lesson keeps the inputs it was written from; only its content changed
+        artifacts[lesson_key] = {**artifacts.get(lesson_key, {}), "hash": hash_text(content)}
+    else:
+        logger.info(f"→ Regenerating lesson {number}: {lesson_title}")
+        system_prompt, user_prompt = format_lecture_prompt(topic, lesson_title, target_audience, truncated_kb, language)
+        content = call_claude(
+            system_prompt, user_prompt, temperature=1.0, max_tokens=16000,
+            make_validator=lambda: LessonStreamValidator(LESSON_SECTIONS, language)
+        )
+        content = expand_url_refs(content, url_refs)
+        artifacts[lesson_key] = make_record(
+            lesson_inputs(kb_hash, topic, target_audience, lesson_title, language), content
+        )
+
+    lesson_path.parent.mkdir(parents=True, exist_ok=True)
+    lesson_path.write_text(content, encoding='utf-8')
+    logger.info(f"✓ Saved to: {lesson_path} ({len(content)} chars)")
+
+    manifest = saved_state.get("lessons")
+    lessons = find_existing_lessons(course_dir, manifest if isinstance(manifest, dict) else None)
+    lessons[lesson_key] = file_handle(course_dir, lesson_path, text=content)
+    save_state(course_dir, {**saved_state, "lessons": lessons, "artifacts": artifacts})
+
+    # Keep the search index of the base directory current (if it has one)
+    index_base = next((p for p in course_dir.parents if (p / INDEX_FILE_NAME).exists()), None)
+    if Config.SEARCH_INDEX_ENABLED and index_base:
+        try:
+            index_lessons(index_base, [(lesson_path, lessons[lesson_key]["sha256"])])
+        except Exception as e:
+            logger.warning(f"⚠ Search index warning: {e}")
+
+    if commit:
+        what = f"section \"{section_name}\" of lesson {number}" if section else f"lesson {number}"
+        try:
+            commit_files(course_dir, [lesson_path], f"Regenerate {what}: {lesson_title}")
+            logger.info(f"✓ Committed {lesson_path.relative_to(course_dir)}")
+        except Exception as e:
+            logger.warning(f"⚠ Commit warning: {e}")
+
+    return lesson_path
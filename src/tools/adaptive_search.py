@@ -0,0 +1,224 @@
+"""
+Coverage-driven adaptive research depth.
+
+Instead of one "advanced" search with a fixed result count for every topic,
+research walks a ladder of increasingly expensive searches
+(ADAPTIVE_SEARCH_STEPS, e.g. basic/3 → basic/6 → advanced/6 → advanced/10):
+
+1. Start with the cheapest step.
+2. After each step, split the results into paragraphs and drop every
+   paragraph already seen (by normalized content), so repeated boilerplate
+   and the same page returned again do not count.
+3. Escalate to the next step only while the step added at least
+   ADAPTIVE_MIN_NOVEL_TOKENS of new content per new source (URL) it added.
+   A step that falls short is discarded: its results are not used.
+
+Narrow topics stop after a basic search; broad ones keep escalating while
+searches still turn up new material. The searches whose results a topic
+used are recorded (SEARCH_DEPTH_FILE) and repeated as-is from then on: a rebuild
+does not pay for probing again, and a refresh compares the same searches'
+results instead of reporting the escalation as changed material.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config import Config
+from src.tools.context_packing import tokenize
+from src.tools.tavily_client import search_topic
+from src.tools.token_utils import count_tokens
+from src.tools.log import get_logger
+
+logger = get_logger(__name__)
+
+
+_lock = threading.Lock()
+
+
+def adaptive_enabled() -> bool:
+    """Whether research escalates adaptively (Tavily only: a local corpus search has no depth)."""
+    return Config.ADAPTIVE_SEARCH and Config.SEARCH_BACKEND == "tavily"
+
+
+def search_steps(max_results: Optional[int] = None) -> List[Tuple[str, int]]:
+    """
+    The search ladder, cheapest first.
+
+    Args:
+        max_results: Cap on results per search (e.g. when reusing related courses)
+
+    Returns:
+        List of (depth, max_results) steps
+    """
+    steps = []
+    for step in Config.ADAPTIVE_SEARCH_STEPS.split(','):
+        depth, _, count = step.strip().partition(':')
+        depth = depth.strip() or Config.TAVILY_SEARCH_DEPTH
+        count = int(count) if count.strip() else Config.TAVILY_MAX_RESULTS
+        if max_results is not None:
+            count = min(count, max_results)
+        if (depth, count) not in steps:
+            steps.append((depth, count))
+    return steps
+
+
+def _topic_key(topic: str) -> str:
+    return ' '.join(topic.lower().split())
+
+
+def _load_recorded() -> Dict[str, Dict[str, Any]]:
+    path = Path(Config.SEARCH_DEPTH_FILE)
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except Exception as e:
+        logger.warning(f"  ⚠ Warning: Could not load recorded search depths: {e}")
+        return {}
+
+
+def recorded_search(topic: str) -> Optional[Dict[str, Any]]:
+    """
+    The search recorded for a topic, if any.
+
+    Returns:
+        {"depth", "max_results", "steps": [[depth, max_results], ...], "novel_tokens"}
+        where depth/max_results is the step the topic settled on and steps
+        are the searches its results were merged from (rejected probes are
+        not recorded)
+    """
+    return _load_recorded().get(_topic_key(topic))
+
+
+def record_search(topic: str, depth: str, max_results: int, steps: List[Tuple[str, int]], novel_tokens: int) -> None:
+    """
+    Record the search step a topic settled on.
+
+    Args:
+        topic: Course topic
+        depth: Search depth of the step
+        max_results: Result count of the step
+        steps: The (depth, max_results) searches whose results were used
+        novel_tokens: Deduplicated tokens the searches found
+    """
+    with _lock:
+        try:
+            recorded = _load_recorded()
+            recorded[_topic_key(topic)] = {
+                "depth": depth,
+                "max_results": max_results,
+                "steps": [list(step) for step in steps],
+                "novel_tokens": novel_tokens
+            }
+            path = Path(Config.SEARCH_DEPTH_FILE)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Replaced atomically: a crash or a concurrent run must not leave it torn
+            tmp_path = path.with_suffix(f".tmp{os.getpid()}.{threading.get_ident()}")
+            tmp_path.write_text(json.dumps(recorded, indent=2), encoding='utf-8')
+            tmp_path.replace(path)
+        except Exception as e:
+            # The record is an optimization; it must never break a run
+            logger.debug("Could not record search depth: %s", e)
+
+
+def _paragraph_hashes(result: Dict[str, Any]) -> Dict[str, str]:
+    """Normalized-content hash → paragraph text of a search result."""
+    text = result.get('raw_content') or result.get('content') or ''
+    paragraphs = {}
+    for paragraph in text.split('\n\n'):
+        words = tokenize(paragraph)
+        if words:
+            key = hashlib.blake2b(' '.join(words).encode('utf-8'), digest_size=16).hexdigest()
+            paragraphs.setdefault(key, paragraph)
+    return paragraphs
+
+
+def adaptive_search(topic: str, max_results: Optional[int] = None) -> dict:
+    """
+    Search a topic, escalating depth and result count while it pays off.
+
+    Args:
+        topic: The topic to search for
+        max_results: Cap on results per search (default: no cap beyond the ladder)
+
+    Returns:
+        Search response like search_topic's, with the deduplicated union of
+        the results of every step used (a URL found again at a deeper step
+        keeps the richer content; a rejected step's results are dropped) and
+        "search_depth": {"depth", "max_results", "steps"}
+    """
+    recorded = recorded_search(topic)
+    replay = recorded is not None
+    if replay:
+        # Known topic: repeat its recorded searches, no probing
+        steps = list(dict.fromkeys(
+            (depth, count if max_results is None else min(count, max_results))
+            for depth, count in recorded["steps"]
+        ))
+    else:
+        steps = search_steps(max_results)
+
+    seen_paragraphs = set()
+    results: Dict[str, Dict[str, Any]] = {}
+    response: Dict[str, Any] = {}
+    chosen = (recorded["depth"], recorded["max_results"]) if replay else steps[0]
+    novel_total = 0
+    history = []
+
+    for depth, count in steps:
+        logger.info(f"  → Searching ({depth}, {count} results): {topic}")
+        step_response = search_topic(topic, count, depth=depth)
+        step_results = step_response.get('results', [])
+
+        # Merge into copies: a step that does not pay off leaves no trace
+        step_paragraphs = set(seen_paragraphs)
+        merged = dict(results)
+        novel_tokens = 0
+        for result in step_results:
+            for key, paragraph in _paragraph_hashes(result).items():
+                if key not in step_paragraphs:
+                    step_paragraphs.add(key)
+                    novel_tokens += count_tokens(paragraph)
+
+            url = result.get('url', '')
+            previous = merged.get(url)
+            if previous is None or len(result.get('raw_content') or '') > len(previous.get('raw_content') or ''):
+                merged[url] = {**result, 'score': max(result.get('score') or 0.0, (previous or {}).get('score') or 0.0)}
+
+        # Novelty per source the step added, not per result it returned
+        added = len(merged) - len(results)
+        per_result = novel_tokens / added if added else 0.0
+        logger.info(
+            f"    {len(step_results)} results ({added} new), "
+            f"{novel_tokens:,} new tokens ({per_result:,.0f} per new result)"
+        )
+
+        if not replay and history and per_result < Config.ADAPTIVE_MIN_NOVEL_TOKENS:
+            # Not worth it: the topic settles on the step before, without this step's results
+            break
+
+        seen_paragraphs, results, response = step_paragraphs, merged, step_response
+        novel_total += novel_tokens
+        history.append({"depth": depth, "max_results": count, "novel_tokens": novel_tokens})
+        if replay:
+            continue
+        chosen = (depth, count)
+        if per_result < Config.ADAPTIVE_MIN_NOVEL_TOKENS:
+            break
+
+    if not replay:
+        logger.info(f"  ✓ Search depth for this topic: {chosen[0]}, {chosen[1]} results ({len(history)} searches used)")
+        record_search(
+            topic, chosen[0], chosen[1],
+            [(step["depth"], step["max_results"]) for step in history], novel_total
+        )
+
+    return {
+        **response,
+        'results': list(results.values()),
+        'search_depth': {"depth": chosen[0], "max_results": chosen[1], "steps": history}
+    }
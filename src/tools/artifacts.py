@@ -0,0 +1,208 @@
+"""
+Artifact dependency tracking for incremental rebuilds.
+
+Every artifact a course produces records two hashes:
+- inputs: hash of everything it was built from (prompt templates, model,
+  settings and the content hash of its upstream artifacts)
+- hash: hash of its own content, which feeds into downstream inputs
+
+Dependency graph:
+    sources → raw_notes → knowledge_base/outline → lesson_NN → readme
+
+In module mode the knowledge base is built from a module outline and one
+knowledge base per module, and lessons depend on their module's:
+    raw_notes → module_outline → module_NN → knowledge_base
+                                     module_NN → lesson_NN
+
+An artifact is rebuilt only when its recorded inputs hash no longer matches
+the one computed for the current run, like a make target.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, Iterable, Optional
+
+from src.config import Config
+from src import prompts
+
+
+def hash_text(text: str) -> str:
+    """Content hash of a text artifact."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def hash_inputs(*parts: Any) -> str:
+    """Stable hash of a sequence of JSON-serializable inputs."""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def make_record(inputs_hash: str, content: Any) -> Dict[str, Any]:
+    """Create the record stored for a freshly built artifact."""
+    if not isinstance(content, str):
+        content = json.dumps(content, sort_keys=True, default=str)
+    return {"inputs": inputs_hash, "hash": hash_text(content)}
+
+
+def is_fresh(artifacts: Dict[str, Dict[str, Any]], name: str, inputs_hash: str,
+             upstream_hash: Optional[str] = None) -> bool:
+    """
+    Check whether a recorded artifact is still up to date.
+
+    Records adopted from state files written before artifact tracking have
+    no inputs hash; they stay fresh only while their upstream is unchanged.
+
+    Args:
+        artifacts: Artifact records from the saved state
+        name: Artifact name (e.g. "raw_notes", "lesson_01_intro")
+        inputs_hash: Inputs hash computed for the current run
+        upstream_hash: Content hash of the upstream artifact (for adopted records)
+
+    Returns:
+        True if the artifact does not need to be rebuilt
+    """
+    record = artifacts.get(name)
+    if not record:
+        return False
+    if record.get("inputs") is None:
+        return upstream_hash is not None and record.get("upstream") == upstream_hash
+    return record["inputs"] == inputs_hash
+
+
+def content_hash(artifacts: Dict[str, Dict[str, Any]], name: str) -> Optional[str]:
+    """Get the recorded content hash of an artifact, if any."""
+    return (artifacts.get(name) or {}).get("hash")
+
+
+# ============================================================================
+# Inputs of each artifact
+# ============================================================================
+
+def sources_inputs(topic: str) -> str:
+    """Inputs of the search sources: query and search settings (and a non-default backend)."""
+    parts = [
+        "sources", topic,
+        Config.TAVILY_MAX_RESULTS, Config.TAVILY_SEARCH_DEPTH
+    ]
+    # Only part of the inputs for other backends, so existing sources stay fresh
+    if Config.SEARCH_BACKEND != "tavily":
+        parts += [Config.SEARCH_BACKEND, Config.LOCAL_CORPUS_DIR]
+    return hash_inputs(*parts)
+
+
+def raw_notes_inputs(sources_hash: str, topic: str, target_audience: str) -> str:
+    """Inputs of the research notes: sources, audience, prompt and model."""
+    return hash_inputs(
+        "raw_notes", sources_hash, topic, target_audience,
+        Config.OPENAI_MODEL,
+        prompts.RESEARCH_SYNTHESIS_SYSTEM_PROMPT,
+        prompts.RESEARCH_SYNTHESIS_USER_PROMPT_TEMPLATE
+    )
+
+
+def knowledge_base_inputs(raw_notes_hash: str, topic: str, modules: bool = False) -> str:
+    """Inputs of the knowledge base and outline: notes, prompt and model (and module mode)."""
+    parts = [
+        "knowledge_base", raw_notes_hash, topic,
+        Config.CLAUDE_MODEL,
+        prompts.SYNTHESIS_SYSTEM_PROMPT,
+        prompts.SYNTHESIS_USER_PROMPT_TEMPLATE
+    ]
+    # Only part of the inputs when set, so existing knowledge bases stay fresh
+    if modules:
+        parts += [
+            "modules", Config.MODULE_MAX_COUNT, Config.MODULE_NOTES_MAX_TOKENS,
+            prompts.MODULE_OUTLINE_USER_PROMPT_TEMPLATE,
+            prompts.MODULE_SYNTHESIS_USER_PROMPT_TEMPLATE
+        ]
+    return hash_inputs(*parts)
+
+
+def module_outline_inputs(raw_notes_hash: str, topic: str) -> str:
+    """Inputs of the module outline: notes, prompt, module limit and model."""
+    return hash_inputs(
+        "module_outline", raw_notes_hash, topic,
+        Config.CLAUDE_MODEL, Config.MODULE_MAX_COUNT,
+        prompts.SYNTHESIS_SYSTEM_PROMPT,
+        prompts.MODULE_OUTLINE_USER_PROMPT_TEMPLATE
+    )
+
+
+def module_inputs(notes_hash: str, topic: str, modules: list, number: int) -> str:
+    """Inputs of one module's knowledge base: its notes, the module outline, prompt and model."""
+    return hash_inputs(
+        "module", notes_hash, topic, modules, number,
+        Config.CLAUDE_MODEL,
+        prompts.SYNTHESIS_SYSTEM_PROMPT,
+        prompts.MODULE_SYNTHESIS_USER_PROMPT_TEMPLATE
+    )
+
+
+def lesson_inputs(knowledge_base_hash: str, topic: str, target_audience: str, lesson_title: str,
+                  language: Optional[str] = None) -> str:
+    """
+    Inputs of one lesson: knowledge base, title, audience, language, prompts and model.
+
+    How the lesson is generated (one request, a pack or section by section)
+    is not an input, so toggling --section-parallel does not make lessons stale.
+    """
+    parts = [
+        "lesson", knowledge_base_hash, topic, target_audience, lesson_title,
+        Config.CLAUDE_MODEL,
+        prompts.LECTURE_SYSTEM_PROMPT,
+        prompts.LECTURE_USER_PROMPT_TEMPLATE
+    ]
+    # Only part of the inputs when set, so existing lessons stay fresh
+    if language:
+        parts += [language, prompts.LECTURE_LANGUAGE_INSTRUCTION]
+    return hash_inputs(*parts)
+
+
+def readme_inputs(topic: str, target_audience: str, lesson_hashes: Iterable[tuple]) -> str:
+    """Inputs of the README: course metadata and the lessons it lists."""
+    return hash_inputs("readme", topic, target_audience, sorted(lesson_hashes))
+
+
+# ============================================================================
+# Legacy state
+# ============================================================================
+
+def adopt_legacy_state(saved_state: Dict[str, Any], completed_lessons: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Build artifact records for a state file written before artifact tracking.
+
+    Existing research and knowledge base are assumed to match the current
+    inputs, so upgrading does not force a full rebuild. Existing lessons
+    are kept until the knowledge base they were written from is rebuilt.
+
+    Args:
+        saved_state: State loaded from .agent_state.json
+        completed_lessons: Lesson keys found on disk
+
+    Returns:
+        Artifact records
+    """
+    artifacts: Dict[str, Dict[str, Any]] = {}
+    topic = saved_state.get("topic") or ""
+    target_audience = saved_state.get("target_audience") or ""
+
+    if saved_state.get("raw_notes"):
+        artifacts["sources"] = make_record(sources_inputs(topic), saved_state.get("research_sources", []))
+        artifacts["raw_notes"] = make_record(
+            raw_notes_inputs(artifacts["sources"]["hash"], topic, target_audience),
+            saved_state["raw_notes"]
+        )
+
+    if saved_state.get("knowledge_base") and "raw_notes" in artifacts:
+        artifacts["knowledge_base"] = make_record(
+            knowledge_base_inputs(artifacts["raw_notes"]["hash"], topic),
+            saved_state["knowledge_base"]
+        )
+        for lesson_key in completed_lessons:
+            artifacts[lesson_key] = {
+                "inputs": None,
+                "hash": None,
+                "upstream": artifacts["knowledge_base"]["hash"]
+            }
+
+    return artifacts
@@ -0,0 +1,276 @@
+"""
+Batch API client for offline (overnight) generation.
+
+Submits many Claude prompts as one provider batch job instead of real-time
+calls, polls until the job ends and returns the results by request ID:
+- Direct API: Anthropic Message Batches
+- GitHub Copilot / OpenAI-compatible routing: OpenAI Batch API
+
+BATCH_BASE_URL points the batch clients at another endpoint, e.g. a local
+stand-in that implements the batch endpoints, for testing.
+
+A submitted batch is described by a small record (provider, batch ID and a
+fingerprint of its requests) that callers persist, so an interrupted run
+resumes polling the same job instead of paying for it twice. Polling stops
+with DeadlineExceeded when a course/step deadline passes; the job keeps
+running at the provider and is picked up by the next run.
+
+Callers key requests by anything (e.g. lesson keys with "/" or non-ASCII
+titles); each is sent under a short ASCII ID derived from its key
+(providers require `^[a-zA-Z0-9_-]{1,64}$`) and the results are mapped back.
+"""
+
+import hashlib
+import io
+import json
+import re
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from openai import OpenAI
+from anthropic import Anthropic
+from src.config import Config
+from src.tools.artifacts import hash_inputs
+from src.tools.deadlines import DeadlineExceeded, check, earliest
+from src.tools.log import get_logger
+
+logger = get_logger(__name__)
+
+
+_anthropic_batch_client = None
+_openai_batch_client = None
+
+# Terminal states per provider
+_ANTHROPIC_DONE = {"ended"}
+_OPENAI_DONE = {"completed", "failed", "expired", "cancelled"}
+
+
+def get_batch_provider() -> str:
+    """Provider used for batch jobs: "anthropic" or "openai"."""
+    if Config.BATCH_PROVIDER:
+        return Config.BATCH_PROVIDER
+    return "openai" if Config.USE_GITHUB_COPILOT else "anthropic"
+
+
+def get_anthropic_batch_client() -> Anthropic:
+    """Get or create the Anthropic client used for Message Batches."""
+    global _anthropic_batch_client
+    if _anthropic_batch_client is None:
+        api_key = Config.get_api_key_for_claude()
+        if Config.BATCH_BASE_URL:
+            _anthropic_batch_client = Anthropic(api_key=api_key, base_url=Config.BATCH_BASE_URL)
+        else:
+            _anthropic_batch_client = Anthropic(api_key=api_key)
+    return _anthropic_batch_client
+
+
+def get_openai_batch_client() -> OpenAI:
+    """Get or create the OpenAI-compatible client used for the Batch API."""
+    global _openai_batch_client
+    if _openai_batch_client is None:
+        api_key = Config.get_api_key_for_claude()
+        base_url = Config.BATCH_BASE_URL or Config.get_base_url_for_claude()
+        if base_url:
+            _openai_batch_client = OpenAI(api_key=api_key, base_url=base_url)
+        else:
+            _openai_batch_client = OpenAI(api_key=api_key)
+    return _openai_batch_client
+
+
+def batch_request_id(key: str) -> str:
+    """
+    Provider-safe ID of a request: the key's ASCII letters and digits (for
+    readability) and a short hash of the full key (for uniqueness).
+
+    The ID depends only on the key, so a resumed batch maps back the same way.
+    """
+    readable = re.sub(r'[^a-zA-Z0-9_-]+', '_', key).strip('_')[:40]
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=6).hexdigest()
+    return f"{readable}-{digest}" if readable else digest
+
+
+def batch_fingerprint(requests: Dict[str, Tuple[str, str]], temperature: float, max_tokens: int) -> str:
+    """Fingerprint of a set of requests, used to match a persisted batch."""
+    return hash_inputs(
+        Config.CLAUDE_MODEL, temperature, max_tokens,
+        sorted((custom_id, system, user) for custom_id, (system, user) in requests.items())
+    )
+
+
+def run_claude_batch(
+    requests: Dict[str, Tuple[str, str]],
+    temperature: float = 1.0,
+    max_tokens: int = 16000,
+    pending: Optional[dict] = None,
+    on_submitted: Optional[Callable[[dict], None]] = None
+) -> Dict[str, Optional[str]]:
+    """
+    Run Claude prompts as one batch job and wait for the results.
+
+    Args:
+        requests: Mapping of request key → (system_prompt, user_prompt)
+        temperature: Sampling temperature
+        max_tokens: Maximum tokens to generate per request
+        pending: Persisted record of a previously submitted batch, if any
+        on_submitted: Called with the record of a newly submitted batch so the
+            caller can persist it before polling starts
+
+    Returns:
+        Mapping of request key → response text (None for failed requests)
+    """
+    provider = get_batch_provider()
+    fingerprint = batch_fingerprint(requests, temperature, max_tokens)
+    ids = {key: batch_request_id(key) for key in requests}
+    if len(set(ids.values())) < len(ids):
+        raise RuntimeError("Batch submission failed: request IDs collide")
+    submitted = {ids[key]: prompt for key, prompt in requests.items()}
+
+    if pending and pending.get("fingerprint") == fingerprint and pending.get("provider") == provider:
+        batch_id = pending["id"]
+        logger.info(f"  → Resuming batch {batch_id} ({len(requests)} requests)")
+    else:
+        try:
+            if provider == "anthropic":
+                batch_id = _submit_anthropic(submitted, temperature, max_tokens)
+            else:
+                batch_id = _submit_openai(submitted, temperature, max_tokens)
+        except Exception as e:
+            raise RuntimeError(f"Batch submission failed: {str(e)}")
+
+        logger.info(f"  ✓ Submitted batch {batch_id} ({len(requests)} requests via {provider})")
+        if on_submitted:
+            on_submitted({"id": batch_id, "provider": provider, "fingerprint": fingerprint})
+
+    try:
+        if provider == "anthropic":
+            _poll(batch_id, _anthropic_status, _ANTHROPIC_DONE)
+            results = _fetch_anthropic(batch_id)
+        else:
+            batch = _poll(batch_id, _openai_status, _OPENAI_DONE)
+            results = _fetch_openai(batch)
+    except DeadlineExceeded:
+        # The job keeps running at the provider; the next run resumes polling it
+        raise
+    except Exception as e:
+        raise RuntimeError(f"Batch {batch_id} failed: {str(e)}")
+
+    return {key: results.get(custom_id) for key, custom_id in ids.items()}
+
+
+def _poll(batch_id: str, get_status: Callable, done_states: set):
+    """Poll a batch until it reaches a terminal state; return the last batch object."""
+    while True:
+        batch, status, progress = get_status(batch_id)
+        if status in done_states:
+            logger.info(f"  ✓ Batch {batch_id} {status} ({progress})")
+            return batch
+        logger.info(f"  … Batch {batch_id} {status} ({progress}) - checking again in {Config.BATCH_POLL_INTERVAL}s")
+        deadline = earliest()
+        interval = Config.BATCH_POLL_INTERVAL
+        time.sleep(max(0, min(interval, deadline.remaining())) if deadline else interval)
+        check()
+
+
+# ============================================================================
+# Anthropic Message Batches
+# ============================================================================
+
+def _submit_anthropic(requests: Dict[str, Tuple[str, str]], temperature: float, max_tokens: int) -> str:
+    client = get_anthropic_batch_client()
+    batch = client.messages.batches.create(
+        requests=[
+            {
+                "custom_id": custom_id,
+                "params": {
+                    "model": Config.CLAUDE_MODEL,
+                    "max_tokens": max_tokens,
+                    "temperature": temperature,
+                    "system": system_prompt,
+                    "messages": [{"role": "user", "content": user_prompt}],
+                },
+            }
+            for custom_id, (system_prompt, user_prompt) in requests.items()
+        ]
+    )
+    return batch.id
+
+
+def _anthropic_status(batch_id: str):
+    batch = get_anthropic_batch_client().messages.batches.retrieve(batch_id)
+    counts = batch.request_counts
+    progress = f"{counts.succeeded} succeeded, {counts.errored} errored, {counts.processing} processing"
+    return batch, batch.processing_status, progress
+
+
+def _fetch_anthropic(batch_id: str) -> Dict[str, Optional[str]]:
+    results = {}
+    for entry in get_anthropic_batch_client().messages.batches.results(batch_id):
+        if entry.result.type == "succeeded":
+            results[entry.custom_id] = entry.result.message.content[0].text
+        else:
+            logger.warning(f"  ⚠ Batch request {entry.custom_id} {entry.result.type}")
+            results[entry.custom_id] = None
+    return results
+
+
+# ============================================================================
+# OpenAI Batch API
+# ============================================================================
+
+def _submit_openai(requests: Dict[str, Tuple[str, str]], temperature: float, max_tokens: int) -> str:
+    client = get_openai_batch_client()
+
+    lines = []
+    for custom_id, (system_prompt, user_prompt) in requests.items():
+        lines.append(json.dumps({
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": Config.CLAUDE_MODEL,
+                "messages": [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+            },
+        }))
+
+    input_file = client.files.create(
+        file=("batch_input.jsonl", io.BytesIO('\n'.join(lines).encode('utf-8'))),
+        purpose="batch"
+    )
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+    return batch.id
+
+
+def _openai_status(batch_id: str):
+    batch = get_openai_batch_client().batches.retrieve(batch_id)
+    counts = batch.request_counts
+    progress = f"{counts.completed}/{counts.total} completed, {counts.failed} failed" if counts else "no counts yet"
+    return batch, batch.status, progress
+
+
+def _fetch_openai(batch) -> Dict[str, Optional[str]]:
+    results = {}
+    if not batch.output_file_id:
+        logger.warning(f"  ⚠ Batch {batch.id} has no output file")
+        return results
+
+    content = get_openai_batch_client().files.content(batch.output_file_id).text
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        response = entry.get("response") or {}
+        if response.get("status_code") == 200:
+            results[entry["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+        else:
+            logger.warning(f"  ⚠ Batch request {entry.get('custom_id')} failed: {entry.get('error')}")
+            results[entry["custom_id"]] = None
+    return results
@@ -0,0 +1,251 @@
+"""
+Artifact handles for large texts.
+
+Large artifacts (research notes, knowledge base, lessons) are kept on disk
+and referenced in agent state by small JSON-serializable handles:
+
+    {"path": ".agent_blobs/<sha256>.txt", "sha256": "...", "size": 12345}
+
+Paths are relative to the course directory, or absolute when a shared
+BLOB_STORE_DIR is configured. Blobs are content-addressed, so identical
+texts are stored once. Texts are loaded lazily through a small LRU cache
+bounded by BLOB_CACHE_MB, so memory does not grow with the number of
+courses or the size of their texts.
+
+Plain strings are accepted wherever a handle is, so state files written
+before handles existed keep working.
+
+The per-course blob directory is git-ignored (ignore_blob_dir), and blobs
+that no saved state of the course references any more, e.g. superseded
+knowledge base versions, are deleted after publishing (collect_garbage).
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from src.config import Config
+from src.tools.metrics import record_cache
+
+
+Handle = Dict[str, Any]
+
+BLOB_DIR_NAME = ".agent_blobs"
+
+# State files whose handles keep blobs alive (see state_persistence.py)
+_STATE_FILE_NAME = ".agent_state.json"
+
+_cache: "OrderedDict[str, str]" = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+
+
+def _blob_dir(repo_path: Path) -> Path:
+    if Config.BLOB_STORE_DIR:
+        return Path(Config.BLOB_STORE_DIR).expanduser()
+    return Path(repo_path) / BLOB_DIR_NAME
+
+
+def _relative_path(repo_path: Path, path: Path) -> str:
+    """Store paths relative to the course directory when possible."""
+    try:
+        return str(path.relative_to(repo_path))
+    except ValueError:
+        return str(path)
+
+
+def put_text(repo_path: Path, text: str) -> Handle:
+    """
+    Store a text in the blob store.
+
+    Args:
+        repo_path: Course directory
+        text: Text to store
+
+    Returns:
+        Handle referencing the stored text
+    """
+    repo_path = Path(repo_path)
+    data = text.encode('utf-8')
+    digest = hashlib.sha256(data).hexdigest()
+
+    blob_dir = _blob_dir(repo_path)
+    blob_path = blob_dir / f"{digest}.txt"
+    if not blob_path.exists():
+        blob_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = blob_path.with_suffix(f".tmp{threading.get_ident()}")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(blob_path)
+
+    _cache_put(digest, text)
+    return {"path": _relative_path(repo_path, blob_path), "sha256": digest, "size": len(data)}
+
+
+def ignore_blob_dir(repo_path: Path) -> None:
+    """Add the blob directory to the course's .gitignore, so blobs are never committed."""
+    if Config.BLOB_STORE_DIR:
+        return
+    gitignore = Path(repo_path) / ".gitignore"
+    entry = f"{BLOB_DIR_NAME}/"
+    lines = gitignore.read_text(encoding='utf-8').splitlines() if gitignore.exists() else []
+    if entry in lines or BLOB_DIR_NAME in lines:
+        return
+    gitignore.write_text('\n'.join(lines + [entry]) + '\n', encoding='utf-8')
+
+
+def _referenced_digests(value: Any, digests: set) -> set:
+    """Content hashes of every handle in a (JSON) state."""
+    if isinstance(value, dict):
+        if isinstance(value.get("sha256"), str):
+            digests.add(value["sha256"])
+        for item in value.values():
+            _referenced_digests(item, digests)
+    elif isinstance(value, list):
+        for item in value:
+            _referenced_digests(item, digests)
+    return digests
+
+
+def collect_garbage(repo_path: Path) -> int:
+    """
+    Delete the blobs of a course directory that no saved state references.
+
+    Every state file in the course directory counts, including those of
+    variants in its subfolders. Nothing is deleted from a shared
+    BLOB_STORE_DIR (other courses' states are not known here), or if a
+    state file cannot be read.
+
+    Args:
+        repo_path: Course directory
+
+    Returns:
+        Number of blobs deleted
+    """
+    blob_dir = Path(repo_path) / BLOB_DIR_NAME
+    if Config.BLOB_STORE_DIR or not blob_dir.is_dir():
+        return 0
+
+    referenced = set()
+    for state_file in Path(repo_path).glob(f"**/{_STATE_FILE_NAME}"):
+        try:
+            _referenced_digests(json.loads(state_file.read_text(encoding='utf-8')), referenced)
+        except Exception:
+            return 0
+
+    removed = 0
+    for blob_path in blob_dir.glob("*.txt"):
+        if blob_path.stem not in referenced:
+            blob_path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+def file_handle(repo_path: Path, path: Path, text: Optional[str] = None) -> Handle:
+    """
+    Create a handle for an existing file (e.g. a lesson).
+
+    Args:
+        repo_path: Course directory
+        path: The file
+        text: The file's content, if already in memory (adds its hash)
+
+    Returns:
+        Handle referencing the file, with its size and mtime
+    """
+    path = Path(path)
+    stat = path.stat()
+    handle = {"path": _relative_path(Path(repo_path), path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if text is not None:
+        handle["sha256"] = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    return handle
+
+
+def to_handle(repo_path: Path, value: Union[Handle, str, None]) -> Optional[Handle]:
+    """Convert inline text to a handle; handles and empty values pass through."""
+    if isinstance(value, str):
+        return put_text(repo_path, value) if value else None
+    return value or None
+
+
+def rebase_handle(value: Union[Handle, str, None], from_path: Path, to_path: Path) -> Union[Handle, str, None]:
+    """
+    Re-express a handle's relative path against another directory.
+
+    Used when a course variant in a subdirectory references artifacts of
+    the shared course directory.
+
+    Args:
+        value: Handle, inline text or None
+        from_path: Directory the handle's path is currently relative to
+        to_path: Directory it should be relative to
+
+    Returns:
+        Handle resolving to the same file from to_path
+    """
+    if not isinstance(value, dict) or Path(value["path"]).is_absolute():
+        return value
+    target = Path(from_path) / value["path"]
+    return {**value, "path": os.path.relpath(target, to_path)}
+
+
+def get_text(value: Union[Handle, str, None], repo_path: Path) -> str:
+    """
+    Load the text behind a handle (lazily, through the LRU cache).
+
+    Args:
+        value: Handle, inline text or None
+        repo_path: Course directory that relative handle paths are resolved against
+
+    Returns:
+        The text ("" for None)
+    """
+    if not value:
+        return ""
+    if isinstance(value, str):
+        return value
+
+    path = Path(value["path"])
+    if not path.is_absolute():
+        path = Path(repo_path) / path
+
+    key = value.get("sha256") or f"{path}@{path.stat().st_mtime_ns}"
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            record_cache("blob", hit=True)
+            return _cache[key]
+
+    record_cache("blob", hit=False)
+    text = path.read_text(encoding='utf-8')
+    _cache_put(key, text)
+    return text
+
+
+def text_size(value: Union[Handle, str, None]) -> int:
+    """Size of the text behind a handle, without loading it."""
+    if not value:
+        return 0
+    if isinstance(value, str):
+        return len(value)
+    return value.get("size", 0)
+
+
+def _cache_put(key: str, text: str) -> None:
+    global _cache_bytes
+    limit = Config.BLOB_CACHE_MB * 1024 * 1024
+    if len(text) > limit:
+        return
+
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return
+        _cache[key] = text
+        _cache_bytes += len(text)
+        while _cache_bytes > limit:
+            _, evicted = _cache.popitem(last=False)
+            _cache_bytes -= len(evicted)
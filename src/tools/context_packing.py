@@ -0,0 +1,161 @@
+"""
+Score-aware packing of search results into a token budget.
+
+Instead of cutting the middle out of the formatted search results, results
+are split into paragraphs and each paragraph is valued by its source's
+Tavily score and its lexical relevance to the topic. Paragraphs are then
+picked greedily by value per token until the budget is full.
+
+Paragraphs are tracked as offsets into the original result text, and the
+packed output is produced by a generator, so the full formatted string of
+all results is never built.
+"""
+
+import re
+from typing import Dict, Iterator, List, NamedTuple
+
+from src.config import Config
+from src.tools.token_utils import count_tokens
+from src.tools.log import get_logger
+
+logger = get_logger(__name__)
+
+
+_PARAGRAPH_RE = re.compile(r'\S(?:.*?\S)?(?=\n\s*\n|\s*\Z)', re.DOTALL)
+# Keeps terms like node.js, c++ and c# but not trailing punctuation
+_WORD_RE = re.compile(r'[a-z0-9](?:[a-z0-9+#.-]*[a-z0-9+#])?')
+
+_STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'how',
+    'in', 'into', 'is', 'it', 'of', 'on', 'or', 'the', 'to', 'with', 'what',
+}
+
+
+class _Paragraph(NamedTuple):
+    result_index: int
+    start: int
+    end: int
+    tokens: int
+    value: float
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens of a text, in order."""
+    return _WORD_RE.findall(text.lower())
+
+
+def topic_terms(topic: str) -> set:
+    """Significant lowercase terms of a topic."""
+    return {w for w in tokenize(topic) if w not in _STOPWORDS}
+
+
+def lexical_relevance(text: str, terms: set) -> float:
+    """Fraction of topic terms that occur in the text (0.0 to 1.0)."""
+    if not terms:
+        return 0.0
+    words = set(tokenize(text))
+    return len(terms & words) / len(terms)
+
+
+def _result_text(result: dict) -> str:
+    """Use raw content if available, otherwise the snippet."""
+    return result.get('raw_content') or result.get('content') or ''
+
+
+def _result_header(index: int, result: dict) -> str:
+    return f"\n=== Result {index}: {result.get('title', 'Untitled')} ===\nURL: {result.get('url', '')}\n\n"
+
+
+_RESULT_FOOTER = "\n\n---\n"
+
+
+def pack_search_results(search_response: dict, topic: str, max_tokens: int = None) -> Iterator[str]:
+    """
+    Yield formatted search results that fit within a token budget.
+
+    Output uses the same layout as `format_search_results`. When everything
+    fits, all paragraphs are kept; otherwise the most valuable paragraphs
+    per token are kept, in their original order within each result.
+
+    Args:
+        search_response: Response from Tavily API
+        topic: Topic used for lexical relevance scoring
+        max_tokens: Token budget (default MAX_TOKENS_FOR_RAW_NOTES)
+
+    Yields:
+        Chunks of the formatted results
+    """
+    if max_tokens is None:
+        max_tokens = Config.MAX_TOKENS_FOR_RAW_NOTES
+
+    results = search_response.get('results', [])
+    if not results:
+        yield "No search results found."
+        return
+
+    terms = topic_terms(topic)
+    weight = Config.PACK_SCORE_WEIGHT
+    footer_tokens = count_tokens(_RESULT_FOOTER)
+
+    paragraphs: List[_Paragraph] = []
+    header_tokens: Dict[int, int] = {}
+    total_tokens = 0
+
+    for i, result in enumerate(results):
+        text = _result_text(result)
+        source_score = float(result.get('score') or 0.0)
+        header_tokens[i] = count_tokens(_result_header(i + 1, result)) + footer_tokens
+        total_tokens += header_tokens[i]
+
+        for match in _PARAGRAPH_RE.finditer(text):
+            paragraph = match.group(0)
+            tokens = count_tokens(paragraph) + 1  # + paragraph separator
+            value = weight * source_score + (1 - weight) * lexical_relevance(paragraph, terms)
+            paragraphs.append(_Paragraph(i, match.start(), match.end(), tokens, value))
+            total_tokens += tokens
+
+    if total_tokens <= max_tokens:
+        selected = paragraphs
+    else:
+        selected = _select_by_value(paragraphs, header_tokens, max_tokens)
+        kept_tokens = sum(p.tokens for p in selected)
+        logger.info(
+            f"  → Packed search results: kept {len(selected)}/{len(paragraphs)} paragraphs "
+            f"({kept_tokens:,} of {total_tokens:,} tokens, limit: {max_tokens:,})"
+        )
+
+    by_result: Dict[int, List[_Paragraph]] = {}
+    for paragraph in selected:
+        by_result.setdefault(paragraph.result_index, []).append(paragraph)
+
+    for i, result in enumerate(results):
+        chosen = by_result.get(i)
+        if not chosen:
+            continue
+        text = _result_text(result)
+        yield _result_header(i + 1, result)
+        for n, paragraph in enumerate(sorted(chosen, key=lambda p: p.start)):
+            if n:
+                yield "\n\n"
+            yield text[paragraph.start:paragraph.end]
+        yield _RESULT_FOOTER
+
+
+def _select_by_value(paragraphs: List[_Paragraph], header_tokens: Dict[int, int],
+                     max_tokens: int) -> List[_Paragraph]:
+    """Greedy knapsack by value per token, charging each result's header once."""
+    budget = max_tokens
+    opened = set()
+    selected = []
+
+    for paragraph in sorted(paragraphs, key=lambda p: p.value / p.tokens, reverse=True):
+        cost = paragraph.tokens
+        if paragraph.result_index not in opened:
+            cost += header_tokens[paragraph.result_index]
+        if cost > budget:
+            continue
+        budget -= cost
+        opened.add(paragraph.result_index)
+        selected.append(paragraph)
+
+    return selected
@@ -0,0 +1,110 @@
+"""
+Run-wide deadlines for courses, pipeline steps and individual API calls.
+
+Deadlines nest: a course deadline contains step deadlines, which contain
+calls. Every LLM/Tavily request is sent with a timeout no longer than the
+per-call limit and the time left before the earliest active deadline, so a
+stuck connection is dropped when the deadline passes. Once it has passed,
+no new request is started and DeadlineExceeded is raised; work completed
+so far is already checkpointed by the nodes, so a re-run resumes from it.
+
+Active deadlines are tracked in a context variable. Work handed to other
+threads must be wrapped with `propagate` to stay under the same deadlines.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional, Tuple
+
+from src.config import Config
+
+
+class DeadlineExceeded(RuntimeError):
+    """Raised when a course, step or call runs past its deadline."""
+
+    def __init__(self, label: str):
+        super().__init__(f"{label} deadline exceeded")
+        self.label = label
+
+
+class Deadline:
+    """An absolute point in (monotonic) time by which work must finish."""
+
+    def __init__(self, expires_at: float, label: str):
+        self.expires_at = expires_at
+        self.label = label
+
+    @classmethod
+    def after(cls, seconds: Optional[float], label: str) -> Optional["Deadline"]:
+        """Deadline `seconds` from now, or None for no limit."""
+        if not seconds:
+            return None
+        return cls(time.monotonic() + seconds, label)
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+
+_active: contextvars.ContextVar[Tuple[Deadline, ...]] = contextvars.ContextVar("deadlines", default=())
+_call_timeout: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("call_timeout", default=None)
+
+
+@contextmanager
+def deadline_scope(*deadlines: Optional[Deadline], call_timeout: Optional[float] = None):
+    """
+    Run a block under additional deadlines (None entries are ignored).
+
+    Args:
+        deadlines: Deadlines to add
+        call_timeout: Per-call timeout in seconds for the block (default CALL_TIMEOUT)
+    """
+    active_token = _active.set(_active.get() + tuple(d for d in deadlines if d))
+    timeout_token = _call_timeout.set(call_timeout) if call_timeout else None
+    try:
+        yield
+    finally:
+        if timeout_token:
+            _call_timeout.reset(timeout_token)
+        _active.reset(active_token)
+
+
+def earliest() -> Optional[Deadline]:
+    """The active deadline that expires first, if any."""
+    active = _active.get()
+    return min(active, key=lambda d: d.expires_at) if active else None
+
+
+def check() -> None:
+    """Raise DeadlineExceeded if an active deadline has passed."""
+    deadline = earliest()
+    if deadline and deadline.remaining() <= 0:
+        raise DeadlineExceeded(deadline.label)
+
+
+def request_timeout() -> float:
+    """
+    Timeout for the next API request.
+
+    Returns:
+        Seconds: the per-call limit, capped by the earliest active deadline
+
+    Raises:
+        DeadlineExceeded: If an active deadline has already passed
+    """
+    check()
+    timeout = _call_timeout.get() or Config.CALL_TIMEOUT
+    deadline = earliest()
+    if deadline:
+        timeout = min(timeout, deadline.remaining())
+    return max(timeout, 0.001)
+
+
+def propagate(fn: Callable) -> Callable:
+    """Wrap a function so it runs under the caller's deadlines in another thread."""
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+
+    return run
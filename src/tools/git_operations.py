@@ -5,8 +5,10 @@ Git operations for version control and publishing.
 import subprocess
 from pathlib import Path
 from src.config import Config
+from src.tools.blob_store import BLOB_DIR_NAME
+from src.tools.metrics import GIT_OPERATION_SECONDS, GIT_OPERATIONS, track
 
-
+@track(GIT_OPERATION_SECONDS, GIT_OPERATIONS, operation="init")
 def init_repo(repo_path: Path) -> None:
     """
     Initialize a git repository at the given path.
@@ -51,6 +53,7 @@ def _configure_git_user(repo_path: Path) -> None:
         pass
 
 
+@track(GIT_OPERATION_SECONDS, GIT_OPERATIONS, operation="commit")
 def commit_changes(repo_path: Path, message: str) -> None:
     """
     Stage all changes and create a commit.
@@ -68,6 +71,14 @@ def commit_changes(repo_path: Path, message: str) -> None:
             capture_output=True
         )
 
+        # Artifact blobs stay local, also in repositories that committed them before they were ignored
+        subprocess.run(
+            ['git', 'rm', '-r', '--cached', '--quiet', '--ignore-unmatch', '--', BLOB_DIR_NAME],
+            cwd=repo_path,
+            check=True,
+            capture_output=True
+        )
+
         # Commit
         subprocess.run(
             ['git', 'commit', '-m', message],
@@ -81,6 +92,37 @@ def commit_changes(repo_path: Path, message: str) -> None:
         raise RuntimeError(f"Failed to commit changes: {e.stderr}")
 
 
+@track(GIT_OPERATION_SECONDS, GIT_OPERATIONS, operation="commit")
+def commit_files(repo_path: Path, paths: list, message: str) -> None:
+    """
+    Stage and commit only the given files, leaving other changes alone.
+
+    Args:
+        repo_path: Path to the repository directory
+        paths: Files to commit
+        message: Commit message
+    """
+    paths = [str(path) for path in paths]
+    try:
+        subprocess.run(
+            ['git', 'add', '--'] + paths,
+            cwd=repo_path,
+            check=True,
+            capture_output=True
+        )
+        subprocess.run(
+            ['git', 'commit', '-m', message, '--'] + paths,
+            cwd=repo_path,
+            check=True,
+            capture_output=True,
+            text=True
+        )
+
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to commit changes: {e.stderr}")
+
+
+@track(GIT_OPERATION_SECONDS, GIT_OPERATIONS, operation="push")
 def push_to_remote(repo_path: Path, remote_url: str = None) -> None:
     """
     Push commits to a remote repository.
@@ -142,6 +184,27 @@ def push_to_remote(repo_path: Path, remote_url: str = None) -> None:
         raise RuntimeError(f"Failed to push to remote: {e.stderr}")
 
 
+def get_repo_root(repo_path: Path) -> Path:
+    """
+    Get the top-level directory of the git repository containing a path.
+
+    Args:
+        repo_path: A directory inside the repository
+
+    Returns:
+        The repository root, or repo_path itself if it is not in a repository
+    """
+    result = subprocess.run(
+        ['git', 'rev-parse', '--show-toplevel'],
+        cwd=repo_path,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0 or not result.stdout.strip():
+        return Path(repo_path).resolve()
+    return Path(result.stdout.strip()).resolve()
+
+
 def get_repo_info(repo_path: Path) -> dict:
     """
     Get information about the git repository.
@@ -0,0 +1,178 @@
+"""
+Request hedging for cutting tail latency on slow LLM calls.
+
+A hedged call starts the primary request and waits for its first token.
+If no token has arrived by a percentile of recently observed
+time-to-first-token, a duplicate request is sent to a secondary endpoint
+or model. Whichever attempt finishes first wins and the other one is
+cancelled. A budget caps how many hedges a process may send.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Optional
+
+from src.tools.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class HedgeCancelled(Exception):
+    """Raised inside an attempt when the competing attempt has already won."""
+
+
+class LatencyTracker:
+    """Thread-safe sliding window of observed latencies (in seconds)."""
+
+    def __init__(self, window: int = 100):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        """Record one latency observation."""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def count(self) -> int:
+        """Number of observations currently in the window."""
+        with self._lock:
+            return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """
+        Get a percentile of the recorded latencies.
+
+        Args:
+            pct: Percentile between 0 and 100
+
+        Returns:
+            Latency in seconds, or None if nothing has been recorded
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+
+        if not samples:
+            return None
+
+        index = min(len(samples) - 1, max(0, int(round(pct / 100 * (len(samples) - 1)))))
+        return samples[index]
+
+
+class HedgeBudget:
+    """
+    Caps the number of hedged requests.
+
+    A hedge is allowed only while the total stays under `max_hedges` and
+    under `max_fraction` of all primary calls made so far.
+    """
+
+    def __init__(self, max_hedges: int, max_fraction: float):
+        self.max_hedges = max_hedges
+        self.max_fraction = max_fraction
+        self.calls = 0
+        self.hedges = 0
+        self._lock = threading.Lock()
+
+    def record_call(self) -> None:
+        """Count one primary call."""
+        with self._lock:
+            self.calls += 1
+
+    def try_acquire(self) -> bool:
+        """Reserve one hedge if the budget allows it."""
+        with self._lock:
+            if self.hedges >= self.max_hedges:
+                return False
+            if self.hedges + 1 > self.max_fraction * max(self.calls, 1):
+                return False
+            self.hedges += 1
+            return True
+
+
+# An attempt receives (first_token_event, cancel_event) and returns the full text.
+# It must set the first event on its first token and stop once cancel is set.
+Attempt = Callable[[threading.Event, threading.Event], str]
+
+
+class _FirstTokenEvent(threading.Event):
+    """Event that records the time-to-first-token when it is first set."""
+
+    def __init__(self, tracker: LatencyTracker):
+        super().__init__()
+        self._tracker = tracker
+        self._start = time.monotonic()
+
+    def set(self) -> None:
+        if not self.is_set():
+            self._tracker.record(time.monotonic() - self._start)
+        super().set()
+
+
+def hedged_call(
+    primary: Attempt,
+    hedge: Attempt,
+    tracker: LatencyTracker,
+    budget: HedgeBudget,
+    percentile: float,
+    min_samples: int
+) -> str:
+    """
+    Run `primary`, hedging with `hedge` if the first token is late.
+
+    Args:
+        primary: Attempt against the primary endpoint/model
+        hedge: Attempt against the secondary endpoint/model
+        tracker: Time-to-first-token history used to pick the hedge delay
+        budget: Hedge budget shared across calls
+        percentile: Percentile of the history used as the hedge delay
+        min_samples: Minimum history size before hedging kicks in
+
+    Returns:
+        Text from whichever attempt finished first
+    """
+    budget.record_call()
+    delay = tracker.percentile(percentile) if tracker.count() >= min_samples else None
+
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        primary_first, primary_cancel = _FirstTokenEvent(tracker), threading.Event()
+        primary_future = executor.submit(primary, primary_first, primary_cancel)
+
+        if delay is None:
+            return primary_future.result()
+
+        primary_first.wait(timeout=delay)
+        if primary_first.is_set() or primary_future.done() or not budget.try_acquire():
+            return primary_future.result()
+
+        logger.info(f"  ⚡ No first token after {delay:.1f}s - sending hedged request")
+        hedge_first, hedge_cancel = _FirstTokenEvent(tracker), threading.Event()
+        hedge_future = executor.submit(hedge, hedge_first, hedge_cancel)
+
+        attempts = {primary_future: primary_cancel, hedge_future: hedge_cancel}
+        pending = set(attempts)
+        last_error = None
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+
+                # Cancel the loser
+                for other, cancel in attempts.items():
+                    if other is not future:
+                        cancel.set()
+                if future is hedge_future:
+                    logger.info(f"  ⚡ Hedged request won")
+                return result
+
+        raise last_error
+
+    finally:
+        executor.shutdown(wait=False)
@@ -0,0 +1,257 @@
+"""
+Cross-course knowledge reuse index.
+
+Keeps a small TF-IDF index over the courses generated in one base directory
+(`--repo-dir` or outputs/), built from each course's topic, research notes,
+knowledge base and sources. At research time, past courses on highly similar
+topics are found and their research notes are reused as seed context, so the
+fresh search only has to fill the gaps.
+
+Similarity of a new topic to a past course is the IDF-weighted share of the
+topic's terms that are among the course's most salient (highest TF-IDF)
+terms, from 0.0 (unrelated) to 1.0 (every topic term is central to it).
+
+The index lives in `<base dir>/.knowledge_index.json`. It is rebuilt from
+the course state files when missing, and a course missing from it (e.g.
+after two runs updated it concurrently) is added again on its next run.
+"""
+
+import json
+import math
+import os
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.config import Config
+from src.tools.blob_store import get_text
+from src.tools.context_packing import tokenize
+from src.tools.log import get_logger
+
+logger = get_logger(__name__)
+
+
+INDEX_FILE_NAME = ".knowledge_index.json"
+
+# Terms stored per course (by frequency); salience is computed from these
+_STORED_TERMS = 300
+
+_INDEX_STOPWORDS = {
+    'about', 'after', 'all', 'also', 'any', 'back', 'because', 'been', 'before',
+    'between', 'both', 'but', 'can', 'could', 'do', 'does', 'each', 'even', 'every',
+    'first', 'get', 'has', 'have', 'here', 'if', 'its', 'just', 'like', 'make',
+    'many', 'may', 'more', 'most', 'much', 'must', 'new', 'no', 'not', 'now', 'one',
+    'only', 'other', 'our', 'out', 'over', 'same', 'see', 'should', 'so', 'some',
+    'such', 'than', 'that', 'their', 'them', 'then', 'there', 'these', 'they',
+    'this', 'those', 'through', 'two', 'up', 'use', 'used', 'uses', 'using', 'very',
+    'was', 'we', 'were', 'when', 'where', 'which', 'while', 'who', 'why', 'will',
+    'within', 'without', 'would', 'you', 'your',
+}
+
+_lock = threading.Lock()
+
+
+def _index_file(base_path: Path) -> Path:
+    return Path(base_path) / INDEX_FILE_NAME
+
+
+def _term_counts(texts: Iterable[str]) -> Dict[str, int]:
+    """Most frequent significant terms of a course's texts."""
+    counts = Counter()
+    for text in texts:
+        counts.update(t for t in tokenize(text) if t not in _INDEX_STOPWORDS and len(t) > 1)
+    return dict(counts.most_common(_STORED_TERMS))
+
+
+def load_index(base_path: Path) -> Dict[str, Dict[str, Any]]:
+    """
+    Load the index of a base directory, building it from saved course state if missing.
+
+    Args:
+        base_path: Directory containing the course directories
+
+    Returns:
+        Mapping of course slug → index entry
+    """
+    index_file = _index_file(base_path)
+    if index_file.exists():
+        try:
+            return json.loads(index_file.read_text(encoding='utf-8'))
+        except Exception as e:
+            logger.warning(f"  ⚠ Warning: Could not load knowledge index, rebuilding: {e}")
+
+    return rebuild_index(base_path)
+
+
+def rebuild_index(base_path: Path) -> Dict[str, Dict[str, Any]]:
+    """
+    Build the index from the state files of all courses in a base directory.
+
+    Args:
+        base_path: Directory containing the course directories
+
+    Returns:
+        Mapping of course slug → index entry
+    """
+    index = {}
+    base_path = Path(base_path)
+    for state_file in sorted(base_path.glob("*/.agent_state.json")):
+        course_path = state_file.parent
+        try:
+            saved_state = json.loads(state_file.read_text(encoding='utf-8'))
+            if not saved_state.get("knowledge_base"):
+                continue
+            index[course_path.name] = _make_entry(
+                saved_state.get("topic") or course_path.name,
+                get_text(saved_state.get("raw_notes"), course_path),
+                get_text(saved_state.get("knowledge_base"), course_path),
+                saved_state.get("research_sources", []),
+                (saved_state.get("artifacts") or {}).get("knowledge_base", {}).get("hash")
+            )
+        except Exception as e:
+            logger.debug("Skipping %s in knowledge index: %s", course_path, e)
+
+    if index:
+        _write_index(base_path, index)
+        logger.info(f"  ✓ Built knowledge index over {len(index)} existing courses")
+    return index
+
+
+def _make_entry(topic: str, raw_notes: str, knowledge_base: str,
+                sources: List[Dict[str, Any]], knowledge_base_hash: Optional[str]) -> Dict[str, Any]:
+    # Reused seed material is not counted again
+    own_sources = [s for s in sources if not s.get('reused_from')]
+    return {
+        "topic": topic,
+        "knowledge_base_hash": knowledge_base_hash,
+        "sources": [s.get('url', '') for s in own_sources],
+        # The topic is repeated so that it dominates the course's terms
+        "terms": _term_counts([topic] * 5 + [raw_notes, knowledge_base] + [s.get('title', '') for s in own_sources]),
+    }
+
+
+def _write_index(base_path: Path, index: Dict[str, Dict[str, Any]]) -> None:
+    index_file = _index_file(base_path)
+    tmp_file = index_file.with_suffix(f".tmp{os.getpid()}.{threading.get_ident()}")
+    tmp_file.write_text(json.dumps(index), encoding='utf-8')
+    tmp_file.replace(index_file)
+
+
+def is_indexed(course_path: Path, knowledge_base_hash: Optional[str]) -> bool:
+    """Check whether a course is indexed with its current knowledge base."""
+    course_path = Path(course_path)
+    entry = load_index(course_path.parent).get(course_path.name)
+    return bool(entry) and entry.get("knowledge_base_hash") == knowledge_base_hash
+
+
+def index_course(course_path: Path, topic: str, raw_notes: str, knowledge_base: str,
+                 sources: List[Dict[str, Any]], knowledge_base_hash: Optional[str] = None) -> None:
+    """
+    Add or update a course in the index of its base directory.
+
+    Args:
+        course_path: Course directory
+        topic: Course topic
+        raw_notes: Research notes
+        knowledge_base: Synthesized knowledge base
+        sources: Research sources
+        knowledge_base_hash: Content hash of the knowledge base
+    """
+    course_path = Path(course_path)
+    with _lock:
+        try:
+            index = load_index(course_path.parent)
+            index[course_path.name] = _make_entry(topic, raw_notes, knowledge_base, sources, knowledge_base_hash)
+            _write_index(course_path.parent, index)
+        except Exception as e:
+            # Reuse is an optimization and must never break a run
+            logger.warning(f"  ⚠ Warning: Could not update knowledge index: {e}")
+
+
+def _salient_terms(terms: Dict[str, int], idf: Dict[str, float]) -> Dict[str, float]:
+    """The course's top terms by TF-IDF (sublinear TF)."""
+    weights = {t: (1 + math.log(tf)) * idf[t] for t, tf in terms.items()}
+    top = sorted(weights.items(), key=lambda item: item[1], reverse=True)[:Config.REUSE_SALIENT_TERMS]
+    return dict(top)
+
+
+def find_related_courses(course_path: Path, topic: str, threshold: float = None,
+                         limit: int = None) -> List[Tuple[float, str, Dict[str, Any]]]:
+    """
+    Find past courses on topics similar to a new one.
+
+    Args:
+        course_path: Directory of the new course (excluded from the results)
+        topic: The new course's topic
+        threshold: Minimum similarity (default REUSE_SIMILARITY_THRESHOLD)
+        limit: Maximum number of courses (default REUSE_MAX_COURSES)
+
+    Returns:
+        List of (similarity, course slug, index entry), most similar first
+    """
+    if threshold is None:
+        threshold = Config.REUSE_SIMILARITY_THRESHOLD
+    if limit is None:
+        limit = Config.REUSE_MAX_COURSES
+
+    course_path = Path(course_path)
+    index = load_index(course_path.parent)
+    index.pop(course_path.name, None)
+
+    query = [t for t in dict.fromkeys(tokenize(topic)) if t not in _INDEX_STOPWORDS]
+    if not index or not query:
+        return []
+
+    # Smoothed IDF over the indexed courses
+    document_frequency = Counter(t for entry in index.values() for t in entry["terms"])
+    n = len(index)
+    idf = {t: math.log((1 + n) / (1 + df)) + 1 for t, df in document_frequency.items()}
+    query_idf = {t: idf.get(t, math.log(1 + n) + 1) for t in query}
+    query_weight = sum(query_idf.values())
+
+    related = []
+    for slug, entry in index.items():
+        salient = _salient_terms(entry["terms"], idf)
+        similarity = sum(w for t, w in query_idf.items() if t in salient) / query_weight
+        if similarity >= threshold:
+            related.append((similarity, slug, entry))
+
+    related.sort(key=lambda item: item[0], reverse=True)
+    return related[:limit]
+
+
+def load_seed_results(course_path: Path, related: List[Tuple[float, str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Load related courses' research notes as search-result-shaped seed context.
+
+    Args:
+        course_path: Directory of the new course
+        related: Output of find_related_courses
+
+    Returns:
+        Results with title, url, raw_content and score (the similarity),
+        plus the related course's slug and notes hash
+    """
+    base_path = Path(course_path).parent
+    results = []
+    for similarity, slug, entry in related:
+        related_path = base_path / slug
+        try:
+            saved_state = json.loads((related_path / ".agent_state.json").read_text(encoding='utf-8'))
+            raw_notes = get_text(saved_state.get("raw_notes"), related_path)
+        except Exception as e:
+            logger.warning(f"  ⚠ Warning: Could not load notes of related course {slug}: {e}")
+            continue
+        if not raw_notes:
+            continue
+
+        results.append({
+            "title": f"Research notes from related course: {entry['topic']}",
+            "url": f"course:{slug}",
+            "raw_content": raw_notes,
+            "score": round(similarity, 3),
+            "reused_from": slug,
+            "notes_hash": ((saved_state.get("artifacts") or {}).get("raw_notes") or {}).get("hash"),
+        })
+    return results
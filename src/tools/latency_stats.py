@@ -0,0 +1,134 @@
+"""
+Historical latency statistics for LLM and search calls.
+
+Every call records its duration and output token count per (kind, model),
+so dry-run planning can project wall time from what calls actually took
+instead of guesses. Samples are kept in memory and merged into a small JSON
+file once per run (flush_latency_stats, also run at exit); the file is
+replaced atomically, so a crash or a concurrent run never leaves it torn.
+"""
+
+import atexit
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from src.config import Config
+from src.tools.log import get_logger
+
+logger = get_logger(__name__)
+
+
+_MAX_SAMPLES = 200
+_lock = threading.Lock()
+
+# Samples recorded by this process and not yet written to the file
+_pending: Dict[str, List[List[float]]] = {}
+_flush_registered = False
+
+
+def _stats_file() -> Path:
+    return Path(Config.LATENCY_STATS_FILE)
+
+
+def load_latency_stats() -> Dict[str, List[List[float]]]:
+    """
+    Load recorded samples, including those of this run not yet flushed.
+
+    Returns:
+        Mapping of "kind:model" → list of [seconds, output_tokens]
+    """
+    with _lock:
+        return _merge(_read_stats_file(), _pending)
+
+
+def _merge(stats: Dict[str, List[List[float]]], samples: Dict[str, List[List[float]]]) -> Dict[str, List[List[float]]]:
+    """Stats with samples appended, keeping the newest _MAX_SAMPLES per key."""
+    merged = {key: list(values) for key, values in stats.items()}
+    for key, values in samples.items():
+        merged[key] = (merged.get(key, []) + values)[-_MAX_SAMPLES:]
+    return merged
+
+
+def _read_stats_file() -> Dict[str, List[List[float]]]:
+    stats_file = _stats_file()
+    if not stats_file.exists():
+        return {}
+    try:
+        return json.loads(stats_file.read_text(encoding='utf-8'))
+    except Exception as e:
+        logger.warning(f"  ⚠ Warning: Could not load latency stats: {e}")
+        return {}
+
+
+def record_latency(kind: str, model: str, seconds: float, output_tokens: int = 0) -> None:
+    """
+    Record one call.
+
+    Args:
+        kind: Call kind ("openai", "claude", "search")
+        model: Model name (or search depth for searches)
+        seconds: Wall time of the call
+        output_tokens: Tokens generated by the call
+    """
+    global _flush_registered
+    key = f"{kind}:{model}"
+    with _lock:
+        samples = _pending.setdefault(key, [])
+        samples.append([round(seconds, 3), output_tokens])
+        del samples[:-_MAX_SAMPLES]
+        if not _flush_registered:
+            atexit.register(flush_latency_stats)
+            _flush_registered = True
+
+
+def flush_latency_stats() -> None:
+    """
+    Merge this run's samples into the stats file.
+
+    The file is re-read right before writing, so samples other runs flushed
+    in the meantime are kept, and replaced atomically.
+    """
+    with _lock:
+        if not _pending:
+            return
+        try:
+            stats = _merge(_read_stats_file(), _pending)
+            stats_file = _stats_file()
+            stats_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = stats_file.with_suffix(f".tmp{os.getpid()}.{threading.get_ident()}")
+            tmp_file.write_text(json.dumps(stats), encoding='utf-8')
+            tmp_file.replace(stats_file)
+            _pending.clear()
+        except Exception as e:
+            # Statistics must never break a run
+            logger.debug("Could not record latency stats: %s", e)
+
+
+def get_latency_profile(kind: str, model: str,
+                        stats: Optional[Dict[str, List[List[float]]]] = None) -> Optional[Tuple[float, float, int]]:
+    """
+    Summarize recorded calls of one kind/model.
+
+    Args:
+        kind: Call kind
+        model: Model name
+        stats: Preloaded stats (loaded from disk if omitted)
+
+    Returns:
+        (mean seconds per call, output tokens per second, sample count),
+        or None if nothing has been recorded
+    """
+    if stats is None:
+        stats = load_latency_stats()
+
+    samples = stats.get(f"{kind}:{model}")
+    if not samples:
+        return None
+
+    total_seconds = sum(s for s, _ in samples)
+    total_tokens = sum(t for _, t in samples)
+    tokens_per_second = total_tokens / total_seconds if total_seconds and total_tokens else 0.0
+    return total_seconds / len(samples), tokens_per_second, len(samples)
@@ -3,17 +3,43 @@ LLM client wrappers for OpenAI and Anthropic.
 Provides unified interface for calling different models.
 
 Supports both direct API access and GitHub Copilot API routing.
+
+Every request is sent with a timeout from src/tools/deadlines.py, so no
+call outlives the per-call limit or the course/step deadline.
+
+Claude calls given a validator are streamed and aborted as soon as the
+output is clearly malformed, then retried (see src/tools/stream_validation.py).
 """
 
+import threading
+import time
+from typing import Callable
 from openai import OpenAI
 from anthropic import Anthropic
 from src.config import Config
+from src.tools.deadlines import DeadlineExceeded, check, earliest, request_timeout
+from src.tools.hedging import HedgeBudget, HedgeCancelled, LatencyTracker, hedged_call
+from src.tools.latency_stats import record_latency
+from src.tools.metrics import (
+    LLM_REQUEST_SECONDS, LLM_REQUESTS, LLM_TOKENS, STREAM_VALIDATION_FAILURES,
+    count_attempts, endpoint_label, instrument_http_client
+)
+from src.tools.stream_validation import LessonStreamValidator, StreamAborted
+from src.tools.token_utils import count_tokens
+from src.tools.log import get_logger, payload_summary
+
+logger = get_logger(__name__)
 
 
 # Lazy initialization of clients
 _openai_client = None
 _anthropic_client = None
 _claude_via_openai_client = None
+_claude_hedge_client = None
+
+# Time-to-first-token history and hedge budget for Claude calls
+_claude_ttft_tracker = LatencyTracker()
+_claude_hedge_budget = HedgeBudget(Config.HEDGE_MAX_REQUESTS, Config.HEDGE_MAX_FRACTION)
 
 
 def get_openai_client() -> OpenAI:
@@ -27,6 +53,7 @@ def get_openai_client() -> OpenAI:
             _openai_client = OpenAI(api_key=api_key, base_url=base_url)
         else:
             _openai_client = OpenAI(api_key=api_key)
+        instrument_http_client(_openai_client, "openai")
     return _openai_client
 
 
@@ -35,7 +62,7 @@ def get_anthropic_client() -> Anthropic:
     global _anthropic_client
     if _anthropic_client is None:
         api_key = Config.get_api_key_for_claude()
-        _anthropic_client = Anthropic(api_key=api_key)
+        _anthropic_client = instrument_http_client(Anthropic(api_key=api_key), "claude")
     return _anthropic_client
 
 
@@ -49,10 +76,57 @@ def get_claude_via_openai_client() -> OpenAI:
     if _claude_via_openai_client is None:
         base_url = Config.get_base_url_for_claude()
         api_key = Config.get_api_key_for_claude()
-        _claude_via_openai_client = OpenAI(api_key=api_key, base_url=base_url)
+        _claude_via_openai_client = instrument_http_client(OpenAI(api_key=api_key, base_url=base_url), "claude")
     return _claude_via_openai_client
 
 
+def get_claude_hedge_client():
+    """
+    Get the client used for hedged Claude requests.
+
+    Points at HEDGE_BASE_URL when set, otherwise at the primary endpoint.
+    Uses the same API flavour (Anthropic or OpenAI-compatible) as the primary.
+    """
+    global _claude_hedge_client
+    if _claude_hedge_client is None:
+        base_url = Config.get_hedge_base_url_for_claude()
+        api_key = Config.get_api_key_for_claude()
+
+        if Config.USE_GITHUB_COPILOT:
+            _claude_hedge_client = OpenAI(api_key=api_key, base_url=base_url)
+        elif base_url:
+            _claude_hedge_client = Anthropic(api_key=api_key, base_url=base_url)
+        else:
+            _claude_hedge_client = Anthropic(api_key=api_key)
+        instrument_http_client(_claude_hedge_client, "claude")
+    return _claude_hedge_client
+
+
+def get_claude_client():
+    """Get the primary Claude client for the configured routing mode."""
+    if Config.USE_GITHUB_COPILOT:
+        return get_claude_via_openai_client()
+    return get_anthropic_client()
+
+
+def _record_call(provider: str, model: str, endpoint: str, start: float, status: str,
+                 input_tokens: int = 0, output_tokens: int = 0) -> None:
+    """Record request metrics of one LLM call."""
+    labels = {"provider": provider, "model": model, "endpoint": endpoint}
+    LLM_REQUESTS.inc(status=status, **labels)
+    LLM_REQUEST_SECONDS.observe(time.monotonic() - start, **labels)
+    if status == "ok":
+        LLM_TOKENS.inc(input_tokens, direction="input", **labels)
+        LLM_TOKENS.inc(output_tokens, direction="output", **labels)
+
+
+def _failure_status(error: Exception) -> str:
+    deadline = earliest()
+    if isinstance(error, DeadlineExceeded) or (deadline and deadline.remaining() <= 0):
+        return "deadline"
+    return "error"
+
+
 def call_openai(system_prompt: str, user_prompt: str, temperature: float = 0.7) -> str:
     """
     Call OpenAI GPT-4o for planning and structuring tasks.
@@ -67,23 +141,41 @@ def call_openai(system_prompt: str, user_prompt: str, temperature: float = 0.7)
     Returns:
         The model's response as a string
     """
+    timeout = request_timeout()
+    start = time.monotonic()
+    endpoint = "unknown"
     try:
         client = get_openai_client()
-        response = client.chat.completions.create(
-            model=Config.OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=temperature
-        )
-        return response.choices[0].message.content
+        endpoint = endpoint_label(client)
+        with count_attempts("openai", endpoint):
+            response = client.chat.completions.create(
+                model=Config.OPENAI_MODEL,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                temperature=temperature,
+                timeout=timeout
+            )
+        content = response.choices[0].message.content
 
     except Exception as e:
+        _record_call("openai", Config.OPENAI_MODEL, endpoint, start, _failure_status(e))
+        check()  # Report a timeout caused by a passed deadline as such
         raise RuntimeError(f"OpenAI API call failed: {str(e)}")
 
+    output_tokens = count_tokens(content)
+    record_latency("openai", Config.OPENAI_MODEL, time.monotonic() - start, output_tokens)
+    _record_call(
+        "openai", Config.OPENAI_MODEL, endpoint, start, "ok",
+        count_tokens(system_prompt) + count_tokens(user_prompt), output_tokens
+    )
+    logger.debug("OpenAI response: %s", payload_summary(content))
+    return content
+
 
-def call_claude(system_prompt: str, user_prompt: str, temperature: float = 1.0, max_tokens: int = 16000) -> str:
+def call_claude(system_prompt: str, user_prompt: str, temperature: float = 1.0, max_tokens: int = 16000,
+                make_validator: Callable[[], LessonStreamValidator] = None) -> str:
     """
     Call Claude Sonnet-4 for knowledge synthesis and lecture writing.
 
@@ -99,40 +191,209 @@ def call_claude(system_prompt: str, user_prompt: str, temperature: float = 1.0,
         user_prompt: User message with the task
         temperature: Sampling temperature (0.0 to 1.0)
         max_tokens: Maximum tokens to generate
+        make_validator: Creates a validator for the streamed output; with
+            STREAM_VALIDATION, malformed output is aborted and requested
+            again up to STREAM_VALIDATION_RETRIES times
 
     Returns:
         The model's response as a string
     """
+    if make_validator is None or not Config.STREAM_VALIDATION:
+        return _call_claude(system_prompt, user_prompt, temperature, max_tokens)
+
+    for _ in range(Config.STREAM_VALIDATION_RETRIES):
+        try:
+            return _call_claude(system_prompt, user_prompt, temperature, max_tokens, make_validator)
+        except StreamAborted as e:
+            STREAM_VALIDATION_FAILURES.inc(reason=e.reason, outcome="retried")
+            logger.warning(f"  ⚠ Aborted malformed output ({e}) - retrying")
+
+    # The last attempt is kept whatever its structure
+    content = _call_claude(system_prompt, user_prompt, temperature, max_tokens)
+    validator = make_validator()
     try:
-        if Config.USE_GITHUB_COPILOT:
+        validator.feed(content)
+        validator.finish()
+    except StreamAborted as e:
+        STREAM_VALIDATION_FAILURES.inc(reason=e.reason, outcome="kept")
+        logger.warning(f"  ⚠ Keeping malformed output after {Config.STREAM_VALIDATION_RETRIES} retries ({e})")
+    return content
+
+
+def _call_claude(system_prompt: str, user_prompt: str, temperature: float, max_tokens: int,
+                 make_validator: Callable[[], LessonStreamValidator] = None) -> str:
+    """One Claude request; streamed through a validator if one is given."""
+    timeout = request_timeout()
+    start = time.monotonic()
+    endpoint = "unknown"
+    try:
+        endpoint = endpoint_label(get_claude_client())
+
+        if Config.HEDGE_ENABLED:
+            content = _call_claude_hedged(
+                system_prompt, user_prompt, temperature, max_tokens, timeout, make_validator
+            )
+
+        elif make_validator is not None:
+            content = _stream_claude(
+                get_claude_client(), Config.CLAUDE_MODEL, system_prompt, user_prompt,
+                temperature, max_tokens, threading.Event(), threading.Event(),
+                timeout, earliest(), make_validator()
+            )
+
+        elif Config.USE_GITHUB_COPILOT:
             # Use OpenAI-compatible client for GitHub Copilot routing
             client = get_claude_via_openai_client()
-            response = client.chat.completions.create(
-                model=Config.CLAUDE_MODEL,
+            with count_attempts("claude", endpoint):
+                response = client.chat.completions.create(
+                    model=Config.CLAUDE_MODEL,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    timeout=timeout
+                )
+            content = response.choices[0].message.content
+        else:
+            # Use direct Anthropic API
+            client = get_anthropic_client()
+            with count_attempts("claude", endpoint):
+                response = client.messages.create(
+                    model=Config.CLAUDE_MODEL,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    system=system_prompt,
+                    messages=[
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    timeout=timeout
+                )
+            content = response.content[0].text
+
+    except DeadlineExceeded:
+        _record_call("claude", Config.CLAUDE_MODEL, endpoint, start, "deadline")
+        raise
+    except StreamAborted:
+        _record_call("claude", Config.CLAUDE_MODEL, endpoint, start, "aborted")
+        raise
+    except Exception as e:
+        _record_call("claude", Config.CLAUDE_MODEL, endpoint, start, _failure_status(e))
+        check()  # Report a timeout caused by a passed deadline as such
+        raise RuntimeError(f"Claude API call failed: {str(e)}")
+
+    output_tokens = count_tokens(content)
+    record_latency("claude", Config.CLAUDE_MODEL, time.monotonic() - start, output_tokens)
+    _record_call(
+        "claude", Config.CLAUDE_MODEL, endpoint, start, "ok",
+        count_tokens(system_prompt) + count_tokens(user_prompt), output_tokens
+    )
+    logger.debug("Claude response: %s", payload_summary(content))
+    return content
+
+
+def _call_claude_hedged(system_prompt: str, user_prompt: str, temperature: float, max_tokens: int,
+                        timeout: float, make_validator: Callable[[], LessonStreamValidator] = None) -> str:
+    """Call Claude with streaming, hedging to the secondary endpoint/model if the first token is late."""
+    deadline = earliest()
+    primary_client = get_claude_client()
+
+    def make_attempt(client, model):
+        def attempt(first_token: threading.Event, cancel: threading.Event) -> str:
+            return _stream_claude(
+                client, model, system_prompt, user_prompt,
+                temperature, max_tokens, first_token, cancel,
+                timeout, deadline, make_validator() if make_validator else None
+            )
+        return attempt
+
+    return hedged_call(
+        primary=make_attempt(primary_client, Config.CLAUDE_MODEL),
+        hedge=make_attempt(get_claude_hedge_client(), Config.HEDGE_CLAUDE_MODEL),
+        tracker=_claude_ttft_tracker,
+        budget=_claude_hedge_budget,
+        percentile=Config.HEDGE_PERCENTILE,
+        min_samples=Config.HEDGE_MIN_SAMPLES
+    )
+
+
+def _stream_claude(
+    client,
+    model: str,
+    system_prompt: str,
+    user_prompt: str,
+    temperature: float,
+    max_tokens: int,
+    first_token: threading.Event,
+    cancel: threading.Event,
+    timeout: float,
+    deadline=None,
+    validator: LessonStreamValidator = None
+) -> str:
+    """
+    Stream a Claude completion, signalling the first token and honouring cancellation.
+
+    Closing the stream on cancel drops the underlying HTTP connection,
+    so the losing request of a hedge stops generating. The same happens
+    when the deadline passes while tokens are still arriving, and when the
+    validator finds the output malformed (StreamAborted).
+
+    SDK retries are counted here, in the thread making the requests, so
+    those of hedged attempts (run in executor threads) are counted too.
+    """
+    with count_attempts("claude", endpoint_label(client)):
+        parts = []
+
+        def should_stop():
+            if cancel.is_set():
+                raise HedgeCancelled()
+            if deadline and deadline.remaining() <= 0:
+                raise DeadlineExceeded(deadline.label)
+
+        def add(text):
+            first_token.set()
+            parts.append(text)
+            if validator:
+                validator.feed(text)
+
+        if isinstance(client, OpenAI):
+            stream = client.chat.completions.create(
+                model=model,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
                 ],
                 temperature=temperature,
-                max_tokens=max_tokens
+                max_tokens=max_tokens,
+                stream=True,
+                timeout=timeout
             )
-            return response.choices[0].message.content
+            try:
+                for chunk in stream:
+                    should_stop()
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        add(chunk.choices[0].delta.content)
+            finally:
+                stream.close()
         else:
-            # Use direct Anthropic API
-            client = get_anthropic_client()
-            response = client.messages.create(
-                model=Config.CLAUDE_MODEL,
+            with client.messages.stream(
+                model=model,
                 max_tokens=max_tokens,
                 temperature=temperature,
                 system=system_prompt,
                 messages=[
                     {"role": "user", "content": user_prompt}
-                ]
-            )
-            return response.content[0].text
+                ],
+                timeout=timeout
+            ) as stream:
+                for text in stream.text_stream:
+                    should_stop()
+                    add(text)
 
-    except Exception as e:
-        raise RuntimeError(f"Claude API call failed: {str(e)}")
+        if validator:
+            validator.finish()
+        return ''.join(parts)
 
 
 def extract_lesson_outline(synthesis_output: str) -> list[str]:
@@ -185,3 +446,42 @@ def extract_lesson_outline(synthesis_output: str) -> list[str]:
         ]
 
     return lessons
+
+
+def extract_module_outline(outline_output: str) -> list[dict]:
+    """
+    Extract the module outline from Claude's output (hierarchical modules).
+
+    The module outline prompt asks for:
+    ## MODULE OUTLINE
+    1. Module title | One sentence on what it covers
+    ...
+
+    Args:
+        outline_output: The output of the module outline request
+
+    Returns:
+        List of {"title", "summary"} dictionaries (a single module if none was found)
+    """
+    modules = []
+    in_outline_section = False
+
+    for line in outline_output.split('\n'):
+        if 'MODULE OUTLINE' in line.upper() and line.strip().startswith('#'):
+            in_outline_section = True
+            continue
+        line = line.strip()
+        if not in_outline_section or not line or not line[0].isdigit():
+            continue
+
+        item = line.lstrip('0123456789.) ').strip()
+        title, _, summary = item.partition('|')
+        title = title.strip().strip('*[]').strip()
+        if title:
+            modules.append({"title": title, "summary": summary.strip().strip('[]').strip() or title})
+
+    if not modules:
+        # Fallback: the whole course as one module
+        modules = [{"title": "Fundamentals", "summary": "All concepts of the course"}]
+
+    return modules
@@ -0,0 +1,244 @@
+"""
+Local document corpus as a search backend (SEARCH_BACKEND=local).
+
+Research can run against a directory of documents instead of the web, e.g.
+internal docs, a vendored manual or PDF-to-text dumps. Markdown, plain text
+and HTML files under LOCAL_CORPUS_DIR are indexed into an on-disk inverted
+index (see src/tools/search_index.py), by default
+`<corpus dir>/.corpus_index.db`.
+
+Before each search the corpus is synced with the index: files whose size
+and mtime match the index are not read at all, changed files are re-read
+and re-indexed only if their content hash changed, and deleted files are
+dropped. Searches then take milliseconds and return the same `results`
+shape as Tavily ({title, url, content, raw_content, score}), so the rest of
+research does not know where its sources came from.
+"""
+
+import os
+import re
+import threading
+import time
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from src.config import Config
+from src.tools.artifacts import hash_text
+from src.tools.context_packing import tokenize
+from src.tools.latency_stats import record_latency
+from src.tools.metrics import SEARCH_REQUESTS, SEARCH_SECONDS
+from src.tools.search_index import InvertedIndex
+from src.tools.log import get_logger
+
+logger = get_logger(__name__)
+
+
+CORPUS_INDEX_FILE_NAME = ".corpus_index.db"
+
+CORPUS_EXTENSIONS = {".md", ".markdown", ".txt", ".html", ".htm"}
+
+# Length of the `content` snippet of a result (Tavily's snippets are similar)
+_SNIPPET_CHARS = 500
+
+_BLOCK_RE = re.compile(r'\n\s*\n')
+
+_FILES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT NOT NULL
+);
+"""
+
+_lock = threading.Lock()
+
+
+class _HTMLText(HTMLParser):
+    """HTML to Markdown-ish text: headings become "#" lines, blocks become paragraphs."""
+
+    _BLOCKS = {"p", "div", "section", "article", "li", "tr", "pre", "blockquote", "br", "table", "ul", "ol"}
+    _SKIP = {"script", "style", "head", "nav", "noscript"}
+
+    def __init__(self):
+        super().__init__()
+        self.parts: List[str] = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP:
+            self.skipping += 1
+        elif re.fullmatch(r'h[1-6]', tag):
+            self.parts.append("\n\n" + "#" * int(tag[1]) + " ")
+        elif tag in self._BLOCKS:
+            self.parts.append("\n\n")
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP:
+            self.skipping = max(0, self.skipping - 1)
+        elif re.fullmatch(r'h[1-6]', tag) or tag in self._BLOCKS:
+            self.parts.append("\n\n")
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(re.sub(r'\s+', ' ', data))
+
+    def text(self) -> str:
+        text = "".join(self.parts)
+        text = re.sub(r'[ \t]*\n[ \t]*', '\n', text)
+        return re.sub(r'\n{3,}', '\n\n', text).strip() + "\n"
+
+
+def load_corpus_text(path: Path) -> str:
+    """
+    Text of a corpus file; HTML is converted to text with Markdown headings.
+
+    Args:
+        path: Corpus file
+
+    Returns:
+        Document text
+    """
+    text = Path(path).read_text(encoding='utf-8', errors='replace')
+    if Path(path).suffix.lower() in (".html", ".htm"):
+        parser = _HTMLText()
+        parser.feed(text)
+        parser.close()
+        return parser.text()
+    return text
+
+
+def corpus_index_path(corpus_dir: Path) -> Path:
+    """Location of the index of a corpus directory (LOCAL_CORPUS_INDEX overrides it)."""
+    if Config.LOCAL_CORPUS_INDEX:
+        return Path(Config.LOCAL_CORPUS_INDEX)
+    return Path(corpus_dir) / CORPUS_INDEX_FILE_NAME
+
+
+def _corpus_files(corpus_dir: Path):
+    """(relative path, os.stat_result, absolute path) of every corpus file; hidden entries are skipped."""
+    for root, dirs, files in os.walk(corpus_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            if name.startswith(".") or Path(name).suffix.lower() not in CORPUS_EXTENSIONS:
+                continue
+            path = Path(root) / name
+            yield path.relative_to(corpus_dir).as_posix(), path.stat(), path
+
+
+class CorpusIndex(InvertedIndex):
+    """Inverted index of a corpus directory that remembers each file's size and mtime."""
+
+    def __init__(self, db_path: Path):
+        super().__init__(db_path)
+        self.conn.executescript(_FILES_SCHEMA)
+
+    def sync(self, corpus_dir: Path) -> Tuple[int, int]:
+        """
+        Bring the index in line with the files in a corpus directory.
+
+        Args:
+            corpus_dir: Corpus directory
+
+        Returns:
+            (files whose text was indexed, files removed)
+        """
+        corpus_dir = Path(corpus_dir)
+        known: Dict[str, Tuple[int, int]] = {
+            path: (size, mtime_ns)
+            for path, size, mtime_ns in self.conn.execute("SELECT path, size, mtime_ns FROM files")
+        }
+
+        indexed = 0
+        seen = set()
+        for rel_path, stat, path in _corpus_files(corpus_dir):
+            seen.add(rel_path)
+            if known.get(rel_path) == (stat.st_size, stat.st_mtime_ns):
+                continue
+            text = load_corpus_text(path)
+            content_hash = hash_text(text)
+            indexed += self.add(rel_path, lambda: text, content_hash)
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO files (path, size, mtime_ns, hash) VALUES (?, ?, ?, ?)",
+                    (rel_path, stat.st_size, stat.st_mtime_ns, content_hash)
+                )
+
+        removed = sorted(set(known) - seen)
+        for rel_path in removed:
+            self.remove(rel_path)
+            with self.conn:
+                self.conn.execute("DELETE FROM files WHERE path = ?", (rel_path,))
+
+        return indexed, len(removed)
+
+
+def _snippet(text: str, terms: set) -> str:
+    """The paragraph mentioning most query terms, shortened to a snippet."""
+    best, best_hits = "", -1
+    for block in _BLOCK_RE.split(text):
+        block = block.strip()
+        if not block or block.startswith("#"):
+            continue
+        hits = len(terms & set(tokenize(block)))
+        if hits > best_hits:
+            best, best_hits = block, hits
+    best = re.sub(r'\s+', ' ', best)
+    return best if len(best) <= _SNIPPET_CHARS else best[:_SNIPPET_CHARS].rsplit(' ', 1)[0] + " …"
+
+
+def search_corpus(topic: str, max_results: int = None, depth: str = None) -> dict:
+    """
+    Search the local corpus (LOCAL_CORPUS_DIR) for a topic.
+
+    Args:
+        topic: The topic to search for
+        max_results: Maximum number of results (default from config)
+        depth: Ignored; a local search has no depth levels
+
+    Returns:
+        Dictionary with search results in Tavily's shape:
+        - results: List of {title, url, content, raw_content, score}
+          (scores relative to the best hit, 0.0 to 1.0)
+        - query: The search query used
+    """
+    if max_results is None:
+        max_results = Config.TAVILY_MAX_RESULTS
+
+    corpus_dir = Path(Config.LOCAL_CORPUS_DIR or "").expanduser().resolve()
+    start = time.monotonic()
+    try:
+        if not Config.LOCAL_CORPUS_DIR or not corpus_dir.is_dir():
+            raise ValueError(f"LOCAL_CORPUS_DIR is not a directory: {Config.LOCAL_CORPUS_DIR or '(not set)'}")
+
+        with _lock, CorpusIndex(corpus_index_path(corpus_dir)) as index:
+            indexed, removed = index.sync(corpus_dir)
+            if indexed or removed:
+                logger.info(f"  ✓ Corpus index updated: {indexed} indexed, {removed} removed")
+            hits = index.search(topic, limit=max_results)
+
+        terms = set(tokenize(topic))
+        best = hits[0].score if hits else 0
+        results = []
+        for hit in hits:
+            path = corpus_dir / hit.path
+            text = load_corpus_text(path)
+            results.append({
+                'title': hit.title or path.stem,
+                'url': path.as_uri(),
+                'content': _snippet(text, terms),
+                'raw_content': text,
+                'score': round(hit.score / best, 4) if best else 0.0,
+            })
+
+        seconds = time.monotonic() - start
+        record_latency("search", "local", seconds)
+        SEARCH_REQUESTS.inc(depth="local", status="ok")
+        SEARCH_SECONDS.observe(seconds, depth="local")
+        logger.info(f"  ✓ Local corpus returned {len(results)} results in {seconds * 1000:.0f}ms")
+        return {'query': topic, 'results': results, 'response_time': round(seconds, 4)}
+
+    except Exception as e:
+        SEARCH_REQUESTS.inc(depth="local", status="error")
+        raise RuntimeError(f"Local corpus search failed: {str(e)}")
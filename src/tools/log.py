@@ -0,0 +1,130 @@
+"""
+Logging for the pipeline.
+
+All nodes and tools log through loggers under the "src" namespace instead of
+printing. Output can be plain text (the familiar progress lines) or one JSON
+object per line, and the level can be raised to silence progress output.
+
+Large payloads (search responses, model outputs) are only ever logged at
+DEBUG level; INFO level gets size summaries via `payload_summary`.
+"""
+
+import json
+import logging
+import sys
+from typing import Any, Optional
+
+from src.config import Config
+
+
+ROOT_LOGGER = "src"
+
+_configured = False
+
+
+class TextFormatter(logging.Formatter):
+    """Plain message output, matching the CLI progress lines."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        if record.exc_info:
+            message = f"{message}\n{self.formatException(record.exc_info)}"
+        return message
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with any `extra={"fields": {...}}` merged in."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage().strip(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(level: Optional[str] = None, json_format: Optional[bool] = None,
+                      quiet: bool = False) -> None:
+    """
+    Configure the pipeline's log output.
+
+    Args:
+        level: Log level name (default from LOG_LEVEL)
+        json_format: Emit JSON lines instead of text (default from LOG_FORMAT)
+        quiet: Only show warnings and errors
+    """
+    global _configured
+
+    if level is None:
+        level = Config.LOG_LEVEL
+    if json_format is None:
+        json_format = Config.LOG_FORMAT == "json"
+    if quiet:
+        level = "WARNING"
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if json_format else TextFormatter())
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.handlers = [handler]
+    logger.setLevel(level.upper())
+    logger.propagate = False
+    _configured = True
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Get a pipeline logger, configuring output from Config on first use.
+
+    Args:
+        name: Module name (usually __name__)
+
+    Returns:
+        Logger under the "src" namespace
+    """
+    if not _configured:
+        configure_logging()
+    if name != ROOT_LOGGER and not name.startswith(ROOT_LOGGER + "."):
+        name = f"{ROOT_LOGGER}.{name}"
+    return logging.getLogger(name)
+
+
+def payload_summary(payload: Any) -> str:
+    """
+    Summarize a payload by size instead of content.
+
+    Args:
+        payload: String, dict or list
+
+    Returns:
+        Short description like "3 results, 1.2 MB of text"
+    """
+    if isinstance(payload, str):
+        return _format_bytes(len(payload))
+
+    # Search responses: count result text without serializing the payload
+    if isinstance(payload, dict) and isinstance(payload.get('results'), list):
+        results = payload['results']
+        size = sum(len(r.get('raw_content') or r.get('content') or '') for r in results)
+        return f"{len(results)} results, {_format_bytes(size)} of text"
+
+    size = len(json.dumps(payload, default=str))
+    if isinstance(payload, (list, dict)):
+        return f"{len(payload)} items, {_format_bytes(size)}"
+    return _format_bytes(size)
+
+
+def _format_bytes(size: int) -> str:
+    """Human-readable byte count."""
+    if size < 1024:
+        return f"{size} B"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} KB"
+    return f"{size / (1024 * 1024):.1f} MB"
@@ -0,0 +1,375 @@
+"""
+Prometheus/OpenMetrics metrics.
+
+Counters and histograms for LLM and Tavily requests, git operations,
+pipeline nodes, lessons and caches, kept in process memory. They can be
+exported in two ways:
+- a local HTTP endpoint (`--metrics-port` / METRICS_PORT) serving /metrics
+  for Prometheus to scrape while a run is going on
+- a file in the Prometheus text format (`--metrics-textfile` /
+  METRICS_TEXTFILE) written at the end of a run, for node_exporter's
+  textfile collector, since one-shot CLI runs are usually over before the
+  next scrape
+
+The exposition format is implemented here directly, so no client library is
+needed. Recording a sample is a dictionary update under a lock; nothing is
+exported unless one of the two outputs is configured.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+from src.tools.log import get_logger
+
+logger = get_logger(__name__)
+
+
+PREFIX = "vegapunk"
+
+_TEXT_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+_OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = f"{PREFIX}_{name}"
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def render(self, openmetrics: bool = False) -> str:
+        family = self.name
+        if openmetrics and self.kind == "counter":
+            family = self.name[:-len("_total")]
+        lines = [
+            f"# HELP {family} {self.documentation}",
+            f"# TYPE {family} {self.kind}",
+        ]
+        lines += [f"{name}{labels} {_format_value(value)}" for name, labels, value in self.samples()]
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """A monotonically increasing count, per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        if not name.endswith("_total"):
+            name += "_total"
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [(self.name, _format_labels(self.labelnames, key), value) for key, value in values]
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = (0.1, 0.5, 1, 5, 10, 30, 60)):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label values → [bucket counts..., sum, count]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: str):
+        """Observe the duration of a block in seconds."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - start, **labels)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            values = sorted((key, list(data)) for key, data in self._values.items())
+
+        samples = []
+        for key, data in values:
+            for bound, count in zip(self.buckets, data):
+                le = f'le="{_format_value(bound)}"'
+                samples.append((f"{self.name}_bucket", _format_labels(self.labelnames, key, le), count))
+            samples.append((f"{self.name}_sum", _format_labels(self.labelnames, key), data[-2]))
+            samples.append((f"{self.name}_count", _format_labels(self.labelnames, key), data[-1]))
+        return samples
+
+
+class Registry:
+    """The set of metrics that is exported."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self, openmetrics: bool = False) -> str:
+        """Render all metrics in the Prometheus text format (or OpenMetrics)."""
+        text = "\n".join(metric.render(openmetrics) for metric in self._metrics) + "\n"
+        return text + "# EOF\n" if openmetrics else text
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = (0.1, 0.5, 1, 5, 10, 30, 60)) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# ============================================================================
+# Metrics
+# ============================================================================
+
+_LLM_LABELS = ("provider", "model", "endpoint")
+
+LLM_REQUESTS = counter(
+    "llm_requests", "LLM calls by outcome (ok, error, deadline, aborted)", _LLM_LABELS + ("status",)
+)
+LLM_REQUEST_SECONDS = histogram(
+    "llm_request_duration_seconds", "Wall time of LLM calls", _LLM_LABELS,
+    buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+)
+LLM_TOKENS = counter(
+    "llm_tokens", "Tokens sent to (input) and generated by (output) LLMs", _LLM_LABELS + ("direction",)
+)
+LLM_RETRIES = counter(
+    "llm_retries", "HTTP requests the API client retried within one LLM call", ("provider", "endpoint")
+)
+LLM_THROTTLES = counter(
+    "llm_throttles", "Rate-limited or overloaded responses (HTTP 429/529)", ("provider", "endpoint")
+)
+STREAM_VALIDATION_FAILURES = counter(
+    "stream_validation_failures",
+    "Malformed streamed outputs by reason and outcome (retried: aborted and requested again; kept: last attempt)",
+    ("reason", "outcome")
+)
+
+SEARCH_REQUESTS = counter("search_requests", "Searches by depth (\"local\" for the local corpus) and outcome", ("depth", "status"))
+SEARCH_SECONDS = histogram(
+    "search_duration_seconds", "Wall time of searches", ("depth",),
+    buckets=(0.25, 0.5, 1, 2, 5, 10, 30, 60)
+)
+SEARCH_RESPONSE_BYTES = histogram(
+    "search_response_bytes", "Size of Tavily responses (JSON)", ("depth",),
+    buckets=(1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 5e6)
+)
+
+GIT_OPERATIONS = counter("git_operations", "Git operations by outcome", ("operation", "status"))
+GIT_OPERATION_SECONDS = histogram(
+    "git_operation_duration_seconds", "Wall time of git operations", ("operation",),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 30, 120)
+)
+
+NODE_RUNS = counter("node_runs", "Pipeline node runs by outcome", ("node", "status"))
+NODE_SECONDS = histogram(
+    "node_duration_seconds", "Wall time of pipeline nodes", ("node",),
+    buckets=(0.1, 1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+)
+
+LESSONS = counter("lessons", "Lessons written or skipped as up to date", ("outcome",))
+
+CACHE_REQUESTS = counter(
+    "cache_requests", "Cache lookups by result (hit, miss); hit ratio = hit / (hit + miss)", ("cache", "result")
+)
+
+
+@contextmanager
+def track(duration: Histogram, outcomes: Counter, **labels: str):
+    """Time a block (or, as a decorator, each call) and count it as status="ok" or status="error"."""
+    status = "error"
+    try:
+        with duration.time(**labels):
+            yield
+        status = "ok"
+    finally:
+        outcomes.inc(status=status, **labels)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+# ============================================================================
+# HTTP client instrumentation (retries and throttles)
+# ============================================================================
+
+_attempts = threading.local()
+
+
+@contextmanager
+def count_attempts(provider: str, endpoint: str):
+    """
+    Count the HTTP requests made within a block; all but the first are retries.
+
+    The count is per thread: a block must run in the thread making the
+    requests (e.g. inside each hedged attempt, not around the hedge).
+    """
+    _attempts.count = 0
+    try:
+        yield
+    finally:
+        count, _attempts.count = getattr(_attempts, "count", 0), None
+        if count and count > 1:
+            LLM_RETRIES.inc(count - 1, provider=provider, endpoint=endpoint)
+
+
+def endpoint_label(client) -> str:
+    """host[:port] of an API client's base URL."""
+    try:
+        url = client.base_url
+        return f"{url.host}:{url.port}" if url.port else url.host
+    except Exception:
+        return "unknown"
+
+
+def instrument_http_client(client, provider: str):
+    """
+    Hook into an OpenAI/Anthropic SDK client's HTTP client to count attempts
+    and throttled responses. Clients without an httpx client are left as is.
+
+    Returns:
+        The same client
+    """
+    http_client = getattr(client, "_client", None)
+    if http_client is None or not hasattr(http_client, "event_hooks"):
+        return client
+    endpoint = endpoint_label(client)
+
+    def on_request(request):
+        if getattr(_attempts, "count", None) is not None:
+            _attempts.count += 1
+
+    def on_response(response):
+        if response.status_code in (429, 529):
+            LLM_THROTTLES.inc(provider=provider, endpoint=endpoint)
+
+    hooks = http_client.event_hooks
+    http_client.event_hooks = {
+        "request": list(hooks.get("request", [])) + [on_request],
+        "response": list(hooks.get("response", [])) + [on_response],
+    }
+    return client
+
+
+# ============================================================================
+# Export
+# ============================================================================
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+        body = REGISTRY.render(openmetrics).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", _OPENMETRICS_CONTENT_TYPE if openmetrics else _TEXT_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("metrics: " + format, *args)
+
+
+def start_http_server(port: int, addr: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serve /metrics on a background thread.
+
+    Args:
+        port: TCP port (0 picks a free one)
+        addr: Address to bind (default: localhost only)
+
+    Returns:
+        The running server
+    """
+    server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True)
+    thread.start()
+    logger.info(f"✓ Metrics at http://{addr}:{server.server_address[1]}/metrics")
+    return server
+
+
+def write_textfile(path: str) -> None:
+    """
+    Write all metrics to a file for node_exporter's textfile collector.
+
+    The file is replaced atomically so the collector never reads a partial file.
+
+    Args:
+        path: Target file (should end in .prom)
+    """
+    target = Path(path).expanduser()
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    tmp_file.write_text(REGISTRY.render(), encoding="utf-8")
+    tmp_file.replace(target)
+    logger.info(f"✓ Metrics written to {target}")
@@ -0,0 +1,92 @@
+"""
+Hierarchical course modules (MODULES_MODE / --modules).
+
+A flat course is synthesized in one request, so its knowledge base and
+lesson outline are capped by a single call's output limit. In module mode
+synthesis first plans a module outline, then synthesizes each module's
+knowledge base in its own request from the part of the research notes
+relevant to that module, and lessons are written per module into numbered
+folders:
+
+    lessons/01-Fundamentals/lesson_01_....md
+    lessons/02-Core-Concepts/lesson_04_....md
+
+Lessons keep their course-wide numbering, so lesson keys sort in course
+order across modules.
+"""
+
+import re
+from typing import Any, Dict, List
+
+from src.tools.context_packing import lexical_relevance, topic_terms
+from src.tools.token_utils import count_tokens
+
+# Module folders inside the lessons directory
+MODULE_DIR_RE = re.compile(r'^\d{2}-')
+
+_BLOCK_RE = re.compile(r'\n\s*\n')
+
+
+def module_dir_name(number: int, title: str) -> str:
+    """Folder name of a module, e.g. (2, "Core concepts") → "02-Core-Concepts"."""
+    words = re.findall(r'[A-Za-z0-9]+', title)
+    name = '-'.join(w[:1].upper() + w[1:] for w in words)[:50].rstrip('-')
+    return f"{number:02d}-{name or 'Module'}"
+
+
+def module_notes(raw_notes: str, topic: str, module: Dict[str, Any], max_tokens: int) -> str:
+    """
+    Research notes relevant to one module.
+
+    The notes are split into blocks at blank lines; a block is relevant if
+    it mentions terms of the module's title or summary that are not just
+    the course topic's own terms. The most relevant blocks are kept, up to
+    max_tokens, in their original order.
+
+    Args:
+        raw_notes: Research notes of the course
+        topic: Course topic
+        module: Module outline entry ({"title", "summary"})
+        max_tokens: Token budget for the module's notes
+
+    Returns:
+        The selected notes, or all notes if no block is relevant
+    """
+    terms = topic_terms(f"{module['title']} {module['summary']}") - topic_terms(topic)
+    blocks = [b.strip() for b in _BLOCK_RE.split(raw_notes) if b.strip()]
+
+    scored = []
+    for position, block in enumerate(blocks):
+        relevance = lexical_relevance(block, terms)
+        if relevance > 0:
+            scored.append((relevance, position, block))
+    if not scored:
+        return raw_notes
+
+    selected = []
+    used = 0
+    for relevance, position, block in sorted(scored, key=lambda s: (-s[0], s[1])):
+        tokens = count_tokens(block)
+        if used + tokens > max_tokens:
+            continue
+        selected.append((position, block))
+        used += tokens
+
+    return '\n\n'.join(block for _, block in sorted(selected))
+
+
+def combine_knowledge_bases(modules: List[Dict[str, Any]], knowledge_bases: List[str]) -> str:
+    """
+    The course knowledge base: every module's knowledge base under a module heading.
+
+    Args:
+        modules: Module outline entries ({"title", "summary"})
+        knowledge_bases: Knowledge base text of each module, in the same order
+
+    Returns:
+        Combined Markdown knowledge base
+    """
+    parts = []
+    for number, (module, knowledge_base) in enumerate(zip(modules, knowledge_bases), 1):
+        parts.append(f"# Module {number}: {module['title']}\n\n{knowledge_base.strip()}\n")
+    return '\n'.join(parts)
@@ -0,0 +1,170 @@
+"""
+CPU and memory profiling hooks for pipeline nodes.
+
+Wraps each graph node so that:
+- cpu: the node runs under cProfile and its stats are written to <node>.pstats
+- mem: tracemalloc tracks the node's allocations; the top allocation sites
+  are written to <node>.tracemalloc.txt and the raw snapshot to
+  <node>.tracemalloc
+After the run, `log_summary` reports the hottest functions and the largest
+allocation sites per node.
+
+Only the thread running the node is CPU-profiled; work it hands to other
+threads (e.g. hedged requests) shows up as waiting time.
+"""
+
+import cProfile
+import functools
+import pstats
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from src.tools.log import get_logger
+
+logger = get_logger(__name__)
+
+
+PROFILE_MODES = ("cpu", "mem", "both")
+
+# Allocations made by the profilers themselves are not reported
+_MEM_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, cProfile.__file__),
+    tracemalloc.Filter(False, pstats.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+)
+
+
+class NodeProfiler:
+    """Collects per-node CPU and/or memory profiles for one run."""
+
+    def __init__(self, mode: str, output_dir: Path, top: int = 5):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode} (expected one of {', '.join(PROFILE_MODES)})")
+        self.cpu = mode in ("cpu", "both")
+        self.mem = mode in ("mem", "both")
+        self.output_dir = Path(output_dir)
+        self.top = top
+        self.results: List[Dict] = []
+
+    def wrap(self, name: str, node: Callable) -> Callable:
+        """Wrap a node function with the configured profilers."""
+
+        @functools.wraps(node)
+        def profiled(state):
+            return self._run(name, node, state)
+
+        return profiled
+
+    def _run(self, name: str, node: Callable, state):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        result = {"node": name}
+
+        started_tracing = False
+        if self.mem:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot().filter_traces(_MEM_FILTERS)
+
+        profiler = cProfile.Profile() if self.cpu else None
+        start = time.perf_counter()
+        try:
+            if profiler:
+                profiler.enable()
+            try:
+                return node(state)
+            finally:
+                if profiler:
+                    profiler.disable()
+        finally:
+            result["seconds"] = time.perf_counter() - start
+
+            if profiler:
+                result["cpu"] = self._save_cpu(name, profiler)
+
+            if self.mem:
+                result["mem"] = self._save_mem(name, before)
+                if started_tracing:
+                    tracemalloc.stop()
+
+            self.results.append(result)
+
+    def _save_cpu(self, name: str, profiler: cProfile.Profile) -> Dict:
+        path = self.output_dir / f"{name}.pstats"
+        profiler.dump_stats(str(path))
+
+        stats = pstats.Stats(profiler)
+        hottest = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:self.top]
+        return {
+            "file": str(path),
+            "total_seconds": stats.total_tt,
+            "hottest": [
+                {
+                    "function": f"{Path(filename).name}:{line}({func})",
+                    "calls": calls,
+                    "self_seconds": own_time,
+                    "cumulative_seconds": cumulative,
+                }
+                for (filename, line, func), (_, calls, own_time, cumulative, _) in hottest
+            ],
+        }
+
+    def _save_mem(self, name: str, before: tracemalloc.Snapshot) -> Dict:
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces(_MEM_FILTERS)
+        snapshot.dump(str(self.output_dir / f"{name}.tracemalloc"))
+
+        top_sites = snapshot.compare_to(before, "lineno")[:self.top]
+
+        path = self.output_dir / f"{name}.tracemalloc.txt"
+        lines = [f"Peak traced memory: {peak / 1024 / 1024:.1f} MB", "", "Top allocation sites (growth during node):"]
+        lines += [str(stat) for stat in top_sites]
+        path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+        return {
+            "file": str(path),
+            "peak_bytes": peak,
+            "largest": [
+                {
+                    "site": f"{Path(stat.traceback[0].filename).name}:{stat.traceback[0].lineno}",
+                    "size_diff_bytes": stat.size_diff,
+                    "count_diff": stat.count_diff,
+                }
+                for stat in top_sites
+            ],
+        }
+
+    def log_summary(self) -> None:
+        """Log the hottest functions and largest allocation sites per node."""
+        if not self.results:
+            return
+
+        logger.info("\n" + "=" * 70)
+        logger.info(f"  PROFILE SUMMARY ({self.output_dir})")
+        logger.info("=" * 70)
+
+        for result in self.results:
+            logger.info(f"\n[{result['node']}] {result['seconds']:.2f}s wall")
+
+            cpu = result.get("cpu")
+            if cpu:
+                logger.info(f"  CPU ({cpu['total_seconds']:.2f}s profiled) - hottest by self time:")
+                for entry in cpu["hottest"]:
+                    logger.info(
+                        f"    {entry['self_seconds']:8.3f}s self  {entry['cumulative_seconds']:8.3f}s cum  "
+                        f"{entry['calls']:>7} calls  {entry['function']}"
+                    )
+
+            mem = result.get("mem")
+            if mem:
+                logger.info(f"  Memory (peak {mem['peak_bytes'] / 1024 / 1024:.1f} MB) - largest allocation sites:")
+                for entry in mem["largest"]:
+                    logger.info(
+                        f"    {entry['size_diff_bytes'] / 1024:+10.1f} KB  "
+                        f"{entry['count_diff']:+8} blocks  {entry['site']}"
+                    )
@@ -0,0 +1,295 @@
+"""
+Meaning-preserving minification of long texts embedded in prompts.
+
+The research notes, knowledge base and search results that go into prompts
+carry a lot of formatting that costs tokens without telling the model
+anything: trailing and repeated whitespace, runs of blank lines, repeated
+horizontal rules, decorative heading markup, padded or ASCII-art tables and
+the same URLs written out again and again.
+
+`minify_text` removes this redundancy. Fenced code blocks are left as they
+are (apart from trailing whitespace). URLs that occur several times are
+replaced by short reference IDs such as [U1], with one `[U1]: <url>`
+definition per URL appended, which is still valid Markdown.
+`expand_url_refs` turns IDs the model copies into its output back into the
+full URLs, so generated artifacts never contain them.
+"""
+
+import re
+from typing import Dict, List, Tuple
+
+from src.config import Config
+from src.tools.token_utils import count_tokens
+from src.tools.log import get_logger
+
+logger = get_logger(__name__)
+
+
+_FENCE_RE = re.compile(r'^\s*(```|~~~)')
+_FENCE_CLOSE_RE = re.compile(r'^\s*(`{3,}|~{3,})\s*$')
+# Horizontal rules and decorative separator lines (---, ***, ===, ━━━, ...)
+_RULE_RE = re.compile(r'^\s*([-*_=~─━═])(?:\s*\1){2,}\s*$')
+_HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)(?:\s+#+)?\s*$')
+_WRAPPED_EMPHASIS_RE = re.compile(r'^(\*\*?)([^*]+)\1$')
+_ASCII_BORDER_RE = re.compile(r'^\s*\+[-=+:]+\+\s*$')
+_TABLE_DELIMITER_CELL_RE = re.compile(r'^:?-+:?$')
+_INNER_SPACE_RE = re.compile(r'(?<=\S)[ \t]{2,}')
+
+_URL_RE = re.compile(r'https?://[^\s<>()\[\]"\'`]+[^\s<>()\[\]"\'`.,;:!?]')
+_REF_ID_RE = re.compile(r'\[U\d+\]')
+_REF_LINK_RE = re.compile(r'\[([^\]\n]*)\]\[(U\d+)\]')
+_REF_DEFINITION_RE = re.compile(r'^\[(U\d+)\]:\s*\S+\s*$\n?', re.MULTILINE)
+
+_URL_REFS_HEADING = "URL references:"
+# Shorter URLs are not worth a reference
+_MIN_REF_URL_LENGTH = 24
+
+
+def minify_text(text: str, url_refs: bool = None, min_url_repeats: int = None) -> Tuple[str, Dict[str, str]]:
+    """
+    Collapse formatting redundancy in Markdown-ish text without changing its meaning.
+
+    Args:
+        text: The text to minify
+        url_refs: Replace repeated URLs with reference IDs (default PROMPT_MINIFY_URL_REFS)
+        min_url_repeats: Occurrences needed for a URL to get an ID (default PROMPT_MINIFY_URL_MIN_REPEATS)
+
+    Returns:
+        Tuple of (minified_text, url_refs) where url_refs maps reference ID → URL
+    """
+    if url_refs is None:
+        url_refs = Config.PROMPT_MINIFY_URL_REFS
+    if min_url_repeats is None:
+        min_url_repeats = Config.PROMPT_MINIFY_URL_MIN_REPEATS
+
+    blocks = _split_code_blocks(text)
+    blocks = [(is_code, lines if is_code else _minify_lines(lines)) for is_code, lines in blocks]
+
+    minified = _join(blocks)
+
+    # Text that already uses IDs like ours is left alone
+    if url_refs and not _REF_ID_RE.search(text):
+        refs = _assign_url_refs(blocks, min_url_repeats)
+        if refs:
+            by_url = {url: ref_id for ref_id, url in refs.items()}
+            blocks = [
+                (is_code, lines if is_code else [_replace_urls(line, by_url) for line in lines])
+                for is_code, lines in blocks
+            ]
+            definitions = '\n'.join(f"[{ref_id}]: {url}" for ref_id, url in refs.items())
+            with_refs = f"{_join(blocks)}\n{_URL_REFS_HEADING}\n{definitions}\n"
+            # The definitions must pay for themselves
+            if len(with_refs) < len(minified):
+                return with_refs, refs
+
+    return minified, {}
+
+
+def expand_url_refs(text: str, url_refs: Dict[str, str]) -> str:
+    """
+    Replace reference IDs in model output with their URLs.
+
+    Args:
+        text: Model output
+        url_refs: Reference ID → URL, as returned by minify_text
+
+    Returns:
+        The text with [text][U1] turned into [text](url) and bare [U1] into the URL
+    """
+    if not url_refs or not _REF_ID_RE.search(text):
+        return text
+
+    def definition(match):
+        return '' if match.group(1) in url_refs else match.group(0)
+
+    def link(match):
+        url = url_refs.get(match.group(2))
+        return f"[{match.group(1)}]({url})" if url else match.group(0)
+
+    def bare(match):
+        return url_refs.get(match.group(0)[1:-1], match.group(0))
+
+    text = _REF_DEFINITION_RE.sub(definition, text)
+    text = text.replace(f"\n{_URL_REFS_HEADING}\n", "\n")
+    text = _REF_LINK_RE.sub(link, text)
+    return _REF_ID_RE.sub(bare, text)
+
+
+def minify_for_prompt(
+    content: str,
+    content_name: str = "content",
+    prompt_count: int = 1
+) -> Tuple[str, Dict[str, str]]:
+    """
+    Minify prompt content (if PROMPT_MINIFY is on) and log the tokens saved.
+
+    Args:
+        content: The content to minify
+        content_name: Name of the content for logging
+        prompt_count: Number of prompts the content is embedded in
+
+    Returns:
+        Tuple of (minified_content, url_refs)
+    """
+    if not Config.PROMPT_MINIFY or not content:
+        return content, {}
+
+    minified, url_refs = minify_text(content)
+
+    original_tokens = count_tokens(content)
+    final_tokens = count_tokens(minified)
+    saved = original_tokens - final_tokens
+    percent = saved / original_tokens * 100 if original_tokens else 0.0
+    refs = f", {len(url_refs)} URL refs" if url_refs else ""
+    total = f"; {saved * prompt_count:,} across {prompt_count} prompts" if prompt_count > 1 else ""
+    logger.info(
+        f"  ✓ Minified {content_name}: {original_tokens:,} → {final_tokens:,} tokens per prompt "
+        f"(saved {saved:,}, {percent:.1f}%{refs}{total})"
+    )
+    return minified, url_refs
+
+
+def _join(blocks: List[Tuple[bool, List[str]]]) -> str:
+    return '\n'.join(line for _, lines in blocks for line in lines).strip('\n') + '\n'
+
+
+def _split_code_blocks(text: str) -> List[Tuple[bool, List[str]]]:
+    """Split text into runs of (is_code, lines); code keeps its fences."""
+    blocks = []
+    current = []
+    in_code = False
+    fence = None
+
+    for line in text.replace('\r\n', '\n').replace('\r', '\n').split('\n'):
+        match = _FENCE_RE.match(line)
+        if not in_code and match:
+            if current:
+                blocks.append((False, current))
+            current, in_code, fence = [line.rstrip()], True, match.group(1)
+        elif in_code:
+            current.append(line.rstrip())
+            close = _FENCE_CLOSE_RE.match(line)
+            if close and close.group(1).startswith(fence):
+                blocks.append((True, current))
+                current, in_code = [], False
+        else:
+            current.append(line)
+
+    if current:
+        blocks.append((in_code, current))
+    return blocks
+
+
+def _minify_lines(lines: List[str]) -> List[str]:
+    """Minify the lines of a run of non-code text."""
+    output = []
+    for line in lines:
+        line = line.rstrip()
+        stripped = line.strip()
+        previous = output[-1] if output else ''
+
+        if not stripped:
+            # Runs of blank lines become one
+            if previous:
+                output.append('')
+            continue
+
+        if _ASCII_BORDER_RE.match(line):
+            # Grid table borders go; the one below the header row becomes
+            # the Markdown delimiter row
+            before_previous = output[-2] if len(output) > 1 else ''
+            if previous.startswith('|') and not before_previous.startswith('|'):
+                columns = len(stripped.strip('+').split('+'))
+                output.append('|' + ' --- |' * columns)
+            continue
+
+        if _RULE_RE.match(line):
+            char = stripped[0]
+            if char in '=-' and previous and not _is_structural(previous):
+                # Setext heading underline: "Title\n=====" → "# Title"
+                output[-1] = ('# ' if char == '=' else '## ') + previous.strip()
+                continue
+            # Repeated rules (and rules right after a heading) carry no meaning
+            last_text = next((l for l in reversed(output) if l), '')
+            if last_text and last_text != '---' and not last_text.startswith('#'):
+                if previous:
+                    output.append('')
+                output.append('---')
+            continue
+
+        heading = _HEADING_RE.match(line)
+        if heading:
+            title = heading.group(2).strip()
+            emphasis = _WRAPPED_EMPHASIS_RE.match(title)
+            if emphasis:
+                title = emphasis.group(2).strip()
+            output.append(f"{heading.group(1)} {_collapse_spaces(title)}")
+            continue
+
+        if stripped.startswith('|') and stripped.endswith('|') and len(stripped) > 1:
+            output.append(_minify_table_row(stripped))
+            continue
+
+        indent = line[:len(line) - len(line.lstrip())]
+        output.append(indent + _collapse_spaces(line.lstrip()))
+
+    return output
+
+
+def _is_structural(line: str) -> bool:
+    """Lines a following ---/=== cannot turn into a setext heading."""
+    stripped = line.strip()
+    return stripped == '---' or stripped.startswith(('#', '|', '-', '*', '+', '>')) or stripped[:1].isdigit()
+
+
+def _collapse_spaces(text: str) -> str:
+    return _INNER_SPACE_RE.sub(' ', text)
+
+
+def _minify_table_row(row: str) -> str:
+    """Drop cell padding; shorten delimiter rows to the minimum."""
+    cells = [cell.strip() for cell in row[1:-1].split('|')]
+    if all(_TABLE_DELIMITER_CELL_RE.match(cell) for cell in cells):
+        cells = [(':' if cell.startswith(':') else '') + '---' + (':' if cell.endswith(':') else '') for cell in cells]
+    return '| ' + ' | '.join(_collapse_spaces(cell) for cell in cells) + ' |'
+
+
+def _assign_url_refs(blocks: List[Tuple[bool, List[str]]], min_url_repeats: int) -> Dict[str, str]:
+    """Reference IDs (in order of first occurrence) for URLs that repeat outside code."""
+    counts = {}
+    for is_code, lines in blocks:
+        if is_code:
+            continue
+        for line in lines:
+            for url in _URL_RE.findall(line):
+                counts[url] = counts.get(url, 0) + 1
+
+    # A URL is worth an ID if the occurrences it shortens outweigh its definition
+    repeated = [
+        url for url, count in counts.items()
+        if count >= min_url_repeats and len(url) >= _MIN_REF_URL_LENGTH
+        and (count - 1) * len(url) > (count + 1) * 6
+    ]
+    return {f"U{i}": url for i, url in enumerate(repeated, 1)}
+
+
+def _replace_urls(line: str, by_url: Dict[str, str]) -> str:
+    """Replace referenced URLs in a line: [text](url) → [text][U1], <url> and url → [U1]."""
+
+    def link(match):
+        ref_id = by_url.get(match.group(2))
+        return f"[{match.group(1)}][{ref_id}]" if ref_id else match.group(0)
+
+    def autolink(match):
+        ref_id = by_url.get(match.group(1))
+        return f"[{ref_id}]" if ref_id else match.group(0)
+
+    def bare(match):
+        ref_id = by_url.get(match.group(0))
+        return f"[{ref_id}]" if ref_id else match.group(0)
+
+    if 'http' not in line:
+        return line
+    line = re.sub(r'\[([^\]\n]*)\]\((' + _URL_RE.pattern + r')\)', link, line)
+    line = re.sub(r'<(' + _URL_RE.pattern + r')>', autolink, line)
+    return _URL_RE.sub(bare, line)
@@ -0,0 +1,247 @@
+"""
+Background publishing: commits and coalesced pushes off the critical path.
+
+publish_node hands each finished course to a queue instead of running git
+itself. A single worker thread (so git never runs twice on one repository
+at the same time) takes the jobs in order:
+
+- every course is committed as soon as its job is taken
+- pushes are coalesced per repository and remote: a push waits
+  PUBLISH_PUSH_DELAY seconds for more commits, then pushes all of them
+- a failed push is retried with exponential backoff, up to
+  PUBLISH_PUSH_ATTEMPTS attempts
+
+At shutdown, close() pushes whatever is still waiting and reports whether
+every commit reached its remote. It is also registered with atexit, so
+library users of run_agent do not lose pushes either.
+"""
+
+import atexit
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from src.config import Config
+from src.tools.git_operations import commit_changes, get_repo_root, push_to_remote
+from src.tools.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class _Push:
+    """Commits waiting to be pushed to one remote from one repository."""
+
+    def __init__(self, key: Tuple[str, str], repo_path: Path, remote_url: str, due: float):
+        self.key = key
+        self.repo_path = repo_path
+        self.remote_url = remote_url
+        self.due = due
+        self.commits = 0
+        self.attempts = 0
+        self.error: Optional[str] = None
+
+
+class PublishQueue:
+    """Commits courses and pushes their repositories in a background thread."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._commits: deque = deque()
+        self._pushes: Dict[Tuple[str, str], _Push] = {}
+        self._busy = False
+        self._closing = False
+        self._thread: Optional[threading.Thread] = None
+
+        # Outcomes, reported by close()
+        self.committed = 0
+        self.pushed = 0
+        self.push_requests = 0
+        self.failed: Dict[Tuple[str, str], _Push] = {}
+
+    def submit(self, repo_path: Path, message: str, remote_url: Optional[str] = None) -> None:
+        """
+        Queue a course for committing (and pushing, if it has a remote).
+
+        Args:
+            repo_path: Course directory
+            message: Commit message
+            remote_url: Remote to push to after the commit, if any
+        """
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("Publish queue failed: already closed")
+            self._commits.append((Path(repo_path), message, remote_url))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._work, name="publish", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def close(self, timeout: float = None) -> Dict[str, Any]:
+        """
+        Push everything still waiting and stop the worker.
+
+        Args:
+            timeout: Seconds to wait for the queue to drain (default PUBLISH_SHUTDOWN_TIMEOUT)
+
+        Returns:
+            Summary with committed, pushed, push_requests, failed (remote → error)
+            and unfinished (jobs left when the timeout passed)
+        """
+        if timeout is None:
+            timeout = Config.PUBLISH_SHUTDOWN_TIMEOUT
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+            thread = self._thread
+        if thread:
+            thread.join(timeout)
+
+        with self._cond:
+            unfinished = len(self._commits) + sum(p.commits or 1 for p in self._pushes.values()) + self._busy
+            return {
+                "committed": self.committed,
+                "pushed": self.pushed,
+                "push_requests": self.push_requests,
+                "failed": {push.remote_url: push.error for push in self.failed.values()},
+                "unfinished": unfinished,
+            }
+
+    def _next_job(self):
+        """Wait for the next commit or due push; None once closed and drained."""
+        with self._cond:
+            self._busy = False
+            while True:
+                if self._commits:
+                    self._busy = True
+                    return "commit", self._commits.popleft()
+
+                now = time.monotonic()
+                if self._pushes:
+                    push = min(self._pushes.values(), key=lambda p: p.due)
+                    # Closing skips the wait for more commits, not the retry backoff
+                    due = now if self._closing and push.attempts == 0 else push.due
+                    if due <= now:
+                        del self._pushes[push.key]
+                        self._busy = True
+                        return "push", push
+                    self._cond.wait(due - now)
+                elif self._closing:
+                    return None
+                else:
+                    self._cond.wait()
+
+    def _work(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            kind, payload = job
+            if kind == "commit":
+                self._commit(*payload)
+            else:
+                self._push(payload)
+
+    def _commit(self, repo_path: Path, message: str, remote_url: Optional[str]) -> None:
+        committed = False
+        try:
+            commit_changes(repo_path, message)
+            committed = True
+            with self._cond:
+                self.committed += 1
+            logger.info(f"  ✓ Committed changes: {repo_path}")
+        except Exception as e:
+            logger.warning(f"  ⚠ Commit warning ({repo_path}): {e}")
+
+        if not remote_url:
+            return
+
+        # Earlier commits that were never pushed are pushed along with it
+        key = (str(get_repo_root(repo_path)), remote_url)
+        with self._cond:
+            push = self._pushes.get(key)
+            if push is None:
+                push = self._pushes[key] = _Push(key, repo_path, remote_url, 0.0)
+            push.repo_path = repo_path
+            push.commits += committed
+            if push.attempts == 0:
+                push.due = time.monotonic() + Config.PUBLISH_PUSH_DELAY
+            self._cond.notify()
+
+    def _push(self, push: _Push) -> None:
+        push.attempts += 1
+        try:
+            with self._cond:
+                self.push_requests += 1
+            push_to_remote(push.repo_path)
+            with self._cond:
+                self.pushed += push.commits
+                self.failed.pop(push.key, None)
+            logger.info(f"  ✓ Pushed to remote: {push.remote_url} ({push.commits} new commits)")
+            return
+        except Exception as e:
+            push.error = str(e)
+
+        with self._cond:
+            newer = self._pushes.get(push.key)
+            if newer is not None:
+                # More commits arrived meanwhile; their push takes these along
+                newer.commits += push.commits
+            elif push.attempts < Config.PUBLISH_PUSH_ATTEMPTS:
+                backoff = Config.PUBLISH_RETRY_BACKOFF * 2 ** (push.attempts - 1)
+                push.due = time.monotonic() + backoff
+                self._pushes[push.key] = push
+                logger.warning(
+                    f"  ⚠ Push failed (attempt {push.attempts}/{Config.PUBLISH_PUSH_ATTEMPTS}), "
+                    f"retrying in {backoff:g}s: {push.error}"
+                )
+            else:
+                self.failed[push.key] = push
+                logger.warning(f"  ⚠ Push failed after {push.attempts} attempts: {push.error}")
+            self._cond.notify()
+
+
+_publish_queue: Optional[PublishQueue] = None
+_lock = threading.Lock()
+
+
+def get_publish_queue() -> PublishQueue:
+    """Get or create the publish queue singleton."""
+    global _publish_queue
+    with _lock:
+        if _publish_queue is None:
+            _publish_queue = PublishQueue()
+            atexit.register(close_publish_queue)
+        return _publish_queue
+
+
+def close_publish_queue() -> Optional[Dict[str, Any]]:
+    """
+    Drain the publish queue (if it was used) and log whether everything was pushed.
+
+    Returns:
+        The queue's summary (see PublishQueue.close), or None if nothing was published
+    """
+    global _publish_queue
+    with _lock:
+        publish_queue, _publish_queue = _publish_queue, None
+    if publish_queue is None:
+        return None
+
+    logger.info("\nWaiting for background publishing to finish...")
+    summary = publish_queue.close()
+
+    if summary["unfinished"]:
+        logger.warning(f"⚠ Publishing did not finish in time: {summary['unfinished']} commits/pushes left")
+    for remote_url, error in summary["failed"].items():
+        logger.warning(f"⚠ Not pushed to {remote_url}: {error}")
+        logger.warning("  The commits are kept locally and go out with the next push to that remote")
+    if summary["pushed"]:
+        logger.info(
+            f"✓ Pushed {summary['pushed']} commits in {summary['push_requests']} pushes"
+            + (" - everything is on its remote" if not summary["failed"] and not summary["unfinished"] else "")
+        )
+    elif summary["committed"]:
+        logger.info(f"✓ Committed {summary['committed']} courses")
+    return summary
@@ -0,0 +1,230 @@
+"""
+Change detection for refreshing existing courses (--refresh).
+
+Research stores a content fingerprint with every web source: the SHA-256 of
+its normalized text plus a bottom-k MinHash sketch of its word 5-grams. A
+refresh re-runs the course's search and compares the fingerprints of the
+pages it gets back with the stored ones:
+
+- unchanged: same normalized text
+- changed: text differs; its change is 1 - the estimated 5-gram overlap
+- removed / added: the URL dropped out of / newly entered the results
+
+The course's change is the score-weighted mean over all of these, from 0.0
+(nothing changed) to 1.0. Only above REFRESH_CHANGE_THRESHOLD are the notes
+and knowledge base rebuilt; the stored fingerprints stay the baseline until
+then, so slow drift adds up instead of being forgotten run by run.
+
+When the material did change, the knowledge base is updated rather than
+regenerated (sections not affected are copied verbatim), and a lesson is
+rewritten only if the sections it is built from changed (see
+lesson_sections_hash). Sources reused from related courses are not re-checked.
+"""
+
+import hashlib
+import heapq
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.tools.artifacts import hash_text
+from src.tools.context_packing import lexical_relevance, tokenize, topic_terms
+
+# Words per shingle and shingle hashes kept per sketch
+_SHINGLE_WORDS = 5
+_SKETCH_SIZE = 64
+
+_HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+_FENCE_RE = re.compile(r'^\s*(```|~~~)')
+
+# A knowledge base section belongs to a lesson if it covers this share of
+# the lesson title's terms
+_SECTION_RELEVANCE = 0.5
+
+
+def fingerprint_text(text: str) -> Dict[str, Any]:
+    """
+    Content fingerprint of a page.
+
+    Args:
+        text: Page content
+
+    Returns:
+        {"sha256": hash of the normalized text, "sketch": sorted shingle hashes}
+    """
+    words = tokenize(text or "")
+    shingles = {
+        ' '.join(words[i:i + _SHINGLE_WORDS])
+        for i in range(max(1, len(words) - _SHINGLE_WORDS + 1))
+    }
+    hashes = (
+        int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'big')
+        for s in shingles if s
+    )
+    return {
+        "sha256": hash_text(' '.join(words)),
+        "sketch": heapq.nsmallest(_SKETCH_SIZE, hashes)
+    }
+
+
+def similarity(a: Dict[str, Any], b: Dict[str, Any]) -> float:
+    """Estimated share of 5-grams two fingerprinted pages have in common (0.0 to 1.0)."""
+    if a.get("sha256") == b.get("sha256"):
+        return 1.0
+    sketch_a, sketch_b = set(a.get("sketch") or []), set(b.get("sketch") or [])
+    if not sketch_a or not sketch_b:
+        return 0.0
+    # Bottom-k estimate: how many of the union's k smallest hashes both share
+    union = heapq.nsmallest(_SKETCH_SIZE, sketch_a | sketch_b)
+    return sum(1 for h in union if h in sketch_a and h in sketch_b) / len(union)
+
+
+def _result_text(result: Dict[str, Any]) -> str:
+    return result.get('raw_content') or result.get('content') or ''
+
+
+def fingerprint_sources(sources: List[Dict[str, Any]], search_response: dict) -> List[Dict[str, Any]]:
+    """
+    Add the fingerprint of each web source's search result to it.
+
+    Args:
+        sources: Sources as returned by extract_sources
+        search_response: The search response they were extracted from
+
+    Returns:
+        The sources, each with a "fingerprint"
+    """
+    texts = {r.get('url', ''): _result_text(r) for r in search_response.get('results', [])}
+    return [
+        {**source, "fingerprint": fingerprint_text(texts[source['url']])}
+        if source.get('url') in texts else source
+        for source in sources
+    ]
+
+
+def without_fingerprints(sources: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Sources as hashed into the sources artifact (fingerprints are bookkeeping)."""
+    return [{k: v for k, v in source.items() if k != 'fingerprint'} for source in sources]
+
+
+def diff_sources(sources: List[Dict[str, Any]], search_response: dict) -> Dict[str, Any]:
+    """
+    Compare stored sources with the results of a fresh search.
+
+    Args:
+        sources: The course's stored research_sources
+        search_response: Response of re-running the course's search
+
+    Returns:
+        {
+            "change": float,       # score-weighted share of changed material
+            "baseline": bool,      # True if no stored source had a fingerprint
+            "unchanged": [url], "changed": [(url, change)], "added": [url], "removed": [url],
+            "sources": [...]       # stored sources, missing fingerprints filled in
+        }
+    """
+    current = {
+        r.get('url', ''): (fingerprint_text(_result_text(r)), r.get('score') or 0.0)
+        for r in search_response.get('results', [])
+    }
+    diff = {"unchanged": [], "changed": [], "added": [], "removed": [], "sources": []}
+    weighted = []
+
+    own_urls = set()
+    for source in sources:
+        if source.get('reused_from'):
+            diff["sources"].append(source)
+            continue
+        url = source.get('url', '')
+        own_urls.add(url)
+        stored = source.get('fingerprint')
+        fingerprint, _ = current.get(url, (None, 0.0))
+        weight = max(source.get('score') or 0.0, 0.01)
+
+        if stored is None:
+            # Fingerprinted from now on; nothing to compare against yet
+            diff["sources"].append({**source, "fingerprint": fingerprint} if fingerprint else source)
+            continue
+
+        diff["sources"].append(source)
+        if fingerprint is None:
+            diff["removed"].append(url)
+            weighted.append((weight, 1.0))
+            continue
+        change = 1.0 - similarity(stored, fingerprint)
+        if stored.get("sha256") != fingerprint["sha256"]:
+            diff["changed"].append((url, change))
+        else:
+            diff["unchanged"].append(url)
+        weighted.append((weight, change))
+
+    diff["baseline"] = not weighted and not diff["removed"]
+    if not diff["baseline"]:
+        for url, (_, score) in current.items():
+            if url not in own_urls:
+                diff["added"].append(url)
+                weighted.append((max(score, 0.01), 1.0))
+
+    total = sum(w for w, _ in weighted)
+    diff["change"] = sum(w * c for w, c in weighted) / total if total else 0.0
+    return diff
+
+
+# ============================================================================
+# Knowledge base sections per lesson
+# ============================================================================
+
+def split_sections(knowledge_base: str) -> List[Tuple[str, str]]:
+    """
+    Split a knowledge base into (heading, text) sections at Markdown headings.
+
+    The lesson outline is left out: it decides the lesson titles, which are
+    already part of each lesson's inputs.
+    """
+    sections = []
+    heading, lines = "", []
+    in_code = False
+
+    for line in knowledge_base.split('\n'):
+        if _FENCE_RE.match(line):
+            in_code = not in_code
+        match = None if in_code else _HEADING_RE.match(line)
+        if match:
+            if heading or any(l.strip() for l in lines):
+                sections.append((heading, '\n'.join(lines).strip()))
+            heading, lines = match.group(2).strip(), []
+        else:
+            lines.append(line)
+    sections.append((heading, '\n'.join(lines).strip()))
+
+    return [(h, text) for h, text in sections if 'lesson outline' not in h.lower()]
+
+
+def lesson_sections(knowledge_base: str, lesson_title: str) -> Optional[List[Tuple[str, str]]]:
+    """
+    Knowledge base sections a lesson is built from.
+
+    Args:
+        knowledge_base: Knowledge base text
+        lesson_title: Title of the lesson
+
+    Returns:
+        Sections covering most of the title's terms, or None if none does
+        (the lesson then depends on the whole knowledge base)
+    """
+    terms = topic_terms(lesson_title)
+    if not terms:
+        return None
+    matched = [
+        (heading, text) for heading, text in split_sections(knowledge_base)
+        if lexical_relevance(f"{heading}\n{text}", terms) >= _SECTION_RELEVANCE
+    ]
+    return matched or None
+
+
+def lesson_sections_hash(knowledge_base: str, lesson_title: str) -> str:
+    """Content hash of the knowledge base sections a lesson is built from."""
+    sections = lesson_sections(knowledge_base, lesson_title)
+    if sections is None:
+        sections = split_sections(knowledge_base)
+    # Formatting-only differences (whitespace, markup) do not count
+    return hash_text('\n'.join(' '.join(tokenize(f"{heading}\n{text}")) for heading, text in sections))
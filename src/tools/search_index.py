@@ -0,0 +1,415 @@
+"""
+Full-text search over generated courses.
+
+An on-disk inverted index (SQLite, standard library only) maps each term to
+the documents containing it, with term frequencies and token positions.
+Documents are keyed by content hash, so a lesson is indexed once however
+often publishing runs, and identical lessons at several paths share one
+entry. Headings are stored with their token positions so each hit can
+name the section it was found in.
+
+Queries are ranked with BM25, boosted when query terms appear in the
+title or headings; "quoted phrases" must match consecutive tokens.
+
+The course index lives in `<base dir>/.search_index.db` and is updated
+incrementally by publish_node; `python main.py search` queries it.
+"""
+
+import json
+import math
+import re
+import sqlite3
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from src.tools.artifacts import hash_text
+from src.tools.context_packing import tokenize
+from src.tools.log import get_logger
+
+logger = get_logger(__name__)
+
+
+INDEX_FILE_NAME = ".search_index.db"
+
+_HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+_PHRASE_RE = re.compile(r'"([^"]+)"')
+
+# BM25 parameters and the boost for query terms in the title/headings
+_K1 = 1.2
+_B = 0.75
+_HEADING_BOOST = 0.5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    hash TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    headings TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS paths (
+    path TEXT PRIMARY KEY,
+    hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS paths_hash ON paths(hash);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    tf INTEGER NOT NULL,
+    positions BLOB NOT NULL,
+    PRIMARY KEY (term, hash)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_hash ON postings(hash);
+"""
+
+
+class SearchHit(NamedTuple):
+    path: str
+    score: float
+    title: str
+    heading: str  # Section containing the first match ("" if before any heading)
+
+
+def parse_document(text: str) -> Tuple[List[str], List[Tuple[int, str]]]:
+    """
+    Split a Markdown document into tokens and headings.
+
+    Args:
+        text: Markdown text
+
+    Returns:
+        (tokens, [(token position, heading text)])
+    """
+    tokens: List[str] = []
+    headings: List[Tuple[int, str]] = []
+    in_code = False
+
+    for line in text.splitlines():
+        if line.lstrip().startswith("```"):
+            in_code = not in_code
+        elif not in_code:
+            match = _HEADING_RE.match(line)
+            if match:
+                headings.append((len(tokens), match.group(2)))
+        tokens.extend(tokenize(line))
+
+    return tokens, headings
+
+
+def parse_query(query: str) -> Tuple[List[str], List[List[str]]]:
+    """
+    Split a query into terms and "quoted phrases".
+
+    Returns:
+        (all distinct terms, phrases as term lists)
+    """
+    phrases = [tokenize(p) for p in _PHRASE_RE.findall(query)]
+    phrases = [p for p in phrases if len(p) > 1]
+    terms = list(dict.fromkeys(tokenize(query)))
+    return terms, phrases
+
+
+class InvertedIndex:
+    """Incrementally updated on-disk inverted index of text documents."""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30)
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def path_hash(self, path: str) -> Optional[str]:
+        """Content hash currently indexed for a path."""
+        row = self.conn.execute("SELECT hash FROM paths WHERE path = ?", (path,)).fetchone()
+        return row[0] if row else None
+
+    def add(self, path: str, load_text: Callable[[], str], content_hash: str = None) -> bool:
+        """
+        Index a document at a path unless its content is already indexed.
+
+        Args:
+            path: Document path (as shown in search hits)
+            load_text: Returns the document text; only called if it must be indexed
+            content_hash: Content hash, if known (computed from the text otherwise)
+
+        Returns:
+            True if the document's text was (re)indexed
+        """
+        if content_hash and self.path_hash(path) == content_hash:
+            return False
+
+        text = None
+        if not content_hash:
+            text = load_text()
+            content_hash = hash_text(text)
+            if self.path_hash(path) == content_hash:
+                return False
+
+        indexed = False
+        with self.conn:
+            exists = self.conn.execute("SELECT 1 FROM documents WHERE hash = ?", (content_hash,)).fetchone()
+            if not exists:
+                self._insert_document(content_hash, text if text is not None else load_text())
+                indexed = True
+
+            old_hash = self.path_hash(path)
+            self.conn.execute("INSERT OR REPLACE INTO paths (path, hash) VALUES (?, ?)", (path, content_hash))
+            if old_hash and old_hash != content_hash:
+                self._drop_if_unreferenced(old_hash)
+
+        return indexed
+
+    def _insert_document(self, content_hash: str, text: str) -> None:
+        tokens, headings = parse_document(text)
+        title = headings[0][1] if headings else ""
+
+        positions: Dict[str, array] = {}
+        for position, term in enumerate(tokens):
+            positions.setdefault(term, array('I')).append(position)
+
+        self.conn.execute(
+            "INSERT INTO documents (hash, title, length, headings) VALUES (?, ?, ?, ?)",
+            (content_hash, title, len(tokens), json.dumps(headings))
+        )
+        self.conn.executemany(
+            "INSERT INTO postings (term, hash, tf, positions) VALUES (?, ?, ?, ?)",
+            ((term, content_hash, len(p), p.tobytes()) for term, p in positions.items())
+        )
+
+    def _drop_if_unreferenced(self, content_hash: str) -> None:
+        if self.conn.execute("SELECT 1 FROM paths WHERE hash = ? LIMIT 1", (content_hash,)).fetchone():
+            return
+        self.conn.execute("DELETE FROM postings WHERE hash = ?", (content_hash,))
+        self.conn.execute("DELETE FROM documents WHERE hash = ?", (content_hash,))
+
+    def remove(self, path: str) -> None:
+        """Remove a path (and its document, if no other path has the same content)."""
+        old_hash = self.path_hash(path)
+        if not old_hash:
+            return
+        with self.conn:
+            self.conn.execute("DELETE FROM paths WHERE path = ?", (path,))
+            self._drop_if_unreferenced(old_hash)
+
+    def paths(self, prefix: str = "") -> List[str]:
+        """Indexed paths, optionally only those under a prefix."""
+        rows = self.conn.execute(
+            "SELECT path FROM paths WHERE substr(path, 1, ?) = ? ORDER BY path", (len(prefix), prefix)
+        )
+        return [row[0] for row in rows]
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def search(self, query: str, limit: int = 10, path_prefix: str = "") -> List[SearchHit]:
+        """
+        Find the documents best matching a query.
+
+        Args:
+            query: Search terms; "quoted phrases" must match exactly
+            limit: Maximum number of hits
+            path_prefix: Only return paths starting with this prefix
+
+        Returns:
+            Hits, best first
+        """
+        terms, phrases = parse_query(query)
+        if not terms:
+            return []
+
+        n, avg_length = self.conn.execute("SELECT COUNT(*), AVG(length) FROM documents").fetchone()
+        if not n:
+            return []
+
+        # BM25 from term frequencies and document lengths
+        placeholders = ",".join("?" * len(terms))
+        frequencies: Dict[str, Dict[str, int]] = {}
+        lengths: Dict[str, int] = {}
+        for term, content_hash, tf, length in self.conn.execute(
+            f"SELECT p.term, p.hash, p.tf, d.length FROM postings p JOIN documents d ON d.hash = p.hash "
+            f"WHERE p.term IN ({placeholders})", terms
+        ):
+            frequencies.setdefault(content_hash, {})[term] = tf
+            lengths[content_hash] = length
+
+        # IDF is computed over the whole index, before filtering by path
+        document_frequency: Dict[str, int] = {}
+        for doc_terms in frequencies.values():
+            for term in doc_terms:
+                document_frequency[term] = document_frequency.get(term, 0) + 1
+        idf = {t: math.log(1 + (n - df + 0.5) / (df + 0.5)) for t, df in document_frequency.items()}
+
+        if path_prefix:
+            in_prefix = {row[0] for row in self.conn.execute(
+                "SELECT DISTINCT hash FROM paths WHERE substr(path, 1, ?) = ?", (len(path_prefix), path_prefix)
+            )}
+            frequencies = {h: f for h, f in frequencies.items() if h in in_prefix}
+
+        if phrases:
+            phrase_terms = {t for phrase in phrases for t in phrase}
+            candidates = [h for h, doc_terms in frequencies.items() if phrase_terms <= doc_terms.keys()]
+            positions = self._positions(candidates, phrase_terms)
+            frequencies = {
+                h: frequencies[h] for h in candidates
+                if all(_has_phrase(positions.get(h, {}), phrase) for phrase in phrases)
+            }
+
+        scores = {}
+        for content_hash, doc_terms in frequencies.items():
+            norm_length = 1 - _B + _B * lengths[content_hash] / (avg_length or 1)
+            scores[content_hash] = sum(
+                idf[term] * tf * (_K1 + 1) / (tf + _K1 * norm_length)
+                for term, tf in doc_terms.items()
+            )
+
+        # Heading boost and sections only for the best candidates
+        top = sorted(scores, key=scores.get, reverse=True)[:max(limit * 5, 50)]
+        documents = self._documents(top)
+        positions = self._positions(top, set(terms))
+
+        scored = []
+        for content_hash in top:
+            title, _, headings = documents[content_hash]
+            doc_terms = frequencies[content_hash]
+            heading_terms = set(tokenize(" ".join([title] + [h for _, h in headings])))
+            score = scores[content_hash] * (1 + _HEADING_BOOST * len(heading_terms & doc_terms.keys()) / len(terms))
+
+            first_match = min(p[0] for p in positions[content_hash].values())
+            scored.append((score, content_hash, title, _section(headings, first_match)))
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+
+        hits = []
+        for score, content_hash, title, heading in scored:
+            for path in self._paths_for(content_hash, path_prefix):
+                hits.append(SearchHit(path, round(score, 4), title, heading))
+            if len(hits) >= limit:
+                break
+        return hits[:limit]
+
+    def _positions(self, hashes: List[str], terms: set) -> Dict[str, Dict[str, array]]:
+        """Token positions of some terms in some documents."""
+        positions: Dict[str, Dict[str, array]] = {}
+        terms = list(terms)
+        for i in range(0, len(hashes), 500):
+            chunk = hashes[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT hash, term, positions FROM postings "
+                f"WHERE term IN ({','.join('?' * len(terms))}) AND hash IN ({','.join('?' * len(chunk))})",
+                terms + chunk
+            )
+            for content_hash, term, blob in rows:
+                positions.setdefault(content_hash, {})[term] = array('I', blob)
+        return positions
+
+    def _documents(self, hashes: Iterable[str]) -> Dict[str, Tuple[str, int, list]]:
+        hashes = list(hashes)
+        documents = {}
+        for i in range(0, len(hashes), 500):
+            chunk = hashes[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT hash, title, length, headings FROM documents WHERE hash IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            for content_hash, title, length, headings in rows:
+                documents[content_hash] = (title, length, json.loads(headings))
+        return documents
+
+    def _paths_for(self, content_hash: str, prefix: str) -> List[str]:
+        rows = self.conn.execute(
+            "SELECT path FROM paths WHERE hash = ? AND substr(path, 1, ?) = ? ORDER BY path",
+            (content_hash, len(prefix), prefix)
+        )
+        return [row[0] for row in rows]
+
+
+def _has_phrase(positions: Dict[str, array], phrase: List[str]) -> bool:
+    """Whether the phrase's terms occur at consecutive positions."""
+    if any(term not in positions for term in phrase):
+        return False
+    starts = set(positions[phrase[0]])
+    for offset, term in enumerate(phrase[1:], 1):
+        starts &= {p - offset for p in positions[term]}
+        if not starts:
+            return False
+    return True
+
+
+def _section(headings: List[Tuple[int, str]], position: int) -> str:
+    """Heading of the section containing a token position."""
+    current = ""
+    for heading_position, heading in headings:
+        if heading_position > position:
+            break
+        current = heading
+    return current
+
+
+# ============================================================================
+# Course corpus
+# ============================================================================
+
+def course_index_path(base_path: Path) -> Path:
+    """Location of the search index for a base directory of courses."""
+    return Path(base_path) / INDEX_FILE_NAME
+
+
+def index_lessons(base_path: Path, lessons: Iterable[Tuple[Path, Optional[str]]]) -> int:
+    """
+    Add lessons to the search index of their base directory.
+
+    Args:
+        base_path: Directory containing the course directories
+        lessons: (lesson file, content hash or None) pairs
+
+    Returns:
+        Number of lessons whose text was indexed
+    """
+    base_path = Path(base_path)
+    indexed = 0
+    with InvertedIndex(course_index_path(base_path)) as index:
+        for lesson_path, content_hash in lessons:
+            lesson_path = Path(lesson_path)
+            indexed += index.add(
+                str(lesson_path.relative_to(base_path)),
+                lambda: lesson_path.read_text(encoding='utf-8'),
+                content_hash
+            )
+    return indexed
+
+
+def reindex_corpus(base_path: Path) -> Tuple[int, int]:
+    """
+    Bring the search index of a base directory in line with the lesson files on disk.
+
+    Args:
+        base_path: Directory containing the course directories
+
+    Returns:
+        (lessons indexed, paths removed)
+    """
+    base_path = Path(base_path)
+    lesson_files = sorted(base_path.glob("**/lessons/**/lesson_*.md"))
+    on_disk = {str(p.relative_to(base_path)) for p in lesson_files}
+
+    with InvertedIndex(course_index_path(base_path)) as index:
+        stale = [path for path in index.paths() if path not in on_disk]
+        for path in stale:
+            index.remove(path)
+
+    indexed = index_lessons(base_path, ((p, None) for p in lesson_files))
+    return indexed, len(stale)
@@ -5,14 +5,33 @@ Saves and loads agent state to allow resuming from interruptions.
 """
 
 import json
+import os
 from pathlib import Path
 from typing import Dict, Any
+from src.tools.blob_store import to_handle
+from src.tools.modules import MODULE_DIR_RE
+from src.tools.artifacts import (
+    adopt_legacy_state,
+    content_hash,
+    is_fresh,
+    knowledge_base_inputs,
+    raw_notes_inputs,
+    sources_inputs,
+)
+from src.config import Config
+from src.tools.log import get_logger
+
+logger = get_logger(__name__)
 
 
 def save_state(repo_path: Path, state: Dict[str, Any]) -> None:
     """
     Save agent state to a JSON file.
 
+    Large texts are stored in the blob store and saved as handles. Lesson
+    handles are saved as the lesson manifest (key → path, size, mtime and
+    content hash), so resuming does not need to read lesson files.
+
     Args:
         repo_path: Path to the repository
         state: Agent state dictionary
@@ -22,8 +41,10 @@ def save_state(repo_path: Path, state: Dict[str, Any]) -> None:
     # Create a serializable version of state
     # Handle both dict and list for lessons
     lessons_data = state.get("lessons", [])
+    lesson_manifest = {}
     if isinstance(lessons_data, dict):
         completed_lessons = list(lessons_data.keys())
+        lesson_manifest = {k: v for k, v in lessons_data.items() if isinstance(v, dict)}
     elif isinstance(lessons_data, list):
         completed_lessons = lessons_data
     else:
@@ -32,11 +53,20 @@ def save_state(repo_path: Path, state: Dict[str, Any]) -> None:
     serializable_state = {
         "topic": state.get("topic"),
         "target_audience": state.get("target_audience"),
+        "language": state.get("language"),
         "research_sources": state.get("research_sources", []),
-        "raw_notes": state.get("raw_notes", ""),
-        "knowledge_base": state.get("knowledge_base", ""),
+        "raw_notes": to_handle(repo_path, state.get("raw_notes")),
+        "search_results": to_handle(repo_path, state.get("search_results")),
+        "knowledge_base": to_handle(repo_path, state.get("knowledge_base")),
         "lesson_outline": state.get("lesson_outline", []),
+        "modules": [
+            {**module, "knowledge_base": to_handle(repo_path, module.get("knowledge_base"))}
+            for module in state.get("modules") or []
+        ],
         "completed_lessons": completed_lessons,
+        "lessons": lesson_manifest,
+        "artifacts": state.get("artifacts", {}),
+        "pending_batch": state.get("pending_batch"),
     }
 
     state_file.write_text(json.dumps(serializable_state, indent=2), encoding='utf-8')
@@ -50,7 +80,10 @@ def load_state(repo_path: Path) -> Dict[str, Any]:
         repo_path: Path to the repository
 
     Returns:
-        Dictionary with saved state, or empty dict if no state exists
+        Dictionary with saved state, or empty dict if no state exists.
+        raw_notes and knowledge_base are handles (or inline text in state
+        files written before handles existed), search_results a handle to
+        the search response as JSON; see src/tools/blob_store.py.
     """
     state_file = repo_path / ".agent_state.json"
 
@@ -60,54 +93,84 @@ def load_state(repo_path: Path) -> Dict[str, Any]:
     try:
         return json.loads(state_file.read_text(encoding='utf-8'))
     except Exception as e:
-        print(f"  ⚠ Warning: Could not load saved state: {e}")
+        logger.warning(f"  ⚠ Warning: Could not load saved state: {e}")
         return {}
 
 
-def check_resume_capability(repo_path: Path) -> Dict[str, bool]:
+def check_resume_capability(repo_path: Path, topic: str = None, target_audience: str = None,
+                            saved_state: Dict[str, Any] = None) -> Dict[str, Any]:
     """
     Check what can be resumed from existing state.
 
+    A step can be skipped only if its saved artifacts are still fresh, i.e.
+    the topic, audience, models, prompt templates and upstream artifacts they
+    were built from have not changed (see src/tools/artifacts.py).
+
     Args:
         repo_path: Path to the repository
+        topic: Topic of the current run (defaults to the saved topic)
+        target_audience: Audience of the current run (defaults to the saved audience)
+        saved_state: State already loaded with load_state (loaded here if omitted)
 
     Returns:
         Dictionary with flags for what can be resumed:
         {
             "has_state": bool,
             "can_skip_research": bool,
+            "can_reuse_sources": bool,  # saved search results are fresh (only the notes need rebuilding)
             "can_skip_synthesis": bool,
-            "completed_lessons": list
+            "completed_lessons": list,
+            "lessons": dict,  # lesson key → handle (see find_existing_lessons)
+            "artifacts": dict
         }
     """
     state_file = repo_path / ".agent_state.json"
-    lessons_dir = repo_path / "lessons"
 
     resume_info = {
         "has_state": state_file.exists(),
         "can_skip_research": False,
+        "can_reuse_sources": False,
         "can_skip_synthesis": False,
-        "completed_lessons": []
+        "completed_lessons": [],
+        "lessons": {},
+        "artifacts": {}
     }
 
     if not state_file.exists():
         return resume_info
 
     try:
-        saved_state = load_state(repo_path)
+        if saved_state is None:
+            saved_state = load_state(repo_path)
+        topic = topic or saved_state.get("topic") or ""
+        target_audience = target_audience or saved_state.get("target_audience") or ""
+
+        # Find completed lessons
+        resume_info["lessons"] = find_existing_lessons(repo_path, saved_state.get("lessons"))
+        resume_info["completed_lessons"] = list(resume_info["lessons"])
 
-        # Can skip research if we have raw notes
+        # State files from before artifact tracking are adopted as-is
+        artifacts = saved_state.get("artifacts")
+        if artifacts is None:
+            artifacts = adopt_legacy_state(saved_state, resume_info["completed_lessons"])
+        resume_info["artifacts"] = artifacts
+
+        # Can skip research if we have raw notes built from the current inputs
+        sources_fresh = is_fresh(artifacts, "sources", sources_inputs(topic))
         if saved_state.get("raw_notes"):
-            resume_info["can_skip_research"] = True
+            resume_info["can_skip_research"] = sources_fresh and is_fresh(
+                artifacts, "raw_notes", raw_notes_inputs(content_hash(artifacts, "sources"), topic, target_audience)
+            )
 
-        # Can skip synthesis if we have knowledge base
-        if saved_state.get("knowledge_base"):
-            resume_info["can_skip_synthesis"] = True
+        # Otherwise stale notes (e.g. a new audience) are rebuilt from the saved search results
+        resume_info["can_reuse_sources"] = sources_fresh and bool(saved_state.get("search_results"))
 
-        # Find completed lessons
-        if lessons_dir.exists():
-            existing_lessons = [f.stem for f in lessons_dir.glob("lesson_*.md")]
-            resume_info["completed_lessons"] = existing_lessons
+        # Can skip synthesis if we have a knowledge base built from those notes
+        if saved_state.get("knowledge_base") and resume_info["can_skip_research"]:
+            resume_info["can_skip_synthesis"] = is_fresh(
+                artifacts, "knowledge_base",
+                knowledge_base_inputs(content_hash(artifacts, "raw_notes"), topic, Config.MODULES_MODE)
+            ) and (bool(saved_state.get("modules")) or not Config.MODULES_MODE)
 
         return resume_info
 
@@ -115,25 +178,45 @@ def check_resume_capability(repo_path: Path) -> Dict[str, bool]:
         return resume_info
 
 
-def load_existing_lessons(repo_path: Path) -> Dict[str, str]:
+def find_existing_lessons(repo_path: Path, manifest: Dict[str, Dict[str, Any]] = None) -> Dict[str, Dict[str, Any]]:
     """
-    Load existing lesson files from disk.
+    Find existing lesson files without reading their content.
+
+    The lessons directory is listed once, and each module folder in it
+    (e.g. lessons/01-Fundamentals/) once; lessons in a module folder have
+    keys like "01-Fundamentals/lesson_01_intro". A lesson whose size and mtime
+    match its manifest entry (saved with the state) keeps the entry's
+    content hash; other lessons get a handle without one.
 
     Args:
         repo_path: Path to the repository
+        manifest: Lesson manifest from the saved state ("lessons")
 
     Returns:
-        Dictionary mapping lesson keys to content
+        Dictionary mapping lesson keys to artifact handles
     """
     lessons_dir = repo_path / "lessons"
+    manifest = manifest or {}
     lessons = {}
 
-    if not lessons_dir.exists():
-        return lessons
-
-    for lesson_file in sorted(lessons_dir.glob("lesson_*.md")):
-        lesson_key = lesson_file.stem
-        content = lesson_file.read_text(encoding='utf-8')
-        lessons[lesson_key] = content
-
+    def scan(directory: Path, prefix: str):
+        try:
+            entries = sorted(os.scandir(directory), key=lambda e: e.name)
+        except FileNotFoundError:
+            return
+
+        for entry in entries:
+            if not prefix and entry.is_dir() and MODULE_DIR_RE.match(entry.name):
+                scan(Path(entry.path), f"{entry.name}/")
+                continue
+            if not (entry.name.startswith("lesson_") and entry.name.endswith(".md")):
+                continue
+            lesson_key = prefix + entry.name[:-3]
+            stat = entry.stat()
+            handle = manifest.get(lesson_key)
+            if not (handle and handle.get("size") == stat.st_size and handle.get("mtime_ns") == stat.st_mtime_ns):
+                handle = {"path": f"lessons/{lesson_key}.md", "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            lessons[lesson_key] = handle
+
+    scan(lessons_dir, "")
     return lessons
@@ -0,0 +1,137 @@
+"""
+Early-abort validation of streamed lessons (STREAM_VALIDATION).
+
+A lesson is only checked after it has been generated, so a malformed one
+(most of the required sections missing, or one section rambling on) costs
+the full output budget before anyone notices. With stream validation the
+lesson is streamed and its structure checked as tokens arrive:
+
+- the first required section must start within STREAM_FIRST_SECTION_TOKENS
+  (the title and a short intro come before it);
+- each section must give way to the next within STREAM_SECTION_TOKEN_LIMIT
+  output tokens;
+- no more than STREAM_MAX_MISSING_SECTIONS required sections may be
+  skipped, checked as soon as a later section starts and again at the end.
+
+A lesson that breaks a rule is aborted at that point (closing the stream
+stops generation) and requested again, up to STREAM_VALIDATION_RETRIES
+times; the last attempt is kept as-is. Sections are recognized by their
+"##" headings (LESSON_SECTIONS); the lesson's "#" title and "###"
+subheadings never count as sections, even if they contain section names.
+Lessons written in another language are checked by counting their "##"
+headings instead.
+"""
+
+import re
+from typing import List, Optional
+
+from src.config import Config
+from src.tools.token_utils import count_tokens
+
+_HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+
+
+class StreamAborted(RuntimeError):
+    """A streamed generation was aborted as malformed."""
+
+    def __init__(self, reason: str, detail: str):
+        super().__init__(f"{reason}: {detail}")
+        self.reason = reason
+        self.detail = detail
+
+
+def _words(text: str) -> frozenset:
+    return frozenset(re.findall(r'[a-z0-9]+', text.lower())) - {"and"}
+
+
+def heading_matches(heading: str, section: str) -> bool:
+    """Whether a heading names a section, e.g. "3. Intuition and Examples" → "Intuition & Examples"."""
+    return _words(section) <= _words(heading)
+
+
+class LessonStreamValidator:
+    """Checks a lesson's section structure and pacing while it is streamed."""
+
+    def __init__(self, sections: List[str], language: Optional[str] = None):
+        """
+        Args:
+            sections: Required section names, in order
+            language: Language the lesson is written in (None for English);
+                translated headings are counted rather than matched by name
+        """
+        self.sections = [_words(section) for section in sections]
+        self.by_name = not language
+        self.found = 0  # Index of the next expected section
+        self.missing = 0
+        self.tokens = 0
+        self.section_start = 0  # Token count when the current section started
+        self._line = ""
+        self._in_code = False
+        self._first_heading = True
+
+    def feed(self, text: str) -> None:
+        """
+        Account for a streamed chunk of the lesson.
+
+        Raises:
+            StreamAborted: If the lesson is already clearly malformed
+        """
+        self.tokens += count_tokens(text)
+        lines = (self._line + text).split('\n')
+        self._line = lines.pop()
+        for line in lines:
+            self._check_line(line)
+        self._check_pacing()
+
+    def finish(self) -> None:
+        """
+        Check the complete lesson.
+
+        Raises:
+            StreamAborted: If too many required sections are missing
+        """
+        if self._line:
+            self._check_line(self._line)
+            self._line = ""
+        missing = self.missing + len(self.sections) - self.found
+        if missing > Config.STREAM_MAX_MISSING_SECTIONS:
+            raise StreamAborted("missing_sections", f"{missing} of {len(self.sections)} sections missing")
+
+    def _check_line(self, line: str) -> None:
+        if line.lstrip().startswith("```"):
+            self._in_code = not self._in_code
+            return
+        match = None if self._in_code else _HEADING_RE.match(line)
+        if not match:
+            return
+        # The lesson title (a leading level-1 heading) is not a section
+        is_title = self._first_heading and len(match.group(1)) == 1
+        self._first_heading = False
+        if is_title or len(match.group(1)) != 2 or self.found >= len(self.sections):
+            return
+
+        if self.by_name:
+            words = _words(match.group(2))
+            for index in range(self.found, len(self.sections)):
+                if self.sections[index] <= words:
+                    self._section_started(index)
+                    return
+        else:
+            self._section_started(self.found)
+
+    def _section_started(self, index: int) -> None:
+        self.missing += index - self.found
+        self.found = index + 1
+        self.section_start = self.tokens
+        if self.missing > Config.STREAM_MAX_MISSING_SECTIONS:
+            raise StreamAborted("skipped_sections", f"{self.missing} sections skipped before section {index + 1}")
+
+    def _check_pacing(self) -> None:
+        if self.found == 0:
+            if self.tokens > Config.STREAM_FIRST_SECTION_TOKENS:
+                raise StreamAborted("no_sections", f"no section heading after {self.tokens} tokens")
+        elif self.tokens - self.section_start > Config.STREAM_SECTION_TOKEN_LIMIT:
+            raise StreamAborted(
+                "section_overrun",
+                f"section {self.found} ran over {Config.STREAM_SECTION_TOKEN_LIMIT} tokens"
+            )
@@ -1,9 +1,26 @@
 """
-Tavily search client for web research.
+Search clients for research.
+
+search_topic() runs the search backend selected by SEARCH_BACKEND: Tavily
+web search ("tavily", the default) or a local document corpus ("local", see
+src/tools/local_corpus.py). Backends are functions
+(topic, max_results, depth) → response in Tavily's shape; more can be added
+with register_search_backend().
 """
 
+import logging
+import json
+import time
+from typing import Callable, Dict
 from tavily import TavilyClient
 from src.config import Config
+from src.tools.local_corpus import search_corpus
+from src.tools.deadlines import DeadlineExceeded, check, request_timeout
+from src.tools.latency_stats import record_latency
+from src.tools.metrics import SEARCH_REQUESTS, SEARCH_RESPONSE_BYTES, SEARCH_SECONDS
+from src.tools.log import get_logger, payload_summary
+
+logger = get_logger(__name__)
 
 
 _tavily_client = None
@@ -17,13 +34,35 @@ def get_tavily_client() -> TavilyClient:
     return _tavily_client
 
 
-def search_topic(topic: str, max_results: int = None) -> dict:
+def search_topic(topic: str, max_results: int = None, depth: str = None) -> dict:
+    """
+    Search for information about a topic with the configured backend.
+
+    Args:
+        topic: The topic to search for
+        max_results: Maximum number of results (default from config)
+        depth: Search depth, "basic" or "advanced" (default from config;
+            ignored by backends without depth levels)
+
+    Returns:
+        Dictionary with search results including:
+        - results: List of {title, url, content, raw_content, score}
+        - query: The search query used
+    """
+    backend = SEARCH_BACKENDS.get(Config.SEARCH_BACKEND)
+    if backend is None:
+        raise RuntimeError(f"Unknown search backend: {Config.SEARCH_BACKEND}")
+    return backend(topic, max_results, depth)
+
+
+def tavily_search(topic: str, max_results: int = None, depth: str = None) -> dict:
     """
     Search for information about a topic using Tavily API.
 
     Args:
         topic: The topic to search for
         max_results: Maximum number of results (default from config)
+        depth: Search depth, "basic" or "advanced" (default from config)
 
     Returns:
         Dictionary with search results including:
@@ -33,21 +72,56 @@ def search_topic(topic: str, max_results: int = None) -> dict:
     if max_results is None:
         max_results = Config.TAVILY_MAX_RESULTS
 
+    if depth is None:
+        depth = Config.TAVILY_SEARCH_DEPTH
+    start = time.monotonic()
     try:
         client = get_tavily_client()
         response = client.search(
             query=topic,
             max_results=max_results,
-            search_depth=Config.TAVILY_SEARCH_DEPTH,
-            include_raw_content=True
+            search_depth=depth,
+            include_raw_content=True,
+            timeout=request_timeout()
         )
-        print(response)
+        seconds = time.monotonic() - start
+        record_latency("search", depth, seconds)
+        SEARCH_REQUESTS.inc(depth=depth, status="ok")
+        SEARCH_SECONDS.observe(seconds, depth=depth)
+        SEARCH_RESPONSE_BYTES.observe(len(json.dumps(response, default=str).encode('utf-8')), depth=depth)
+        logger.info(f"  ✓ Tavily returned {payload_summary(response)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Tavily response: %s", json.dumps(response, default=str))
         return response
 
+    except DeadlineExceeded:
+        SEARCH_REQUESTS.inc(depth=depth, status="deadline")
+        raise
     except Exception as e:
+        SEARCH_REQUESTS.inc(depth=depth, status="error")
+        SEARCH_SECONDS.observe(time.monotonic() - start, depth=depth)
+        check()  # Report a timeout caused by a passed deadline as such
         raise RuntimeError(f"Tavily search failed: {str(e)}")
 
 
+SEARCH_BACKENDS: Dict[str, Callable[..., dict]] = {
+    "tavily": tavily_search,
+    "local": search_corpus,
+}
+
+
+def register_search_backend(name: str, search: Callable[..., dict]) -> None:
+    """
+    Make a search backend selectable with SEARCH_BACKEND=<name>.
+
+    Args:
+        name: Backend name
+        search: Function (topic, max_results, depth) → dict with "query" and
+            "results" ({title, url, content, raw_content, score} each)
+    """
+    SEARCH_BACKENDS[name] = search
+
+
 def format_search_results(search_response: dict) -> str:
     """
     Format Tavily search results into a readable string.
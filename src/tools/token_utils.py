@@ -5,6 +5,9 @@ Provides intelligent truncation to stay within Claude's 64k token limit.
 """
 
 import tiktoken
+from src.tools.log import get_logger
+
+logger = get_logger(__name__)
 
 
 def count_tokens(text: str, model: str = "gpt-4") -> int:
@@ -103,12 +106,12 @@ def smart_truncate_for_prompt(
     if original_tokens <= max_tokens:
         return content, False
 
-    print(f"  ⚠️  {content_name} has {original_tokens:,} tokens (limit: {max_tokens:,})")
-    print(f"  → Truncating to fit within limit...")
+    logger.warning(f"  ⚠️  {content_name} has {original_tokens:,} tokens (limit: {max_tokens:,})")
+    logger.info(f"  → Truncating to fit within limit...")
 
     truncated = truncate_to_token_limit(content, max_tokens)
     final_tokens = count_tokens(truncated)
 
-    print(f"  ✓ Truncated to {final_tokens:,} tokens")
+    logger.info(f"  ✓ Truncated to {final_tokens:,} tokens")
 
     return truncated, True
@@ -0,0 +1,212 @@
+"""Tests for the batch API client (src/tools/batch_client.py) against in-process fake batch endpoints."""
+
+import io
+import json
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from src.config import Config
+from src.tools import batch_client
+from src.tools.deadlines import Deadline, DeadlineExceeded, deadline_scope
+
+
+_CUSTOM_ID_RE = re.compile(r'^[a-zA-Z0-9_-]{1,64}$')
+
+REQUESTS = {
+    "lesson_01_intro": ("system", "Write lesson 1"),
+    "01-Grundlagen/lesson_02_überblick_über_die_grundlagen_der_containerisierung": ("system", "Write lesson 2"),
+    "lesson_03_日本語": ("system", "Write lesson 3"),
+}
+
+
+def answer(prompt: str) -> str:
+    return f"# Answer to: {prompt}"
+
+
+class FakeAnthropicBatches:
+    """Message Batches endpoints: create, retrieve and results."""
+
+    def __init__(self, polls_until_done: int = 1, fail: tuple = ()):
+        self.batches = {}
+        self.polls_until_done = polls_until_done
+        self.fail = fail
+        self.created = []
+        self.retrieved = []
+
+    def create(self, requests):
+        for request in requests:
+            if not _CUSTOM_ID_RE.match(request["custom_id"]):
+                raise ValueError(f"invalid custom_id: {request['custom_id']!r}")
+        batch_id = f"msgbatch_{len(self.batches) + 1}"
+        self.batches[batch_id] = {"requests": requests, "polls": 0}
+        self.created.append(batch_id)
+        return SimpleNamespace(id=batch_id)
+
+    def retrieve(self, batch_id):
+        self.retrieved.append(batch_id)
+        batch = self.batches[batch_id]
+        batch["polls"] += 1
+        done = batch["polls"] >= self.polls_until_done
+        counts = SimpleNamespace(
+            succeeded=len(batch["requests"]) if done else 0, errored=0,
+            processing=0 if done else len(batch["requests"])
+        )
+        return SimpleNamespace(id=batch_id, processing_status="ended" if done else "in_progress", request_counts=counts)
+
+    def results(self, batch_id):
+        for request in self.batches[batch_id]["requests"]:
+            prompt = request["params"]["messages"][0]["content"]
+            if prompt in self.fail:
+                result = SimpleNamespace(type="errored")
+            else:
+                message = SimpleNamespace(content=[SimpleNamespace(text=answer(prompt))])
+                result = SimpleNamespace(type="succeeded", message=message)
+            yield SimpleNamespace(custom_id=request["custom_id"], result=result)
+
+
+class FakeOpenAIBatchAPI:
+    """OpenAI Batch API endpoints: file upload and download, batch create and retrieve."""
+
+    def __init__(self):
+        self.files = SimpleNamespace(create=self._create_file, content=self._file_content)
+        self.batches = SimpleNamespace(create=self._create_batch, retrieve=self._retrieve_batch)
+        self.stored = {}
+        self.created = []
+
+    def _create_file(self, file, purpose):
+        _, data = file
+        file_id = f"file_{len(self.stored) + 1}"
+        self.stored[file_id] = data.read().decode("utf-8") if isinstance(data, io.BytesIO) else data
+        return SimpleNamespace(id=file_id)
+
+    def _file_content(self, file_id):
+        return SimpleNamespace(text=self.stored[file_id])
+
+    def _create_batch(self, input_file_id, endpoint, completion_window):
+        lines = []
+        for line in self.stored[input_file_id].splitlines():
+            request = json.loads(line)
+            assert _CUSTOM_ID_RE.match(request["custom_id"])
+            prompt = request["body"]["messages"][1]["content"]
+            lines.append(json.dumps({
+                "custom_id": request["custom_id"],
+                "response": {"status_code": 200, "body": {"choices": [{"message": {"content": answer(prompt)}}]}},
+            }))
+        output_id = self._create_file(("output.jsonl", io.BytesIO("\n".join(lines).encode("utf-8"))), "batch_output").id
+        batch_id = f"batch_{len(self.created) + 1}"
+        self.created.append(SimpleNamespace(
+            id=batch_id, status="completed", output_file_id=output_id,
+            request_counts=SimpleNamespace(completed=len(lines), total=len(lines), failed=0)
+        ))
+        return self.created[-1]
+
+    def _retrieve_batch(self, batch_id):
+        return next(batch for batch in self.created if batch.id == batch_id)
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(Config, "BATCH_POLL_INTERVAL", 0)
+
+
+@pytest.fixture
+def anthropic_batches(monkeypatch):
+    batches = FakeAnthropicBatches(polls_until_done=3)
+    client = SimpleNamespace(messages=SimpleNamespace(batches=batches))
+    monkeypatch.setattr(Config, "BATCH_PROVIDER", "anthropic")
+    monkeypatch.setattr(batch_client, "get_anthropic_batch_client", lambda: client)
+    return batches
+
+
+@pytest.fixture
+def openai_batches(monkeypatch):
+    api = FakeOpenAIBatchAPI()
+    monkeypatch.setattr(Config, "BATCH_PROVIDER", "openai")
+    monkeypatch.setattr(batch_client, "get_openai_batch_client", lambda: api)
+    return api
+
+
+def test_request_ids_are_provider_safe_and_stable():
+    for key in REQUESTS:
+        assert _CUSTOM_ID_RE.match(batch_client.batch_request_id(key))
+        assert batch_client.batch_request_id(key) == batch_client.batch_request_id(key)
+    assert len({batch_client.batch_request_id(key) for key in REQUESTS}) == len(REQUESTS)
+
+
+def test_anthropic_round_trip_maps_results_to_keys(anthropic_batches):
+    submitted = []
+
+    results = batch_client.run_claude_batch(REQUESTS, on_submitted=submitted.append)
+
+    assert results == {key: answer(user) for key, (_, user) in REQUESTS.items()}
+    assert anthropic_batches.created == ["msgbatch_1"]
+    assert anthropic_batches.retrieved == ["msgbatch_1"] * 3
+    assert submitted[0]["id"] == "msgbatch_1"
+    assert submitted[0]["provider"] == "anthropic"
+
+
+def test_failed_requests_map_to_none(anthropic_batches):
+    anthropic_batches.fail = ("Write lesson 2",)
+
+    results = batch_client.run_claude_batch(REQUESTS)
+
+    assert results["lesson_01_intro"] == answer("Write lesson 1")
+    assert results["01-Grundlagen/lesson_02_überblick_über_die_grundlagen_der_containerisierung"] is None
+
+
+def test_openai_round_trip_maps_results_to_keys(openai_batches):
+    results = batch_client.run_claude_batch(REQUESTS)
+
+    assert results == {key: answer(user) for key, (_, user) in REQUESTS.items()}
+    assert len(openai_batches.created) == 1
+
+
+def test_pending_batch_is_resumed_instead_of_resubmitted(anthropic_batches):
+    submitted = []
+    first = batch_client.run_claude_batch(REQUESTS, on_submitted=submitted.append)
+
+    submitted_again = []
+    resumed = batch_client.run_claude_batch(REQUESTS, pending=submitted[0], on_submitted=submitted_again.append)
+
+    assert resumed == first
+    assert anthropic_batches.created == ["msgbatch_1"]
+    assert submitted_again == []
+
+
+def test_pending_batch_with_another_fingerprint_is_not_resumed(anthropic_batches):
+    submitted = []
+    batch_client.run_claude_batch(REQUESTS, on_submitted=submitted.append)
+    changed = {**REQUESTS, "lesson_01_intro": ("system", "Write lesson 1 again")}
+
+    results = batch_client.run_claude_batch(changed, pending=submitted[0], on_submitted=submitted.append)
+
+    assert anthropic_batches.created == ["msgbatch_1", "msgbatch_2"]
+    assert submitted[1]["id"] == "msgbatch_2"
+    assert submitted[1]["fingerprint"] != submitted[0]["fingerprint"]
+    assert results["lesson_01_intro"] == answer("Write lesson 1 again")
+
+
+def test_pending_batch_of_another_provider_is_not_resumed(anthropic_batches):
+    pending = {
+        "id": "batch_1", "provider": "openai",
+        "fingerprint": batch_client.batch_fingerprint(REQUESTS, 1.0, 16000)
+    }
+
+    batch_client.run_claude_batch(REQUESTS, pending=pending)
+
+    assert anthropic_batches.created == ["msgbatch_1"]
+
+
+def test_polling_stops_when_the_deadline_passes(anthropic_batches, monkeypatch):
+    anthropic_batches.polls_until_done = 10 ** 9
+    monkeypatch.setattr(Config, "BATCH_POLL_INTERVAL", 60)
+    submitted = []
+
+    with deadline_scope(Deadline.after(0.05, "step")):
+        with pytest.raises(DeadlineExceeded):
+            batch_client.run_claude_batch(REQUESTS, on_submitted=submitted.append)
+
+    # The job was recorded before polling, so the next run resumes it
+    assert submitted[0]["id"] == "msgbatch_1"
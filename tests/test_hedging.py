@@ -0,0 +1,182 @@
+"""Tests for request hedging (src/tools/hedging.py) with fake attempts on controlled delays."""
+
+import threading
+import time
+
+import pytest
+
+from src.tools.hedging import HedgeBudget, HedgeCancelled, LatencyTracker, hedged_call
+
+
+class FakeAttempt:
+    """An attempt that sends its first token and finishes after fixed delays, or fails."""
+
+    def __init__(self, text: str, first_token_after: float, finish_after: float, error: Exception = None):
+        self.text = text
+        self.first_token_after = first_token_after
+        self.finish_after = finish_after
+        self.error = error
+        self.started = threading.Event()
+        self.cancelled = threading.Event()
+        self.cancel_event = None
+
+    def __call__(self, first_token: threading.Event, cancel: threading.Event) -> str:
+        self.started.set()
+        self.cancel_event = cancel
+        start = time.monotonic()
+        while time.monotonic() - start < self.finish_after:
+            if cancel.is_set():
+                self.cancelled.set()
+                raise HedgeCancelled()
+            if time.monotonic() - start >= self.first_token_after:
+                first_token.set()
+            time.sleep(0.005)
+        if self.error:
+            raise self.error
+        first_token.set()
+        return self.text
+
+
+def tracker_with(*seconds: float) -> LatencyTracker:
+    tracker = LatencyTracker()
+    for value in seconds:
+        tracker.record(value)
+    return tracker
+
+
+def run(primary, hedge, tracker=None, budget=None, min_samples=3):
+    return hedged_call(
+        primary=primary,
+        hedge=hedge,
+        tracker=tracker or tracker_with(0.05, 0.05, 0.05),
+        budget=budget or HedgeBudget(max_hedges=10, max_fraction=1.0),
+        percentile=95,
+        min_samples=min_samples
+    )
+
+
+# ----------------------------------------------------------------------------
+# LatencyTracker
+# ----------------------------------------------------------------------------
+
+def test_percentile_of_recorded_latencies():
+    tracker = tracker_with(*[float(s) for s in range(10, 0, -1)])
+
+    assert tracker.percentile(0) == 1.0
+    assert tracker.percentile(50) == 5.0
+    assert tracker.percentile(90) == 9.0
+    assert tracker.percentile(100) == 10.0
+
+
+def test_percentile_without_samples():
+    assert LatencyTracker().percentile(95) is None
+
+
+def test_tracker_keeps_a_sliding_window():
+    tracker = LatencyTracker(window=3)
+    for value in (100.0, 1.0, 2.0, 3.0):
+        tracker.record(value)
+
+    assert tracker.count() == 3
+    assert tracker.percentile(100) == 3.0
+
+
+# ----------------------------------------------------------------------------
+# HedgeBudget
+# ----------------------------------------------------------------------------
+
+def test_budget_caps_the_number_of_hedges():
+    budget = HedgeBudget(max_hedges=2, max_fraction=1.0)
+    for _ in range(10):
+        budget.record_call()
+
+    assert [budget.try_acquire() for _ in range(3)] == [True, True, False]
+
+
+def test_budget_caps_the_fraction_of_calls_hedged():
+    budget = HedgeBudget(max_hedges=100, max_fraction=0.25)
+    results = []
+    for _ in range(8):
+        budget.record_call()
+        results.append(budget.try_acquire())
+
+    # One hedge per four calls at most
+    assert results.count(True) == 2
+    assert budget.hedges <= 0.25 * budget.calls
+
+
+# ----------------------------------------------------------------------------
+# hedged_call
+# ----------------------------------------------------------------------------
+
+def test_fast_primary_is_not_hedged():
+    primary = FakeAttempt("primary", first_token_after=0.0, finish_after=0.1)
+    hedge = FakeAttempt("hedge", first_token_after=0.0, finish_after=0.01)
+
+    assert run(primary, hedge) == "primary"
+    assert not hedge.started.is_set()
+
+
+def test_no_hedge_without_enough_latency_history():
+    primary = FakeAttempt("primary", first_token_after=0.3, finish_after=0.3)
+    hedge = FakeAttempt("hedge", first_token_after=0.0, finish_after=0.01)
+
+    assert run(primary, hedge, tracker=tracker_with(0.01), min_samples=3) == "primary"
+    assert not hedge.started.is_set()
+
+
+def test_late_first_token_hedges_and_the_winner_is_returned():
+    primary = FakeAttempt("primary", first_token_after=2.0, finish_after=2.0)
+    hedge = FakeAttempt("hedge", first_token_after=0.0, finish_after=0.05)
+
+    assert run(primary, hedge) == "hedge"
+    # The losing primary is cancelled and stops
+    assert primary.cancel_event.is_set()
+    assert primary.cancelled.wait(timeout=1.0)
+
+
+def test_primary_that_wins_after_the_hedge_cancels_the_hedge():
+    primary = FakeAttempt("primary", first_token_after=0.2, finish_after=0.25)
+    hedge = FakeAttempt("hedge", first_token_after=2.0, finish_after=2.0)
+
+    assert run(primary, hedge) == "primary"
+    assert hedge.started.is_set()
+    assert hedge.cancelled.wait(timeout=1.0)
+
+
+def test_no_hedge_once_the_budget_is_spent():
+    budget = HedgeBudget(max_hedges=1, max_fraction=1.0)
+    first_hedge = FakeAttempt("hedge", first_token_after=0.0, finish_after=0.01)
+    run(FakeAttempt("primary", first_token_after=1.0, finish_after=1.0), first_hedge, budget=budget)
+    assert first_hedge.started.is_set()
+
+    primary = FakeAttempt("primary", first_token_after=0.2, finish_after=0.2)
+    hedge = FakeAttempt("hedge", first_token_after=0.0, finish_after=0.01)
+
+    assert run(primary, hedge, budget=budget) == "primary"
+    assert not hedge.started.is_set()
+    assert budget.hedges == 1
+
+
+def test_failed_attempt_falls_back_to_the_other():
+    primary = FakeAttempt("primary", first_token_after=0.2, finish_after=0.2, error=RuntimeError("overloaded"))
+    hedge = FakeAttempt("hedge", first_token_after=0.3, finish_after=0.4)
+
+    assert run(primary, hedge) == "hedge"
+
+
+def test_error_is_raised_when_both_attempts_fail():
+    primary = FakeAttempt("primary", first_token_after=0.2, finish_after=0.2, error=RuntimeError("primary down"))
+    hedge = FakeAttempt("hedge", first_token_after=0.0, finish_after=0.01, error=RuntimeError("hedge down"))
+
+    with pytest.raises(RuntimeError):
+        run(primary, hedge)
+
+
+def test_first_tokens_are_recorded_in_the_tracker():
+    tracker = tracker_with(0.05, 0.05, 0.05)
+    primary = FakeAttempt("primary", first_token_after=0.0, finish_after=0.02)
+
+    run(primary, FakeAttempt("hedge", 0.0, 0.01), tracker=tracker)
+
+    assert tracker.count() == 4
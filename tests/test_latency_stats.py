@@ -0,0 +1,62 @@
+"""Tests for the latency history (src/tools/latency_stats.py)."""
+
+import json
+
+import pytest
+
+from src.config import Config
+from src.tools import latency_stats
+
+
+@pytest.fixture
+def stats_file(tmp_path, monkeypatch):
+    path = tmp_path / ".latency_stats.json"
+    monkeypatch.setattr(Config, "LATENCY_STATS_FILE", str(path))
+    monkeypatch.setattr(latency_stats, "_pending", {})
+    monkeypatch.setattr(latency_stats, "_flush_registered", True)
+    return path
+
+
+def test_samples_are_written_once_per_flush(stats_file):
+    latency_stats.record_latency("claude", "model", 2.0, 100)
+    latency_stats.record_latency("claude", "model", 4.0, 300)
+
+    assert not stats_file.exists()
+    assert latency_stats.get_latency_profile("claude", "model") == (3.0, 400 / 6.0, 2)
+
+    latency_stats.flush_latency_stats()
+
+    assert json.loads(stats_file.read_text()) == {"claude:model": [[2.0, 100], [4.0, 300]]}
+    assert list(stats_file.parent.iterdir()) == [stats_file]
+
+
+def test_flush_keeps_samples_other_runs_wrote(stats_file):
+    latency_stats.record_latency("search", "basic", 1.0)
+    stats_file.write_text(json.dumps({"search:basic": [[0.5, 0]], "openai:gpt": [[3.0, 50]]}))
+
+    latency_stats.flush_latency_stats()
+
+    assert json.loads(stats_file.read_text()) == {
+        "search:basic": [[0.5, 0], [1.0, 0]],
+        "openai:gpt": [[3.0, 50]],
+    }
+
+
+def test_only_the_newest_samples_are_kept(stats_file, monkeypatch):
+    monkeypatch.setattr(latency_stats, "_MAX_SAMPLES", 3)
+    stats_file.write_text(json.dumps({"claude:model": [[9.0, 0], [9.0, 0]]}))
+    for seconds in (1.0, 2.0):
+        latency_stats.record_latency("claude", "model", seconds)
+
+    latency_stats.flush_latency_stats()
+
+    assert json.loads(stats_file.read_text()) == {"claude:model": [[9.0, 0], [1.0, 0], [2.0, 0]]}
+
+
+def test_torn_file_does_not_break_recording(stats_file):
+    stats_file.write_text('{"claude:model": [[1.0, ')
+    latency_stats.record_latency("claude", "model", 2.0)
+
+    latency_stats.flush_latency_stats()
+
+    assert json.loads(stats_file.read_text()) == {"claude:model": [[2.0, 0]]}
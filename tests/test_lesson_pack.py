@@ -0,0 +1,63 @@
+"""Tests for splitting packed lesson responses (src/nodes/writing_node.py)."""
+
+from src.nodes.writing_node import split_lesson_pack
+
+
+def lesson_block(n: int, body: str = None) -> str:
+    body = body if body is not None else f"# Lesson {n}\n\n## Learning Objectives\n\nText {n}."
+    return f"<<<LESSON {n}>>>\n{body}\n<<<END LESSON {n}>>>\n"
+
+
+def test_complete_pack_is_split_into_lessons():
+    response = "Here are the lessons.\n\n" + lesson_block(1) + "\n" + lesson_block(2)
+
+    lessons = split_lesson_pack(response, 2)
+
+    assert sorted(lessons) == [1, 2]
+    assert lessons[1] == "# Lesson 1\n\n## Learning Objectives\n\nText 1.\n"
+    assert lessons[2].startswith("# Lesson 2")
+
+
+def test_cut_off_pack_keeps_only_finished_lessons():
+    # The response hit the output limit in the middle of lesson 3
+    response = lesson_block(1) + lesson_block(2) + "<<<LESSON 3>>>\n# Lesson 3\n\n## Learning Obj"
+
+    lessons = split_lesson_pack(response, 3)
+
+    assert sorted(lessons) == [1, 2]
+
+
+def test_cut_off_before_first_end_marker_yields_nothing():
+    response = "<<<LESSON 1>>>\n# Lesson 1\n\nThe text stops here"
+
+    assert split_lesson_pack(response, 2) == {}
+
+
+def test_lesson_without_heading_is_malformed():
+    response = lesson_block(1, "Just some text without any heading.") + lesson_block(2)
+
+    assert sorted(split_lesson_pack(response, 2)) == [2]
+
+
+def test_mismatched_end_marker_is_malformed():
+    response = "<<<LESSON 1>>>\n# Lesson 1\n<<<END LESSON 2>>>\n" + lesson_block(2)
+
+    assert sorted(split_lesson_pack(response, 2)) == [2]
+
+
+def test_lessons_outside_the_pack_are_ignored():
+    response = lesson_block(1) + lesson_block(3) + lesson_block(0)
+
+    assert sorted(split_lesson_pack(response, 2)) == [1]
+
+
+def test_repeated_lesson_keeps_the_first():
+    response = lesson_block(1) + lesson_block(1, "# Lesson 1 again")
+
+    assert split_lesson_pack(response, 1)[1].startswith("# Lesson 1\n")
+
+
+def test_markers_must_start_a_line():
+    response = "Text <<<LESSON 1>>>\n# Lesson 1\n<<<END LESSON 1>>>\n"
+
+    assert split_lesson_pack(response, 1) == {}
@@ -0,0 +1,110 @@
+"""Tests for prompt minification (src/tools/prompt_minify.py)."""
+
+from src.tools.prompt_minify import expand_url_refs, minify_text
+
+
+URL = "https://docs.example.com/guides/networking/bridge-networks"
+
+
+def test_setext_headings_become_atx_headings():
+    text = "Overview\n========\n\nSome text.\n\nDetails\n-------\n\nMore text.\n"
+
+    minified, _ = minify_text(text, url_refs=False)
+
+    assert minified == "# Overview\n\nSome text.\n\n## Details\n\nMore text.\n"
+
+
+def test_rule_after_list_item_is_not_a_setext_heading():
+    text = "- first item\n---\nAfter the rule.\n"
+
+    minified, _ = minify_text(text, url_refs=False)
+
+    assert "## " not in minified
+    assert "- first item\n\n---\nAfter the rule." in minified
+
+
+def test_repeated_rules_collapse_to_one():
+    text = "Intro\n\n***\n\n---\n\n___\n\nBody\n"
+
+    minified, _ = minify_text(text, url_refs=False)
+
+    assert minified.count("---") == 1
+
+
+def test_grid_table_becomes_markdown_table():
+    text = (
+        "+--------+-------+\n"
+        "| Name   | Port  |\n"
+        "+========+=======+\n"
+        "| http   | 80    |\n"
+        "+--------+-------+\n"
+        "| https  | 443   |\n"
+        "+--------+-------+\n"
+    )
+
+    minified, _ = minify_text(text, url_refs=False)
+
+    assert minified == "| Name | Port |\n| --- | --- |\n| http | 80 |\n| https | 443 |\n"
+
+
+def test_padded_table_delimiters_are_shortened():
+    text = "| a      | b      |\n|:-------|-------:|\n| 1      | 2      |\n"
+
+    minified, _ = minify_text(text, url_refs=False)
+
+    assert minified == "| a | b |\n| :--- | ---: |\n| 1 | 2 |\n"
+
+
+def test_code_blocks_are_left_alone():
+    code = "```python\nx  =  1\n\n\n# not a heading\n-----\n```"
+    text = f"Text   with   spaces\n\n{code}\n"
+
+    minified, _ = minify_text(text, url_refs=False)
+
+    assert minified == f"Text with spaces\n\n{code}\n"
+
+
+def test_repeated_urls_get_reference_ids():
+    text = "\n".join(f"Point {i}: see [the guide]({URL}) and <{URL}>." for i in range(3)) + "\n"
+
+    minified, refs = minify_text(text, url_refs=True, min_url_repeats=2)
+
+    assert refs == {"U1": URL}
+    assert minified.count(URL) == 1
+    assert "[the guide][U1]" in minified
+    assert f"[U1]: {URL}" in minified
+
+
+def test_url_references_round_trip():
+    text = "\n".join(f"Point {i}: see [the guide]({URL}), also {URL}" for i in range(3)) + "\n"
+
+    minified, refs = minify_text(text, url_refs=True, min_url_repeats=2)
+    expanded = expand_url_refs(minified, refs)
+
+    assert "[U1]" not in expanded
+    assert "URL references:" not in expanded
+    assert expanded.strip() == text.strip()
+
+
+def test_expand_url_refs_in_model_output():
+    output = "Read [the guide][U1] or go to [U1] directly.\n\n[U1]: " + URL + "\n"
+
+    expanded = expand_url_refs(output, {"U1": URL})
+
+    assert expanded.startswith(f"Read [the guide]({URL}) or go to {URL} directly.")
+    assert "[U1]" not in expanded
+
+
+def test_unknown_reference_ids_are_kept():
+    output = "See [U7] and [docs][U7].\n"
+
+    assert expand_url_refs(output, {"U1": URL}) == output
+
+
+def test_text_with_existing_ids_gets_no_references():
+    text = f"[U1] is a footnote. {URL} {URL} {URL}\n"
+
+    minified, refs = minify_text(text, url_refs=True, min_url_repeats=2)
+
+    assert refs == {}
+    assert minified.count(URL) == 3
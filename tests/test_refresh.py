@@ -0,0 +1,95 @@
+"""Tests for source change detection (src/tools/refresh.py)."""
+
+import pytest
+
+from src.tools.refresh import diff_sources, fingerprint_sources
+
+
+def page(n: int, topic: str = "bridge networks") -> str:
+    return " ".join(f"paragraph {n} sentence {i} about docker {topic} and containers" for i in range(40))
+
+
+def response(*results) -> dict:
+    return {"results": [{"url": url, "raw_content": text, "score": score} for url, text, score in results]}
+
+
+def stored_sources(search_response: dict) -> list:
+    sources = [{"title": r["url"], "url": r["url"], "score": r["score"]} for r in search_response["results"]]
+    return fingerprint_sources(sources, search_response)
+
+
+def test_sources_without_fingerprints_become_the_baseline():
+    first = response(("https://a.example", page(1), 0.9))
+    sources = [{"title": "A", "url": "https://a.example", "score": 0.9}]
+
+    diff = diff_sources(sources, first)
+
+    assert diff["baseline"] is True
+    assert diff["change"] == 0.0
+    assert diff["added"] == []
+    assert "fingerprint" in diff["sources"][0]
+
+
+def test_same_results_are_unchanged():
+    first = response(("https://a.example", page(1), 0.9), ("https://b.example", page(2), 0.5))
+
+    diff = diff_sources(stored_sources(first), first)
+
+    assert diff["baseline"] is False
+    assert diff["unchanged"] == ["https://a.example", "https://b.example"]
+    assert diff["changed"] == [] and diff["added"] == [] and diff["removed"] == []
+    assert diff["change"] == 0.0
+
+
+def test_formatting_only_changes_do_not_count():
+    first = response(("https://a.example", page(1), 0.9))
+    reformatted = response(("https://a.example", page(1).upper().replace(" ", "\n\n"), 0.9))
+
+    diff = diff_sources(stored_sources(first), reformatted)
+
+    assert diff["unchanged"] == ["https://a.example"]
+
+
+def test_rewritten_page_is_changed():
+    first = response(("https://a.example", page(1), 0.9))
+    rewritten = response(("https://a.example", page(1, "overlay drivers"), 0.9))
+
+    diff = diff_sources(stored_sources(first), rewritten)
+
+    assert [url for url, _ in diff["changed"]] == ["https://a.example"]
+    assert 0.0 < diff["change"] <= 1.0
+
+
+def test_removed_and_added_sources_count_as_fully_changed():
+    first = response(("https://a.example", page(1), 0.5), ("https://b.example", page(2), 0.5))
+    second = response(("https://a.example", page(1), 0.5), ("https://c.example", page(3), 0.5))
+
+    diff = diff_sources(stored_sources(first), second)
+
+    assert diff["unchanged"] == ["https://a.example"]
+    assert diff["removed"] == ["https://b.example"]
+    assert diff["added"] == ["https://c.example"]
+    # a unchanged (0.0), b removed (1.0), c added (1.0), equal weights
+    assert diff["change"] == pytest.approx(2 / 3)
+
+
+def test_change_is_weighted_by_score():
+    first = response(("https://a.example", page(1), 0.9), ("https://b.example", page(2), 0.1))
+    second = response(("https://a.example", page(1), 0.9))
+
+    diff = diff_sources(stored_sources(first), second)
+
+    assert diff["removed"] == ["https://b.example"]
+    assert diff["change"] == pytest.approx(0.1)
+
+
+def test_sources_reused_from_other_courses_are_not_checked():
+    first = response(("https://a.example", page(1), 0.9))
+    reused = {"title": "Notes", "url": "", "score": 1.0, "reused_from": "docker-basics", "notes_hash": "abc"}
+    sources = [reused] + stored_sources(first)
+
+    diff = diff_sources(sources, first)
+
+    assert diff["sources"][0] == reused
+    assert diff["removed"] == []
+    assert diff["change"] == 0.0
@@ -0,0 +1,95 @@
+"""Tests for locating and replacing lesson sections (src/regenerate.py)."""
+
+import pytest
+
+from src.regenerate import find_section, splice_section
+
+
+LESSON = """# Docker Networking
+
+A short introduction.
+
+## 1. Learning Objectives
+
+- Understand bridges
+
+## 2. Core Theory
+
+Bridges connect containers.
+
+### Details
+
+```bash
+# Intuition & Examples
+docker network ls
+```
+
+## 3. Intuition & Examples
+
+An example.
+
+## 4. Common Pitfalls
+
+Port clashes.
+"""
+
+
+def test_section_runs_to_the_next_heading_of_the_same_level():
+    start, end, heading = find_section(LESSON, "Core Theory")
+    lines = LESSON.split("\n")
+
+    assert heading == "## 2. Core Theory"
+    assert lines[start] == heading
+    # The subsection belongs to the section; the code block heading is not one
+    assert "### Details" in lines[start:end]
+    assert lines[end] == "## 3. Intuition & Examples"
+
+
+def test_headings_in_code_blocks_are_ignored():
+    start, _, heading = find_section(LESSON, "Intuition & Examples")
+
+    assert heading == "## 3. Intuition & Examples"
+    assert LESSON.split("\n")[start] == heading
+
+
+def test_section_names_match_loosely():
+    assert find_section(LESSON, "intuition and examples")[2] == "## 3. Intuition & Examples"
+    assert find_section(LESSON, "common pitfalls")[2] == "## 4. Common Pitfalls"
+
+
+def test_last_section_runs_to_the_end():
+    _, end, _ = find_section(LESSON, "Common Pitfalls")
+
+    assert end == len(LESSON.split("\n"))
+
+
+def test_lesson_title_is_not_a_section():
+    assert find_section(LESSON, "Docker Networking") is None
+
+
+def test_missing_section():
+    assert find_section(LESSON, "Exercises") is None
+
+
+def test_splice_replaces_only_the_section():
+    new_section = "## 2. Core Theory\n\nRewritten theory."
+
+    result = splice_section(LESSON, "Core Theory", new_section)
+
+    assert "Rewritten theory." in result
+    assert "Bridges connect containers." not in result
+    assert "### Details" not in result
+    assert result.startswith("# Docker Networking\n\nA short introduction.\n\n## 1. Learning Objectives")
+    assert "Rewritten theory.\n\n## 3. Intuition & Examples\n" in result
+    assert result.endswith("Port clashes.\n")
+
+
+def test_splice_last_section():
+    result = splice_section(LESSON, "Common Pitfalls", "## 4. Common Pitfalls\n\nNew pitfalls.\n\n")
+
+    assert result.endswith("An example.\n\n## 4. Common Pitfalls\n\nNew pitfalls.\n")
+
+
+def test_splice_missing_section_raises():
+    with pytest.raises(ValueError):
+        splice_section(LESSON, "Exercises", "## Exercises\n\nNew.")
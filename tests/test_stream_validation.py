@@ -0,0 +1,124 @@
+"""Tests for early-abort validation of streamed lessons (src/tools/stream_validation.py)."""
+
+import pytest
+
+from src.config import Config
+from src.prompts import LESSON_SECTIONS
+from src.tools.stream_validation import LessonStreamValidator, StreamAborted, heading_matches
+
+
+def lesson(title: str = "# Lesson 1: Async Python", sections=LESSON_SECTIONS, body: str = "Some text.") -> str:
+    parts = [title, "", "A short introduction.", ""]
+    for number, section in enumerate(sections, 1):
+        parts += [f"## {number}. {section}", "", body, ""]
+    return "\n".join(parts)
+
+
+def stream(validator: LessonStreamValidator, text: str, chunk_size: int = 7) -> None:
+    for start in range(0, len(text), chunk_size):
+        validator.feed(text[start:start + chunk_size])
+    validator.finish()
+
+
+@pytest.fixture(autouse=True)
+def limits(monkeypatch):
+    monkeypatch.setattr(Config, "STREAM_FIRST_SECTION_TOKENS", 800)
+    monkeypatch.setattr(Config, "STREAM_SECTION_TOKEN_LIMIT", 5000)
+    monkeypatch.setattr(Config, "STREAM_MAX_MISSING_SECTIONS", 1)
+
+
+def test_well_formed_lesson_passes():
+    validator = LessonStreamValidator(LESSON_SECTIONS)
+
+    stream(validator, lesson())
+
+    assert validator.found == len(LESSON_SECTIONS)
+    assert validator.missing == 0
+
+
+def test_title_naming_later_sections_is_not_a_section():
+    validator = LessonStreamValidator(LESSON_SECTIONS)
+
+    stream(validator, lesson(title="# Lesson 4: Common Pitfalls and Exercises for Async Python"))
+
+    assert validator.found == len(LESSON_SECTIONS)
+    assert validator.missing == 0
+
+
+def test_subheadings_naming_sections_are_not_sections():
+    body = "### Further Reading on the Core Theory\n\nText.\n\n### Exercises warm-up\n\nMore text."
+    validator = LessonStreamValidator(LESSON_SECTIONS)
+
+    stream(validator, lesson(body=body))
+
+    assert validator.missing == 0
+
+
+def test_headings_in_code_blocks_are_ignored():
+    body = "```markdown\n## Further Reading\n```"
+    validator = LessonStreamValidator(LESSON_SECTIONS)
+
+    stream(validator, lesson(body=body))
+
+    assert validator.missing == 0
+
+
+def test_skipped_sections_abort_as_soon_as_a_later_section_starts():
+    text = lesson(sections=["Learning Objectives", "Exercises", "Further Reading"])
+    validator = LessonStreamValidator(LESSON_SECTIONS)
+
+    with pytest.raises(StreamAborted) as aborted:
+        stream(validator, text)
+
+    assert aborted.value.reason == "skipped_sections"
+
+
+def test_missing_final_sections_abort_at_the_end():
+    validator = LessonStreamValidator(LESSON_SECTIONS)
+
+    with pytest.raises(StreamAborted) as aborted:
+        stream(validator, lesson(sections=LESSON_SECTIONS[:3]))
+
+    assert aborted.value.reason == "missing_sections"
+
+
+def test_one_missing_section_is_tolerated():
+    validator = LessonStreamValidator(LESSON_SECTIONS)
+
+    stream(validator, lesson(sections=LESSON_SECTIONS[:-1]))
+
+    assert validator.found == len(LESSON_SECTIONS) - 1
+
+
+def test_no_section_heading_aborts_early(monkeypatch):
+    monkeypatch.setattr(Config, "STREAM_FIRST_SECTION_TOKENS", 50)
+    validator = LessonStreamValidator(LESSON_SECTIONS)
+
+    with pytest.raises(StreamAborted) as aborted:
+        stream(validator, "# Title\n\n" + "words without any section heading " * 50)
+
+    assert aborted.value.reason == "no_sections"
+
+
+def test_overrunning_section_aborts(monkeypatch):
+    monkeypatch.setattr(Config, "STREAM_SECTION_TOKEN_LIMIT", 100)
+    validator = LessonStreamValidator(LESSON_SECTIONS)
+
+    with pytest.raises(StreamAborted) as aborted:
+        stream(validator, lesson(body="rambling on and on " * 200))
+
+    assert aborted.value.reason == "section_overrun"
+
+
+def test_translated_lessons_count_level_two_headings():
+    translated = ["Lernziele", "Theorie", "Beispiele", "Fallstricke", "Übungen", "Weiterführende Literatur"]
+    validator = LessonStreamValidator(LESSON_SECTIONS, language="German")
+
+    stream(validator, lesson(title="# Lektion 1", sections=translated))
+
+    assert validator.found == len(LESSON_SECTIONS)
+
+
+def test_heading_matches_ignores_numbering_and_ampersands():
+    assert heading_matches("3. Intuition and Examples", "Intuition & Examples")
+    assert not heading_matches("Examples", "Intuition & Examples")